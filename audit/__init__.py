@@ -3,14 +3,15 @@ Módulo de auditoría para MyInner
 Proporciona funcionalidades completas de auditoría y logging
 """
 
-from .middleware import (
-    AuditMiddleware,
-    AuthenticationAuditMiddleware, 
-    DataAccessAuditMiddleware
-)
-
 __all__ = [
     'AuditMiddleware',
-    'AuthenticationAuditMiddleware',
-    'DataAccessAuditMiddleware'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    # Importación diferida: audit es una app instalada y el middleware
+    # importa modelos, que no existen hasta que el registro de apps está listo
+    if name in __all__:
+        from . import middleware
+        return getattr(middleware, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,33 @@
+from django.apps import AppConfig
+from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.signals import post_save
+
+
+class AuditConfig(AppConfig):
+    name = 'audit'
+
+    def ready(self):
+        from auditlog.models import LogEntry
+
+        from . import live, middleware, security, writer
+
+        # Señales de Django auth para auditoría automática
+        user_logged_in.connect(middleware.log_successful_login, dispatch_uid='audit.login')
+        user_logged_out.connect(middleware.log_user_logout, dispatch_uid='audit.logout')
+        user_login_failed.connect(middleware.log_failed_login, dispatch_uid='audit.login_failed')
+
+        # Detector de fuerza bruta en memoria y volcado periódico de sus resúmenes
+        user_login_failed.connect(security.on_login_failed, dispatch_uid='audit.security.login_failed')
+        user_logged_in.connect(security.on_logged_in, dispatch_uid='audit.security.login')
+
+        # Feed en vivo del dashboard; bulk_create (modos batched y
+        # background) no emite post_save y publica desde audit/writer.py
+        post_save.connect(live.entry_saved, sender=LogEntry, dispatch_uid='audit.live')
+
+        mode = writer.get_mode()
+        if mode not in writer.MODES:
+            raise ImproperlyConfigured(
+                f"AUDIT_WRITER_MODE desconocido: {mode!r} (opciones: {', '.join(writer.MODES)})"
+            )
+        writer.install()
@@ -0,0 +1,220 @@
+"""
+Archivo comprimido de LogEntry antiguas
+
+archive() mueve las LogEntry anteriores a un corte fuera de la tabla
+caliente: las escribe por lotes de id en archivos NDJSON comprimidos
+(gzip, o zstd si está instalado `zstandard`), uno por día UTC y lote, en
+
+    AUDIT_ARCHIVE_DIR/AAAA/MM/DD/auditlog-<primer id>-<último id>.jsonl.gz
+
+y en la misma transacción registra el archivo en AuditArchiveSegment y
+borra las filas del lote. Cada línea es un objeto del serializador 'jsonl'
+de Django con claves naturales (modelo y username del actor), así que los
+archivos gzip se pueden restaurar con `manage.py loaddata`.
+
+read() es el camino de lectura: usa el índice para abrir solo los archivos
+que se solapan con el rango pedido.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+from datetime import datetime
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.core import serializers
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Max
+
+from . import rollups
+from .models import AuditArchiveSegment
+
+logger = logging.getLogger('auditlog')
+
+EXTENSIONS = {'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def archive_settings():
+    conf = getattr(settings, 'AUDIT_SETTINGS', {})
+    return {
+        'directory': conf.get('ARCHIVE_DIR') or os.path.join(settings.BASE_DIR, 'archive', 'audit'),
+        'compression': conf.get('ARCHIVE_COMPRESSION', 'gzip'),
+        'batch_size': conf.get('ARCHIVE_BATCH_SIZE', 50000),
+    }
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImproperlyConfigured(
+            "AUDIT_ARCHIVE_COMPRESSION='zstd' requiere el paquete zstandard (pip install zstandard)"
+        ) from None
+    return zstandard
+
+
+def check_compression(compression):
+    if compression not in EXTENSIONS:
+        raise ImproperlyConfigured(
+            f"AUDIT_ARCHIVE_COMPRESSION='{compression}' no soportado. Opciones: {', '.join(EXTENSIONS)}"
+        )
+    if compression == 'zstd':
+        _zstd()
+
+
+def _open(path, mode, compression):
+    """Archivo de texto comprimido, en modo 'r' o 'w'"""
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    zstd = _zstd()
+    raw = open(path, mode + 'b')
+    if mode == 'w':
+        stream = zstd.ZstdCompressor(level=10).stream_writer(raw)
+    else:
+        stream = zstd.ZstdDecompressor().stream_reader(raw)
+    return io.TextIOWrapper(stream, encoding='utf-8')
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_segment(directory, day, entries, compression):
+    """Escribe las entradas de un día y devuelve su AuditArchiveSegment (sin guardar)"""
+    relative = os.path.join(
+        f"{day:%Y}", f"{day:%m}", f"{day:%d}",
+        f"auditlog-{entries[0].pk}-{entries[-1].pk}{EXTENSIONS[compression]}",
+    )
+    path = os.path.join(directory, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with _open(tmp, 'w', compression) as fh:
+        serializers.serialize('jsonl', entries, stream=fh, use_natural_foreign_keys=True)
+    os.replace(tmp, path)
+    timestamps = [entry.timestamp for entry in entries]
+    return AuditArchiveSegment(
+        path=relative, day=day, compression=compression,
+        first_id=entries[0].pk, last_id=entries[-1].pk,
+        first_timestamp=min(timestamps), last_timestamp=max(timestamps),
+        count=len(entries), size_bytes=os.path.getsize(path), sha256=_sha256(path),
+    )
+
+
+def archive(cutoff, batch_size=None, compression=None, directory=None, progress=None):
+    """
+    Archiva y borra las LogEntry con timestamp < cutoff, por lotes de id.
+    Primero compacta los rollups, para que las estadísticas sigan contando
+    las entradas archivadas. Devuelve el número de entradas archivadas.
+    """
+    defaults = archive_settings()
+    batch_size = batch_size or defaults['batch_size']
+    compression = compression or defaults['compression']
+    directory = directory or defaults['directory']
+    check_compression(compression)
+    rollups.compact()
+
+    old = LogEntry.objects.filter(timestamp__lt=cutoff)
+    bounds = old.aggregate(total=Count('id'), last=Max('id'))
+    total, last = bounds['total'], bounds['last']
+    archived = 0
+    lower = 0
+    while total and lower < last:
+        ids = old.filter(id__gt=lower, id__lte=last).order_by('id').values_list('id', flat=True)
+        upper = next(iter(ids[batch_size - 1:batch_size]), None) or last
+        batch = old.filter(id__gt=lower, id__lte=upper)
+        entries = list(batch.select_related('content_type', 'actor').order_by('id'))
+
+        by_day = {}
+        for entry in entries:
+            by_day.setdefault(rollups.floor_hour(entry.timestamp).date(), []).append(entry)
+        segments = []
+        try:
+            for day, day_entries in sorted(by_day.items()):
+                segments.append(_write_segment(directory, day, day_entries, compression))
+            with transaction.atomic():
+                AuditArchiveSegment.objects.bulk_create(segments)
+                deleted = batch.delete()[0]
+                if deleted != len(entries):
+                    raise ArchiveError(
+                        f"El lote {lower + 1}-{upper} cambió durante el archivado "
+                        f"({len(entries)} escritas, {deleted} borradas)"
+                    )
+        except BaseException:
+            for segment in segments:
+                os.remove(os.path.join(directory, segment.path))
+            raise
+
+        archived += len(entries)
+        lower = upper
+        if progress:
+            progress(archived, total)
+
+    logger.info(
+        f"Audit archive: {archived} entries older than {cutoff.isoformat()} archived to {directory}",
+        extra={'event': 'audit_archive', 'archived': archived, 'cutoff': cutoff.isoformat()},
+    )
+    return archived
+
+
+def _read_segment(segment, directory):
+    with _open(os.path.join(directory, segment.path), 'r', segment.compression) as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _entry(obj):
+    fields = obj['fields']
+    actor = fields.get('actor')
+    return {
+        **fields,
+        'id': obj['pk'],
+        'timestamp': datetime.fromisoformat(fields['timestamp'].replace('Z', '+00:00')),
+        'content_type': tuple(fields['content_type']),
+        'actor': actor[0] if actor else None,
+    }
+
+
+def read(start=None, end=None, actor=None, action=None, content_type=None, limit=None, directory=None):
+    """
+    Entradas archivadas con timestamp en [start, end), de la más reciente a
+    la más antigua, como dicts con los campos de LogEntry. `actor` es un
+    username, `content_type` un par (app_label, model). Con `limit` deja de
+    abrir archivos en cuanto los restantes ya no pueden entrar en el resultado.
+    """
+    directory = directory or archive_settings()['directory']
+    segments = AuditArchiveSegment.objects.order_by('-last_timestamp')
+    if start:
+        segments = segments.filter(last_timestamp__gte=start)
+    if end:
+        segments = segments.filter(first_timestamp__lt=end)
+
+    results = []
+    for segment in segments:
+        if limit and len(results) >= limit and segment.last_timestamp < results[-1]['timestamp']:
+            break
+        for obj in _read_segment(segment, directory):
+            entry = _entry(obj)
+            if ((start and entry['timestamp'] < start) or (end and entry['timestamp'] >= end)
+                    or (actor is not None and entry['actor'] != actor)
+                    or (action is not None and entry['action'] != action)
+                    or (content_type is not None and entry['content_type'] != tuple(content_type))):
+                continue
+            results.append(entry)
+        results.sort(key=lambda entry: (entry['timestamp'], entry['id']), reverse=True)
+        if limit:
+            del results[limit:]
+    return results
@@ -0,0 +1,267 @@
+"""
+Feed en vivo del dashboard de auditoría (Server-Sent Events)
+
+GET /audit/api/live/ mantiene abierta una respuesta text/event-stream por
+la que el servidor empuja las entradas nuevas y los incrementos de los
+contadores del dashboard, en lugar de que la página vuelva a pedir
+/audit/api/dashboard/ y /audit/api/logs/ cada cinco minutos.
+
+Las entradas llegan por un canal en memoria del proceso (Broadcast): al
+confirmarse su transacción, los tres modos del writer (audit/writer.py)
+publican lo que insertaron. Cada conexión tiene su propia cola acotada
+(LIVE_QUEUE_SIZE); si un cliente lento la llena, sus entradas se descartan
+y recibe un evento 'resync' para volver a pedir el dashboard completo.
+Publicar nunca bloquea a quien escribe el log y, sin conexiones abiertas,
+no cuesta más que comprobar que no hay suscriptores.
+
+Eventos del stream:
+
+- ready: al conectar; el cliente pide entonces los datos completos.
+- entries: las entradas nuevas (las MAX_ENTRIES últimas del intervalo),
+  con el formato de GET /audit/api/logs/.
+- delta: lo que hay que sumar a metrics y charts del dashboard.
+- resync: se perdieron entradas; hay que recargar los datos completos.
+
+El canal es por proceso: con varios workers, cada conexión ve solo lo que
+escribe su worker (o el writer en segundo plano de ese proceso). Solo se
+sirve bajo ASGI (myinner_backend/asgi.py): con WSGI la respuesta infinita
+ocuparía un worker y se almacenaría entera antes de enviarse.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from collections import Counter, deque
+from functools import partial
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .serializers import ModelLabels
+from .stats import CRITICAL_ACTIONS, ranking
+
+DEFAULT_SETTINGS = {
+    'LIVE_QUEUE_SIZE': 1000,
+    'LIVE_INTERVAL': 1.0,
+    'LIVE_KEEPALIVE': 15.0,
+}
+
+# Entradas por evento 'entries' (el dashboard muestra las 10 últimas)
+MAX_ENTRIES = 50
+# Milisegundos antes de que EventSource reconecte
+RETRY_MS = 5000
+
+
+def live_settings():
+    audit = getattr(settings, 'AUDIT_SETTINGS', {})
+    return {key: audit.get(key, default) for key, default in DEFAULT_SETTINGS.items()}
+
+
+class Subscription:
+    """
+    Cola acotada de una conexión. offer() se llama desde cualquier hilo;
+    get() desde el event loop de la conexión, que solo se despierta cuando
+    la cola pasa de vacía a tener algo, no por cada entrada.
+    """
+
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+
+    def offer(self, items):
+        """Encola lo que quepa; True si hay que despertar a la conexión"""
+        with self._lock:
+            space = self.maxsize - len(self._items)
+            if space < len(items):
+                self.dropped += len(items) - max(space, 0)
+                items = items[:max(space, 0)]
+            wake = not self._items
+            self._items.extend(items)
+        return wake
+
+    async def get(self, timeout):
+        """(entradas, descartadas) pendientes; espera como mucho `timeout` si no hay"""
+        if not self._items and not self.dropped:
+            # Sin wait_for: su tarea interna puede tragarse la cancelación
+            # al desconectarse el cliente y la suscripción quedaría viva
+            timer = self.loop.call_later(timeout, self._ready.set)
+            try:
+                await self._ready.wait()
+            finally:
+                timer.cancel()
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+            dropped, self.dropped = self.dropped, 0
+            self._ready.clear()
+        return items, dropped
+
+
+class Broadcast:
+    """Canal en memoria: cada publicación llega a la cola de todas las conexiones"""
+
+    def __init__(self):
+        self._subscribers = ()
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self._subscribers)
+
+    def subscribe(self, maxsize):
+        subscription = Subscription(asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subscribers = (*self._subscribers, subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def publish(self, items):
+        # Tupla inmutable: se recorre sin lock aunque otro hilo (des)suscriba
+        waking = {}
+        for subscription in self._subscribers:
+            if subscription.offer(items):
+                waking.setdefault(subscription.loop, []).append(subscription)
+        # Un aviso por event loop (normalmente uno por proceso), no por conexión
+        for loop, subscriptions in waking.items():
+            try:
+                loop.call_soon_threadsafe(_wake, subscriptions)
+            except RuntimeError:
+                # Event loop cerrado sin pasar por unsubscribe
+                for subscription in subscriptions:
+                    self.unsubscribe(subscription)
+
+
+def _wake(subscriptions):
+    for subscription in subscriptions:
+        subscription._ready.set()
+
+
+broadcast = Broadcast()
+
+
+def _reset_after_fork():
+    # Las conexiones (y sus event loops) son del proceso padre
+    global broadcast
+    broadcast = Broadcast()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _actor(entry):
+    if entry.actor_id is None:
+        return 'System'
+    # set_actor deja el usuario cargado; no se consulta la BD por entrada
+    if LogEntry.actor.is_cached(entry):
+        return entry.actor.get_username()
+    return entry.actor_email or str(entry.actor_id)
+
+
+def event_items(entries, labels=None):
+    """Entradas ya insertadas como filas de GET /audit/api/logs/ (más lo que usa el delta)"""
+    labels = ModelLabels() if labels is None else labels
+    return [
+        {
+            'id': entry.pk,
+            'timestamp': entry.timestamp,
+            'actor': _actor(entry),
+            'actor_id': entry.actor_id,
+            'action': entry.action,
+            'content_type': entry.content_type_id,
+            'model': labels[entry.content_type_id],
+            'object_id': entry.object_id,
+            'object_repr': entry.object_repr,
+            'remote_addr': entry.remote_addr,
+        }
+        for entry in entries
+    ]
+
+
+def publish(entries):
+    if broadcast and entries:
+        broadcast.publish(event_items(entries))
+
+
+def publish_on_commit(entries, using=None):
+    """Publica las entradas cuando su transacción confirma (enseguida si no hay ninguna)"""
+    if broadcast and entries:
+        transaction.on_commit(partial(publish, list(entries)), using=using)
+
+
+def entry_saved(sender, instance, created, raw=False, using=None, **kwargs):
+    """post_save de LogEntry: las entradas del modo sync y las creadas a mano"""
+    if created and not raw:
+        publish_on_commit([instance], using)
+
+
+def delta(items, tzinfo=None, limit=5):
+    """Lo que las entradas suman a metrics y charts de GET /audit/api/dashboard/"""
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    hours, models, actors = Counter(), Counter(), Counter()
+    critical = 0
+    for item in items:
+        if item['action'] in CRITICAL_ACTIONS:
+            critical += 1
+        hours[item['timestamp'].astimezone(tzinfo).hour] += 1
+        models[item['model']] += 1
+        if item['actor_id'] is not None:
+            actors[item['actor']] += 1
+    return {
+        'metrics': {'total_actions': len(items), 'critical_actions': critical},
+        'hourly_activity': [{'hour': hour, 'count': n} for hour, n in sorted(hours.items())],
+        # Etiquetas ya resueltas al publicar: el event loop no consulta la BD
+        'top_models': [
+            {'content_type__app_label': label.partition('.')[0],
+             'content_type__model': label.partition('.')[2], 'count': n}
+            for label, n in ranking(models, limit)
+        ],
+        'top_users': [{'actor__username': name, 'count': n} for name, n in ranking(actors, limit)],
+    }
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _entry_row(item):
+    return {key: item[key] for key in ('id', 'timestamp', 'actor', 'action', 'model', 'object_id',
+                                       'object_repr', 'remote_addr')}
+
+
+async def event_stream(channel=None):
+    """
+    Cuerpo de la respuesta SSE. Se suscribe al empezar a iterarse (en el
+    event loop que la sirve) y se da de baja al cerrarse la conexión.
+    """
+    conf = live_settings()
+    channel = broadcast if channel is None else channel
+    tzinfo = timezone.get_current_timezone()
+    subscription = channel.subscribe(conf['LIVE_QUEUE_SIZE'])
+    try:
+        yield f"retry: {RETRY_MS}\n" + format_event('ready', {'timezone': str(tzinfo)})
+        while True:
+            items, dropped = await subscription.get(conf['LIVE_KEEPALIVE'])
+            if dropped:
+                # El cliente recarga todo: lo que quedaba en cola ya está contado ahí
+                yield format_event('resync', {'dropped': dropped + len(items)})
+            elif items:
+                rows = [_entry_row(item) for item in items[-MAX_ENTRIES:]]
+                yield format_event('entries', rows) + format_event('delta', delta(items, tzinfo))
+            else:
+                # Comentario: mantiene viva la conexión a través de proxies
+                yield ': keepalive\n\n'
+                continue
+            # Lo que llegue mientras tanto sale agrupado en el siguiente evento
+            await asyncio.sleep(conf['LIVE_INTERVAL'])
+    finally:
+        channel.unsubscribe(subscription)
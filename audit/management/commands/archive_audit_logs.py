@@ -0,0 +1,61 @@
+"""
+Archiva las LogEntry más antiguas que la retención configurada
+
+Las escribe en NDJSON comprimido (un archivo por día UTC y lote) bajo
+AUDIT_ARCHIVE_DIR, las registra en AuditArchiveSegment y las borra de la
+tabla en el mismo lote (ver audit/archive.py). Las entradas archivadas se
+consultan en /audit/api/logs/archived/.
+"""
+
+import time
+
+from auditlog.models import LogEntry
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from audit import archive, retention
+
+
+class Command(BaseCommand):
+    help = 'Mueve los logs de auditoría fuera del período de retención a archivos comprimidos'
+
+    def add_arguments(self, parser):
+        defaults = archive.archive_settings()
+        parser.add_argument('--days', type=int, default=retention.retention_settings()['retain_days'],
+                            help='Días a conservar en la tabla (por defecto AUDIT_RETAIN_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=defaults['batch_size'],
+                            help=f"Entradas por lote (por defecto {defaults['batch_size']})")
+        parser.add_argument('--compression', choices=sorted(archive.EXTENSIONS),
+                            default=defaults['compression'])
+        parser.add_argument('--directory', default=defaults['directory'],
+                            help='Directorio del archivo (por defecto AUDIT_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo contar las entradas que se archivarían')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days debe ser >= 0 y --batch-size >= 1')
+        cutoff = retention.retention_cutoff(options['days'])
+
+        if options['dry_run']:
+            count = LogEntry.objects.filter(timestamp__lt=cutoff).count()
+            self.stdout.write(f"{count} entradas anteriores a {cutoff.isoformat()} (dry run)")
+            return
+
+        started = time.monotonic()
+
+        def progress(done, total):
+            self.stdout.write(f"\r  {done}/{total} entradas", ending='')
+            self.stdout.flush()
+
+        try:
+            archived = archive.archive(cutoff, options['batch_size'], options['compression'],
+                                       options['directory'], progress)
+        except (ImproperlyConfigured, archive.ArchiveError) as exc:
+            raise CommandError(str(exc))
+        if archived:
+            self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"{archived} entradas anteriores a {cutoff.isoformat()} archivadas en "
+            f"{options['directory']} en {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,54 @@
+"""
+Purga las LogEntry más antiguas que la retención configurada
+
+Borra por lotes de clave primaria con transacciones cortas y una pausa
+entre lotes (ver audit/retention.py), así que se puede ejecutar con la
+aplicación en marcha. --dry-run solo cuenta lo que se borraría.
+"""
+
+import time
+
+from auditlog.models import LogEntry
+from django.core.management.base import BaseCommand, CommandError
+
+from audit import retention
+
+
+class Command(BaseCommand):
+    help = 'Borra por lotes los logs de auditoría fuera del período de retención'
+
+    def add_arguments(self, parser):
+        defaults = retention.retention_settings()
+        parser.add_argument('--days', type=int, default=defaults['retain_days'],
+                            help=f"Días a conservar (por defecto {defaults['retain_days']})")
+        parser.add_argument('--batch-size', type=int, default=defaults['batch_size'],
+                            help=f"Entradas por lote (por defecto {defaults['batch_size']})")
+        parser.add_argument('--sleep', type=float, default=defaults['sleep'],
+                            help=f"Segundos de pausa entre lotes (por defecto {defaults['sleep']})")
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo contar las entradas que se borrarían')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days debe ser >= 0 y --batch-size >= 1')
+        cutoff = retention.retention_cutoff(options['days'])
+
+        if options['dry_run']:
+            count = LogEntry.objects.filter(timestamp__lt=cutoff).count()
+            self.stdout.write(f"{count} entradas anteriores a {cutoff.isoformat()} (dry run)")
+            return
+
+        started = time.monotonic()
+
+        def progress(deleted, total):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"\r  {deleted}/{total} entradas ({deleted / max(elapsed, 1e-6):.0f}/s)", ending='')
+            self.stdout.flush()
+
+        deleted = retention.purge(cutoff, options['batch_size'], options['sleep'], progress)
+        if deleted:
+            self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} entradas anteriores a {cutoff.isoformat()} borradas "
+            f"en {time.monotonic() - started:.1f}s"
+        ))
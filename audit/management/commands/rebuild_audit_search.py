@@ -0,0 +1,32 @@
+"""
+Reinstala el índice de búsqueda de auditoría (audit/search.py)
+
+Crea lo que falte (extensión e índices trigram en PostgreSQL, tabla FTS5 y
+triggers en SQLite) y en SQLite vuelve a llenar la tabla FTS5 desde
+auditlog_logentry. Necesario si una migración posterior de django-auditlog
+recrea la tabla en SQLite, lo que borra los triggers.
+"""
+
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from audit import search
+
+
+class Command(BaseCommand):
+    help = 'Reinstala y llena el índice de búsqueda del log de auditoría'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        search.install(connection, get_user_model()._meta.db_table)
+        if connection.vendor == 'sqlite' and not search.fts_available():
+            self.stdout.write(self.style.WARNING(
+                'Este SQLite no tiene FTS5 con tokenizador trigram; la búsqueda usa icontains'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice de búsqueda ({connection.vendor}) listo en {time.monotonic() - started:.1f}s"
+        ))
@@ -1,190 +1,290 @@
 """
 Middleware personalizado para auditoría avanzada
 Captura información adicional como IP, User-Agent, y contexto de requests
+
+Un solo middleware por request: resuelve IP, User-Agent y actor una vez,
+clasifica la ruta con un trie de prefijos (AUDIT_SETTINGS['ROUTES']),
+respeta los flags ENABLE_*_AUDIT y muestrea las rutas de mucho volumen.
+También sustituye a auditlog.middleware.AuditlogMiddleware: fija el actor,
+la IP y el correlation id de los LogEntry con el mismo contexto.
 """
 
+import ipaddress
 import logging
-import json
-from django.utils.deprecation import MiddlewareMixin
-from django.contrib.auth.models import AnonymousUser
+import random
+
+from auditlog.cid import set_cid
+from auditlog.context import set_extra_data
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
 from ipware import get_client_ip
-from auditlog.context import set_actor
-from auditlog.models import LogEntry
 
 logger = logging.getLogger('auditlog')
 
+DEFAULT_ROUTE = {
+    'category': None,       # api | auth | admin (flag ENABLE_<CATEGORÍA>_AUDIT)
+    'sensitive': False,     # registrar cada acceso
+    'event': None,          # login | logout
+    'sample_rate': 1.0,     # fracción de requests auditados (errores siempre)
+}
+
+CATEGORY_FLAGS = {
+    'api': 'ENABLE_API_AUDIT',
+    'auth': 'ENABLE_AUTH_AUDIT',
+    'admin': 'ENABLE_ADMIN_AUDIT',
+}
+
+# Clave de las opciones en los nodos del trie (los segmentos son str)
+_OPTIONS = None
+
+
+def _segments(path):
+    return [segment for segment in path.split('/') if segment]
+
+
+class RouteTrie:
+    """Trie por segmentos de ruta; gana el prefijo registrado más largo"""
+
+    def __init__(self, routes):
+        self._root = {}
+        for prefix, options in routes.items():
+            node = self._root
+            for segment in _segments(prefix):
+                node = node.setdefault(segment, {})
+            node[_OPTIONS] = {**DEFAULT_ROUTE, **options}
+
+    def match(self, path):
+        node = self._root
+        found = node.get(_OPTIONS, DEFAULT_ROUTE)
+        for segment in _segments(path):
+            node = node.get(segment)
+            if node is None:
+                break
+            found = node.get(_OPTIONS, found)
+        return found
+
+
+def audit_settings():
+    return getattr(settings, 'AUDIT_SETTINGS', {})
+
+
+def category_enabled(category):
+    flag = CATEGORY_FLAGS.get(category)
+    return flag is None or audit_settings().get(flag, True)
+
+
+def resolve_client_ip(request):
+    """(ip, es_enrutable) según AUDIT_IP_CAPTURE"""
+    capture = getattr(settings, 'AUDIT_IP_CAPTURE', {})
+    if not capture.get('ENABLE', True):
+        return None, False
+    kwargs = {}
+    if capture.get('PROXY_COUNT'):
+        kwargs['proxy_count'] = capture['PROXY_COUNT']
+    if capture.get('PROXY_LIST'):
+        kwargs['proxy_trusted_ips'] = capture['PROXY_LIST']
+    return get_client_ip(request, **kwargs)
+
+
+def _valid_ip(value):
+    try:
+        return str(ipaddress.ip_address(value))
+    except ValueError:
+        return None
+
 
-class AuditMiddleware(MiddlewareMixin):
+def trusted_client_ip(request):
     """
-    Middleware para capturar información detallada de auditoría en cada request
+    IP del cliente para throttling y detección de ataques. Solo se fía de
+    X-Forwarded-For a través de los proxies de AUDIT_IP_CAPTURE: con
+    PROXY_COUNT, la dirección que añadió el más externo; con PROXY_LIST, la
+    primera por la derecha que no es un proxy de confianza. Sin proxies
+    configurados se usa REMOTE_ADDR: el cliente no elige su IP con la cabecera.
     """
-    
-    def process_request(self, request):
-        """
-        Procesa cada request para capturar información de auditoría
-        """
-        # Capturar IP del cliente
-        client_ip, is_routable = get_client_ip(request)
-        
-        # Capturar User-Agent
-        user_agent = request.META.get('HTTP_USER_AGENT', 'Unknown')
-        
-        # Capturar método HTTP y path
-        http_method = request.method
-        request_path = request.path
-        
-        # Información del usuario
-        user = getattr(request, 'user', AnonymousUser())
-        
-        # Establecer actor para auditlog
-        if user and not isinstance(user, AnonymousUser):
-            set_actor(user)
-        
-        # Guardar información adicional en el request para uso posterior
-        request.audit_info = {
+    remote = request.META.get('REMOTE_ADDR') or None
+    capture = getattr(settings, 'AUDIT_IP_CAPTURE', {})
+    count = capture.get('PROXY_COUNT') or 0
+    trusted = set(capture.get('PROXY_LIST') or ())
+    if not count and (not trusted or remote not in trusted):
+        return remote
+    hops = [hop.strip() for hop in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+    if count:
+        # Cada proxy añade a la derecha la dirección de la que recibió el request
+        client = hops[-count] if len(hops) >= count else None
+    else:
+        client = next((hop for hop in reversed(hops) if hop not in trusted), None)
+    return (client and _valid_ip(client)) or remote
+
+
+def request_context(request):
+    """
+    Contexto de auditoría del request, calculado una sola vez y guardado en
+    request.audit_info (también lo usan los receptores de señales de login)
+    """
+    info = getattr(request, 'audit_info', None)
+    if info is None:
+        client_ip, is_routable = resolve_client_ip(request)
+        info = request.audit_info = {
             'client_ip': client_ip,
             'is_routable_ip': is_routable,
-            'user_agent': user_agent,
-            'http_method': http_method,
-            'request_path': request_path,
-            'timestamp': None,  # Se establecerá en process_response
+            'user_agent': request.META.get('HTTP_USER_AGENT', 'Unknown'),
+            'http_method': request.method,
+            'request_path': request.path,
         }
-        
-        # Log de requests en endpoints sensibles
-        sensitive_paths = [
-            '/api/auth/', '/api/users/', '/api/notes/',
-            '/admin/', '/api/password-reset/'
-        ]
-        
-        if any(path in request_path for path in sensitive_paths):
+    return info
+
+
+class AuditMiddleware:
+    """
+    Middleware para capturar información detallada de auditoría en cada request
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        conf = audit_settings()
+        self.routes = RouteTrie(conf.get('ROUTES', {}))
+        self.data_access_views = tuple(conf.get('DATA_ACCESS_VIEWS', ()))
+
+    def __call__(self, request):
+        info = request_context(request)
+        route = info['route'] = self.routes.match(request.path)
+        info['enabled'] = category_enabled(route['category'])
+        rate = route['sample_rate']
+        info['sampled'] = rate >= 1 or random.random() < rate
+
+        user = getattr(request, 'user', AnonymousUser())
+        if info['enabled']:
+            self._log_request(request, info, route, user)
+
+        set_cid(request)
+        with set_extra_data(context_data=self._extra_data(request, info, user)):
+            response = self.get_response(request)
+
+        if info['enabled']:
+            self._log_response(request, info, response)
+        return response
+
+    def _extra_data(self, request, info, user):
+        """Datos que django-auditlog copia a cada LogEntry del request"""
+        actor = user if isinstance(user, get_user_model()) and user.is_authenticated else None
+        remote_addr = None if getattr(settings, 'AUDITLOG_DISABLE_REMOTE_ADDR', False) else info['client_ip']
+        try:
+            remote_port = int(request.headers.get('X-Forwarded-Port', ''))
+        except ValueError:
+            remote_port = None
+        return {'actor': actor, 'remote_addr': remote_addr, 'remote_port': remote_port}
+
+    def _log_request(self, request, info, route, user):
+        client_ip = info['client_ip']
+        user_agent = info['user_agent']
+
+        if route['event'] == 'login' and request.method == 'POST':
             logger.info(
-                f"Sensitive endpoint access: {http_method} {request_path} "
-                f"by {user} from {client_ip} ({user_agent[:100]})"
+                f"Login attempt from {client_ip} "
+                f"({user_agent[:100]}) to {request.path}",
+                extra={'event': 'login_attempt', 'path': request.path,
+                       'ip': client_ip, 'user_agent': user_agent[:200]},
             )
-    
-    def process_response(self, request, response):
+        elif route['event'] == 'logout' and user and not isinstance(user, AnonymousUser):
+            logger.info(
+                f"Logout: {user} from {client_ip}",
+                extra={'event': 'logout', 'user': str(user), 'ip': client_ip},
+            )
+
+        if route['sensitive'] and info['sampled']:
+            logger.info(
+                f"Sensitive endpoint access: {request.method} {request.path} "
+                f"by {user} from {client_ip} ({user_agent[:100]})",
+                extra={
+                    'event': 'sensitive_access', 'method': request.method, 'path': request.path,
+                    'user': str(user), 'ip': client_ip, 'user_agent': user_agent[:200],
+                },
+            )
+
+    def _log_response(self, request, info, response):
+        status_code = response.status_code
+        is_error = status_code >= 400
+        # Solo registrar respuestas de error (siempre) o acciones de escritura (muestreadas)
+        if not (is_error or (info['sampled'] and request.method in ('POST', 'PUT', 'PATCH', 'DELETE'))):
+            return
+        user = getattr(request, 'user', AnonymousUser())
+        audit_data = {
+            'action': f"{request.method} {request.path}",
+            'user': str(user) if user and not isinstance(user, AnonymousUser) else 'Anonymous',
+            'ip': info['client_ip'],
+            'user_agent': info['user_agent'][:200],
+            'status_code': status_code,
+            'is_error': is_error,
+        }
+        logger.log(
+            logging.WARNING if is_error else logging.INFO,
+            f"API Response: {request.method} {request.path} "
+            f"-> {status_code} by {audit_data['user']} from {audit_data['ip']}",
+            extra={'event': 'api_response', 'method': request.method, 'path': request.path,
+                   **audit_data},
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
         """
-        Procesa la respuesta para completar la auditoría
+        Audita acceso a vistas que manejan datos sensibles
         """
-        if hasattr(request, 'audit_info'):
-            # Registrar respuesta para endpoints sensibles
-            status_code = response.status_code
-            
-            # Solo registrar respuestas de error o acciones importantes
-            if status_code >= 400 or request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
-                user = getattr(request, 'user', AnonymousUser())
-                
-                audit_data = {
-                    'action': f"{request.method} {request.path}",
-                    'user': str(user) if user and not isinstance(user, AnonymousUser) else 'Anonymous',
-                    'ip': request.audit_info.get('client_ip'),
-                    'user_agent': request.audit_info.get('user_agent', '')[:200],
-                    'status_code': status_code,
-                    'is_error': status_code >= 400,
-                }
-                
-                log_level = logging.WARNING if status_code >= 400 else logging.INFO
-                logger.log(
-                    log_level,
-                    f"API Response: {request.method} {request.path} "
-                    f"-> {status_code} by {audit_data['user']} from {audit_data['ip']}"
-                )
-        
-        return response
-    
+        info = getattr(request, 'audit_info', None)
+        if not info or not (info['enabled'] and info['sampled']):
+            return None
+        view_module = getattr(view_func, '__module__', '')
+        if not view_module.startswith(self.data_access_views):
+            return None
+        user = getattr(request, 'user', AnonymousUser())
+        logger.info(
+            f"Sensitive data access: {view_func.__name__} "
+            f"by {user} from {info['client_ip']} "
+            f"args={view_args} kwargs={view_kwargs}",
+            extra={'event': 'data_access', 'view': f"{view_module}.{view_func.__name__}",
+                   'user': str(user), 'ip': info['client_ip'], 'view_kwargs': view_kwargs},
+        )
+        return None
+
     def process_exception(self, request, exception):
         """
-        Registra excepciones para auditoría
+        Registra excepciones para auditoría (siempre, sin muestreo)
         """
         user = getattr(request, 'user', AnonymousUser())
         client_ip = getattr(request, 'audit_info', {}).get('client_ip', 'Unknown')
-        
+
         logger.error(
             f"Exception in {request.method} {request.path}: {str(exception)} "
             f"by {user} from {client_ip}",
-            exc_info=True
+            exc_info=True,
+            extra={'event': 'exception', 'method': request.method, 'path': request.path,
+                   'user': str(user), 'ip': client_ip},
         )
 
 
-class AuthenticationAuditMiddleware(MiddlewareMixin):
-    """
-    Middleware específico para auditar eventos de autenticación
-    """
-    
-    def process_request(self, request):
-        """
-        Audita intentos de login y acciones de autenticación
-        """
-        # Detectar intentos de login
-        if request.path in ['/api/auth/login/', '/admin/login/']:
-            if request.method == 'POST':
-                # Capturar información del intento de login
-                client_ip, _ = get_client_ip(request)
-                user_agent = request.META.get('HTTP_USER_AGENT', 'Unknown')
-                
-                logger.info(
-                    f"Login attempt from {client_ip} "
-                    f"({user_agent[:100]}) to {request.path}"
-                )
-        
-        # Detectar logout
-        elif request.path in ['/api/auth/logout/', '/admin/logout/']:
-            user = getattr(request, 'user', AnonymousUser())
-            client_ip, _ = get_client_ip(request)
-            
-            if user and not isinstance(user, AnonymousUser):
-                logger.info(
-                    f"Logout: {user} from {client_ip}"
-                )
-
-
-class DataAccessAuditMiddleware(MiddlewareMixin):
-    """
-    Middleware para auditar acceso a datos sensibles
-    """
-    
-    def process_view(self, request, view_func, view_args, view_kwargs):
-        """
-        Audita acceso a vistas que manejan datos sensibles
-        """
-        # Rutas que manejan datos sensibles
-        sensitive_views = [
-            'notes.views', 'users.views'
-        ]
-        
-        view_module = getattr(view_func, '__module__', '')
-        
-        if any(module in view_module for module in sensitive_views):
-            user = getattr(request, 'user', AnonymousUser())
-            client_ip, _ = get_client_ip(request)
-            
-            # Registrar acceso a datos sensibles
-            logger.info(
-                f"Sensitive data access: {view_func.__name__} "
-                f"by {user} from {client_ip} "
-                f"args={view_args} kwargs={view_kwargs}"
-            )
+def _signal_context(request):
+    """(ip, user_agent) del request de una señal de auth; 'Unknown' si no hay"""
+    if request is None:
+        return 'Unknown', 'Unknown'
+    try:
+        info = request_context(request)
+    except Exception:
+        # No romper flujo si el request es incompleto o falla ipware
+        return 'Unknown', 'Unknown'
+    return info['client_ip'] or 'Unknown', info['user_agent']
 
 
 def log_successful_login(sender, user, request, **kwargs):
     """
     Signal handler para loguear logins exitosos
     """
-    client_ip = 'Unknown'
-    user_agent = 'Unknown'
-    try:
-        if request is not None:
-            ip, _ = get_client_ip(request)
-            client_ip = ip or 'Unknown'
-            user_agent = request.META.get('HTTP_USER_AGENT', 'Unknown')
-    except Exception:
-        # No romper flujo si no hay request o falla ipware
-        pass
-    
+    if not category_enabled('auth'):
+        return
+    client_ip, user_agent = _signal_context(request)
     logger.info(
         f"Successful login: {user.username} from {client_ip} "
-        f"({user_agent[:100]})"
+        f"({user_agent[:100]})",
+        extra={'event': 'login_success', 'user': user.username,
+               'ip': client_ip, 'user_agent': user_agent[:200]},
     )
 
 
@@ -192,20 +292,16 @@ def log_failed_login(sender, credentials, request, **kwargs):
     """
     Signal handler para loguear intentos de login fallidos
     """
-    client_ip = 'Unknown'
-    user_agent = 'Unknown'
-    try:
-        if request is not None:
-            ip, _ = get_client_ip(request)
-            client_ip = ip or 'Unknown'
-            user_agent = request.META.get('HTTP_USER_AGENT', 'Unknown')
-    except Exception:
-        pass
+    if not category_enabled('auth'):
+        return
+    client_ip, user_agent = _signal_context(request)
     username = credentials.get('username', 'Unknown')
-    
+
     logger.warning(
         f"Failed login attempt: username='{username}' from {client_ip} "
-        f"({user_agent[:100]})"
+        f"({user_agent[:100]})",
+        extra={'event': 'login_failed', 'username': username,
+               'ip': client_ip, 'user_agent': user_agent[:200]},
     )
 
 
@@ -213,34 +309,17 @@ def log_password_change(sender, user, **kwargs):
     """
     Signal handler para loguear cambios de contraseña
     """
-    logger.info(f"Password changed for user: {user.username}")
+    if not category_enabled('auth'):
+        return
+    logger.info(f"Password changed for user: {user.username}",
+                extra={'event': 'password_change', 'user': user.username})
 
 
 def log_user_logout(sender, user, request, **kwargs):
     """
     Signal handler para loguear logout de usuarios
     """
-    if user:
-        client_ip = 'Unknown'
-        try:
-            if request is not None:
-                ip, _ = get_client_ip(request)
-                client_ip = ip or 'Unknown'
-        except Exception:
-            pass
-        logger.info(f"User logout: {user.username} from {client_ip}")
-
-
-# Conectar signals de Django auth para auditoría automática
-try:
-    from django.contrib.auth.signals import (
-        user_logged_in, user_logged_out, user_login_failed
-    )
-    from django.contrib.auth import user_logged_in as auth_logged_in
-    
-    user_logged_in.connect(log_successful_login)
-    user_logged_out.connect(log_user_logout)
-    user_login_failed.connect(log_failed_login)
-    
-except ImportError:
-    logger.warning("Could not import Django auth signals for audit logging")
\ No newline at end of file
+    if user and category_enabled('auth'):
+        client_ip, _ = _signal_context(request)
+        logger.info(f"User logout: {user.username} from {client_ip}",
+                    extra={'event': 'logout', 'user': user.username, 'ip': client_ip})
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(help_text='Relativo a AUDIT_ARCHIVE_DIR', max_length=255, unique=True)),
+                ('day', models.DateField()),
+                ('compression', models.CharField(max_length=10)),
+                ('first_id', models.BigIntegerField()),
+                ('last_id', models.BigIntegerField()),
+                ('first_timestamp', models.DateTimeField()),
+                ('last_timestamp', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('size_bytes', models.PositiveBigIntegerField()),
+                ('sha256', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['day', 'first_id'],
+                'indexes': [models.Index(fields=['last_timestamp', 'first_timestamp'], name='audit_archive_range')],
+            },
+        ),
+    ]
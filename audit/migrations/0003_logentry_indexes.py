@@ -0,0 +1,49 @@
+"""
+Índices compuestos sobre auditlog_logentry para el listado de auditoría
+
+LogEntry es un modelo de django-auditlog, así que los índices se crean
+desde aquí con el schema editor en lugar de con AddIndex. Todos terminan
+en (timestamp, id), la clave de la paginación por cursor
+(audit/pagination.py): un filtro por actor, modelo o acción más el rango de
+fechas se resuelve con un recorrido del índice ya ordenado. En PostgreSQL
+se crean con CONCURRENTLY para no bloquear las escrituras de auditoría.
+"""
+
+from django.db import migrations, models
+
+INDEXES = [
+    models.Index(fields=['timestamp', 'id'], name='audit_logentry_ts_id'),
+    models.Index(fields=['actor', 'timestamp', 'id'], name='audit_logentry_actor_ts'),
+    models.Index(fields=['content_type', 'timestamp', 'id'], name='audit_logentry_ct_ts'),
+    models.Index(fields=['action', 'timestamp', 'id'], name='audit_logentry_action_ts'),
+]
+
+
+def _options(schema_editor):
+    return {'concurrently': True} if schema_editor.connection.vendor == 'postgresql' else {}
+
+
+def add_indexes(apps, schema_editor):
+    model = apps.get_model('auditlog', 'LogEntry')
+    for index in INDEXES:
+        schema_editor.add_index(model, index, **_options(schema_editor))
+
+
+def remove_indexes(apps, schema_editor):
+    model = apps.get_model('auditlog', 'LogEntry')
+    for index in INDEXES:
+        schema_editor.remove_index(model, index, **_options(schema_editor))
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('auditlog', '0017_add_actor_email'),
+        ('audit', '0002_archive_segment'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, remove_indexes),
+    ]
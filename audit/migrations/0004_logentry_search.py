@@ -0,0 +1,37 @@
+"""
+Índice de búsqueda sobre auditlog_logentry para ?search= (audit/search.py)
+
+PostgreSQL: pg_trgm y un índice GIN sobre UPPER(object_repr) (y otro sobre
+el username de los usuarios), creados con CONCURRENTLY. SQLite: tabla FTS5
+con tokenizador trigram y los triggers que la mantienen, llenada con las
+filas existentes. En otros motores no hace nada y la búsqueda sigue con
+icontains.
+"""
+
+from django.conf import settings
+from django.db import migrations
+
+from audit import search
+
+
+def install(apps, schema_editor):
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    search.install(schema_editor.connection, user_table)
+
+
+def uninstall(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('audit', '0003_logentry_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
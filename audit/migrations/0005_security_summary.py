@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_logentry_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditSecuritySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('failed_logins', models.PositiveIntegerField(default=0)),
+                ('successful_logins', models.PositiveIntegerField(default=0)),
+                ('alerts', models.PositiveIntegerField(default=0)),
+                ('details', models.JSONField(default=dict)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period_end'], name='audit_security_period')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0005_security_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditRetentionJob',
+            fields=[
+                ('id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('status', models.CharField(default='pending', max_length=10)),
+                ('active', models.BooleanField(default=True)),
+                ('cutoff', models.DateTimeField()),
+                ('deleted_count', models.PositiveBigIntegerField(default=0)),
+                ('total', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('active', True)), fields=('active',), name='single_active_audit_retention_job')],
+            },
+        ),
+    ]
@@ -0,0 +1,150 @@
+from django.db import models
+
+
+class AuditHourlyRollup(models.Model):
+	"""
+	Número de LogEntry por hora (UTC) × acción × modelo. Lo mantiene
+	`manage.py compact_audit_rollups` (ver audit/rollups.py); sirve los totales,
+	la actividad por hora y por día y el ranking de modelos.
+	"""
+	bucket = models.DateTimeField()
+	action = models.PositiveSmallIntegerField()
+	content_type = models.ForeignKey('contenttypes.ContentType', on_delete=models.CASCADE, related_name='+')
+	count = models.PositiveBigIntegerField(default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(
+				fields=['bucket', 'action', 'content_type'], name='unique_audit_hourly_rollup'
+			),
+		]
+
+	def __str__(self):
+		return f"{self.bucket:%Y-%m-%d %H}h {self.content_type_id}/{self.action}: {self.count}"
+
+
+class AuditActorRollup(models.Model):
+	"""
+	Número de LogEntry por hora (UTC) × acción × modelo × actor, para las
+	estadísticas por usuario. actor_id = 0 agrupa las entradas sin actor.
+	Sin FK: los contadores de un usuario borrado se conservan.
+	"""
+	bucket = models.DateTimeField()
+	action = models.PositiveSmallIntegerField()
+	content_type = models.ForeignKey('contenttypes.ContentType', on_delete=models.CASCADE, related_name='+')
+	actor_id = models.BigIntegerField(default=0)
+	count = models.PositiveBigIntegerField(default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(
+				fields=['bucket', 'action', 'content_type', 'actor_id'], name='unique_audit_actor_rollup'
+			),
+		]
+		indexes = [
+			models.Index(fields=['actor_id', 'bucket'], name='audit_actor_rollup_actor'),
+		]
+
+	def __str__(self):
+		return f"{self.bucket:%Y-%m-%d %H}h actor {self.actor_id} {self.content_type_id}/{self.action}: {self.count}"
+
+
+class AuditRollupState(models.Model):
+	"""Fila única: mayor id de LogEntry ya sumado a los rollups"""
+	last_entry_id = models.BigIntegerField(default=0)
+	updated_at = models.DateTimeField(auto_now=True)
+
+	def __str__(self):
+		return f"Rollups hasta LogEntry #{self.last_entry_id}"
+
+
+class AuditArchiveSegment(models.Model):
+	"""
+	Índice de los archivos de LogEntry archivadas (audit/archive.py): un
+	archivo NDJSON comprimido por día (UTC) y lote de archivado
+	"""
+	path = models.CharField(max_length=255, unique=True, help_text="Relativo a AUDIT_ARCHIVE_DIR")
+	day = models.DateField()
+	compression = models.CharField(max_length=10)
+	first_id = models.BigIntegerField()
+	last_id = models.BigIntegerField()
+	first_timestamp = models.DateTimeField()
+	last_timestamp = models.DateTimeField()
+	count = models.PositiveIntegerField()
+	size_bytes = models.PositiveBigIntegerField()
+	sha256 = models.CharField(max_length=64)
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ['day', 'first_id']
+		indexes = [
+			models.Index(fields=['last_timestamp', 'first_timestamp'], name='audit_archive_range'),
+		]
+
+	def __str__(self):
+		return f"{self.path} ({self.count} entradas)"
+
+
+class AuditSecuritySummary(models.Model):
+	"""
+	Resumen de los eventos de autenticación de un periodo, volcado por cada
+	proceso desde el detector en memoria (audit/security.py). Solo se guardan
+	periodos con actividad; el dashboard suma estos contadores.
+	"""
+	period_start = models.DateTimeField()
+	period_end = models.DateTimeField()
+	failed_logins = models.PositiveIntegerField(default=0)
+	successful_logins = models.PositiveIntegerField(default=0)
+	alerts = models.PositiveIntegerField(default=0)
+	# Alertas del periodo y principales IPs/usuarios con fallos en la ventana
+	details = models.JSONField(default=dict)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['period_end'], name='audit_security_period'),
+		]
+
+	def __str__(self):
+		return (f"{self.period_start:%Y-%m-%d %H:%M} - {self.period_end:%H:%M}: "
+				f"{self.failed_logins} fallidos, {self.alerts} alertas")
+
+
+class AuditRetentionJob(models.Model):
+	"""
+	Trabajo de purga lanzado desde /audit/api/cleanup/ (audit/retention.py).
+	En BD y no en la caché para que el estado y el cerrojo se compartan entre
+	workers: como mucho una fila tiene active=True.
+	"""
+	id = models.CharField(max_length=32, primary_key=True)
+	status = models.CharField(max_length=10, default='pending')
+	active = models.BooleanField(default=True)
+	cutoff = models.DateTimeField()
+	deleted_count = models.PositiveBigIntegerField(default=0)
+	total = models.PositiveBigIntegerField(null=True, blank=True)
+	error = models.TextField(null=True, blank=True)
+	started_at = models.DateTimeField()
+	finished_at = models.DateTimeField(null=True, blank=True)
+	# Latido: se actualiza con cada lote; un trabajo activo sin latido quedó huérfano
+	updated_at = models.DateTimeField(auto_now=True)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(
+				fields=['active'], condition=models.Q(active=True), name='single_active_audit_retention_job'
+			),
+		]
+
+	def as_dict(self):
+		return {
+			'id': self.id,
+			'status': self.status,
+			'cutoff': self.cutoff.isoformat(),
+			'deleted_count': self.deleted_count,
+			'total': self.total,
+			'started_at': self.started_at.isoformat(),
+			'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+			'error': self.error,
+		}
+
+	def __str__(self):
+		return f"Purga {self.id} ({self.status}): {self.deleted_count} borradas"
@@ -0,0 +1,122 @@
+"""
+Paginación por cursor del listado de logs de auditoría
+
+Con PageNumberPagination cada página hace un COUNT(*) del filtro y un
+OFFSET que la base de datos tiene que recorrer: la página 10.000 de un log
+de millones de filas cuesta tanto como leer las anteriores. Aquí cada
+página continúa desde la clave (timestamp, id) de la última fila vista,
+que resuelven los índices compuestos de audit/migrations/0003, así que el
+costo por página es constante.
+
+?page=N sigue usando la paginación numerada (con count y num_pages), al
+igual que un ?ordering distinto de timestamp.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from users.pagination import CustomPageNumberPagination
+
+
+class AuditLogCursorPagination(BasePagination):
+    """Keyset sobre (timestamp, id), de más reciente a más antiguo por defecto"""
+    cursor_query_param = 'cursor'
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = request.query_params.get('ordering', '-timestamp')
+        self.legacy = None
+        if 'page' in request.query_params or ordering not in ('timestamp', '-timestamp'):
+            self.legacy = CustomPageNumberPagination()
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        self.descending = ordering == '-timestamp'
+        self.page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        # Al retroceder se recorre en sentido inverso y se da la vuelta al final
+        forward = cursor is None or not cursor['reverse']
+        descending = self.descending == forward
+
+        if cursor is not None:
+            timestamp, pk = cursor['position']
+            # La cota simple sobre timestamp permite recorrer el índice desde
+            # la posición; el OR solo desempata dentro del mismo timestamp
+            if descending:
+                queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(id__lt=pk), timestamp__lte=timestamp)
+            else:
+                queryset = queryset.filter(Q(timestamp__gt=timestamp) | Q(id__gt=pk), timestamp__gte=timestamp)
+        order = ('-timestamp', '-id') if descending else ('timestamp', 'id')
+        rows = list(queryset.order_by(*order)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if not forward:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if forward else True
+        self.has_previous = cursor is not None and (has_more if not forward else True)
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return {
+                'position': (datetime.fromisoformat(data['t']), int(data['i'])),
+                'reverse': bool(data.get('r')),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        # Filas de .values() (el listado) o instancias de LogEntry
+        if isinstance(row, dict):
+            timestamp, pk = row['timestamp'], row['id']
+        else:
+            timestamp, pk = row.timestamp, row.pk
+        data = {'t': timestamp.isoformat(), 'i': pk, 'r': int(reverse)}
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+            'page_size': self.page_size,
+        })
@@ -0,0 +1,170 @@
+"""
+Purga de LogEntry por política de retención
+
+En lugar de un único DELETE sobre toda la tabla (que con el Collector de
+Django puede cargar cada fila y mantener bloqueos largos), purge() borra en
+lotes ordenados por clave primaria, con una transacción corta por lote y una
+pausa entre lotes para dejar pasar al resto de escrituras. Informa el
+progreso con un callback y al terminar borra los rollups de las horas
+purgadas (ver audit/rollups.py).
+
+Lo ejecutan `manage.py purge_audit_logs` y el endpoint /audit/api/cleanup/,
+que lo lanza como trabajo en segundo plano. El estado y el cerrojo del
+trabajo están en la BD (AuditRetentionJob): con varios workers solo corre
+una purga y cualquiera responde al sondeo del progreso.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from . import rollups, stats_cache
+from .models import AuditRetentionJob
+
+logger = logging.getLogger('auditlog')
+
+# Un trabajo activo sin progreso en este tiempo se da por abandonado
+STALE_AFTER = timedelta(hours=1)
+
+
+def retention_settings():
+    conf = getattr(settings, 'AUDIT_SETTINGS', {})
+    return {
+        'retain_days': conf.get('RETAIN_LOGS_DAYS', 365),
+        'batch_size': conf.get('RETENTION_BATCH_SIZE', 5000),
+        'sleep': conf.get('RETENTION_SLEEP_SECONDS', 0.1),
+    }
+
+
+def retention_cutoff(retain_days=None, now=None):
+    """
+    Fecha límite de la retención, redondeada a la hora (UTC) para que los
+    rollups de las horas purgadas se puedan borrar completos
+    """
+    if retain_days is None:
+        retain_days = retention_settings()['retain_days']
+    return rollups.floor_hour((now or timezone.now()) - timedelta(days=retain_days))
+
+
+def purge(cutoff, batch_size=None, sleep=None, progress=None):
+    """
+    Borra las LogEntry con timestamp < cutoff en lotes de `batch_size` ids,
+    durmiendo `sleep` segundos entre lotes. `progress(deleted, total)` se
+    llama tras cada lote. Devuelve el número de entradas borradas.
+    """
+    defaults = retention_settings()
+    batch_size = batch_size or defaults['batch_size']
+    sleep = defaults['sleep'] if sleep is None else sleep
+
+    old = LogEntry.objects.filter(timestamp__lt=cutoff)
+    bounds = old.aggregate(total=Count('id'), last=Max('id'))
+    total, last = bounds['total'], bounds['last']
+    deleted = 0
+    lower = 0
+    while total and lower < last:
+        ids = old.filter(id__gt=lower, id__lte=last).order_by('id').values_list('id', flat=True)
+        upper = next(iter(ids[batch_size - 1:batch_size]), None) or last
+        with transaction.atomic():
+            deleted += old.filter(id__gt=lower, id__lte=upper).delete()[0]
+        lower = upper
+        if progress:
+            progress(deleted, total)
+        if sleep and lower < last:
+            time.sleep(sleep)
+
+    rollups.forget_before(cutoff)
+    stats_cache.invalidate()
+    logger.info(
+        f"Retention purge: {deleted} audit log entries older than {cutoff.isoformat()} deleted",
+        extra={'event': 'retention_purge', 'deleted': deleted, 'cutoff': cutoff.isoformat()},
+    )
+    return deleted
+
+
+def get_job(job_id):
+    job = AuditRetentionJob.objects.filter(pk=job_id).first()
+    return job.as_dict() if job else None
+
+
+def running_job():
+    job = AuditRetentionJob.objects.filter(active=True).first()
+    return job.as_dict() if job else None
+
+
+def _save_job(job, **fields):
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.save(update_fields=[*fields, 'updated_at'])
+
+
+def _finish_job(job, status, error=None):
+    _save_job(job, status=status, error=error, active=False, finished_at=timezone.now())
+
+
+def _spawn(target):
+    def run():
+        # Conexión propia del hilo; se cierra al terminar
+        close_old_connections()
+        try:
+            target()
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, name='audit-retention', daemon=True).start()
+
+
+def _claim(cutoff):
+    """
+    Crea el trabajo activo, o devuelve (trabajo en curso, False). La
+    restricción única sobre active decide entre workers que lo lanzan a la vez.
+    """
+    with transaction.atomic():
+        current = AuditRetentionJob.objects.select_for_update().filter(active=True).first()
+        if current is not None:
+            if current.updated_at > timezone.now() - STALE_AFTER:
+                return current, False
+            # Huérfano: el proceso que lo ejecutaba terminó sin cerrarlo
+            _finish_job(current, 'failed', 'abandoned')
+        try:
+            with transaction.atomic():
+                job = AuditRetentionJob.objects.create(
+                    id=uuid.uuid4().hex, cutoff=cutoff, started_at=timezone.now(),
+                )
+        except IntegrityError:
+            return AuditRetentionJob.objects.get(active=True), False
+    return job, True
+
+
+def start_job(cutoff, batch_size=None, sleep=None):
+    """
+    Lanza purge() en un hilo y devuelve (job, creado). Solo hay un trabajo a
+    la vez en todos los workers: si ya hay uno en curso se devuelve ese con
+    creado=False.
+    """
+    job, created = _claim(cutoff)
+    if not created:
+        return job.as_dict(), False
+
+    def progress(deleted, total):
+        _save_job(job, status='running', deleted_count=deleted, total=total)
+
+    def run():
+        try:
+            _save_job(job, status='running')
+            deleted = purge(cutoff, batch_size, sleep, progress)
+            _save_job(job, deleted_count=deleted)
+            _finish_job(job, 'done')
+        except Exception as exc:
+            logger.exception("Retention purge failed", extra={'event': 'retention_purge_failed'})
+            _finish_job(job, 'failed', str(exc))
+
+    _spawn(run)
+    return job.as_dict(), True
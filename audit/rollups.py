@@ -0,0 +1,265 @@
+"""
+Rollups de auditoría: conteos de LogEntry por hora
+
+AuditHourlyRollup (hora × acción × modelo) y AuditActorRollup (hora ×
+acción × modelo × actor) se actualizan de forma incremental con compact(),
+que suma las entradas nuevas desde la marca AuditRollupState.last_entry_id.
+Lo ejecuta `manage.py compact_audit_rollups` (cron, cada pocos minutos).
+
+grouped() responde las estadísticas combinando los rollups de las horas
+completas del rango con la tabla LogEntry solo para las horas parciales de
+los extremos y las entradas aún no compactadas, así que el resultado es
+exacto y su costo depende del rango pedido, no del volumen del log.
+
+Las horas (bucket) están en UTC; local_counts() deriva de ellas las horas y
+días locales en zonas con desfase de horas enteras (America/Mexico_City) y
+agrupa LogEntry con la zona en las demás (Asia/Kolkata).
+"""
+
+from collections import Counter
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractHour, TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import AuditActorRollup, AuditHourlyRollup, AuditRollupState
+
+HOUR = timedelta(hours=1)
+DIMENSIONS = ('bucket', 'action', 'content_type', 'actor_id')
+
+
+def rollup_settings():
+    conf = getattr(settings, 'AUDIT_SETTINGS', {})
+    return {
+        'batch_size': conf.get('ROLLUP_BATCH_SIZE', 50000),
+        'lag': conf.get('ROLLUP_LAG_SECONDS', 60),
+    }
+
+
+def floor_hour(moment):
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(moment):
+    floor = floor_hour(moment)
+    return floor if floor == moment else floor + HOUR
+
+
+def watermark():
+    """Mayor id de LogEntry incluido en los rollups (0 si nunca se compactó)"""
+    return AuditRollupState.objects.values_list('last_entry_id', flat=True).first() or 0
+
+
+def _state():
+    state = AuditRollupState.objects.select_for_update().first()
+    return state or AuditRollupState.objects.create()
+
+
+def _upsert(model, fields, counts):
+    """INSERT ... ON CONFLICT DO UPDATE SET count = count + excluded.count"""
+    if not counts:
+        return
+    opts = model._meta
+    columns = [opts.get_field(name).column for name in fields]
+    bucket_field = opts.get_field('bucket')
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+    sql = (
+        f"INSERT INTO {table} ({', '.join(map(qn, columns))}, {qn('count')}) "
+        f"VALUES ({', '.join(['%s'] * (len(columns) + 1))}) "
+        f"ON CONFLICT ({', '.join(map(qn, columns))}) "
+        f"DO UPDATE SET {qn('count')} = {table}.{qn('count')} + EXCLUDED.{qn('count')}"
+    )
+    params = [
+        (bucket_field.get_db_prep_value(key[0], connection), *key[1:], count)
+        for key, count in counts.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def compact(batch_size=None, lag=None):
+    """
+    Suma a los rollups las LogEntry con id mayor que la marca, por lotes de
+    id con una transacción corta cada uno. Solo avanza hasta entradas con más
+    de `lag` segundos, para no adelantarse a transacciones aún abiertas con
+    ids menores. Devuelve el número de entradas procesadas.
+    """
+    defaults = rollup_settings()
+    batch_size = batch_size or defaults['batch_size']
+    lag = defaults['lag'] if lag is None else lag
+    horizon = timezone.now() - timedelta(seconds=lag)
+    processed = 0
+    while True:
+        with transaction.atomic():
+            state = _state()
+            lower = state.last_entry_id
+            pending = LogEntry.objects.filter(id__gt=lower, timestamp__lt=horizon).values_list('id', flat=True)
+            upper = (
+                next(iter(pending.order_by('id')[batch_size - 1:batch_size]), None)
+                or pending.order_by('-id').first()
+            )
+            if upper is None:
+                return processed
+            rows = (
+                LogEntry.objects.filter(id__gt=lower, id__lte=upper)
+                .annotate(bucket=TruncHour('timestamp', tzinfo=dt_timezone.utc))
+                .values('bucket', 'action', 'content_type', 'actor')
+                .annotate(count=Count('id')).order_by()
+            )
+            hourly, by_actor = Counter(), Counter()
+            for row in rows:
+                key = (row['bucket'], row['action'], row['content_type'])
+                hourly[key] += row['count']
+                by_actor[(*key, row['actor'] or 0)] += row['count']
+                processed += row['count']
+            _upsert(AuditHourlyRollup, ('bucket', 'action', 'content_type'), hourly)
+            _upsert(AuditActorRollup, ('bucket', 'action', 'content_type', 'actor_id'), by_actor)
+            state.last_entry_id = upper
+            state.save(update_fields=['last_entry_id', 'updated_at'])
+
+
+def rebuild(batch_size=None, lag=None):
+    """Vacía los rollups y los recalcula desde LogEntry"""
+    with transaction.atomic():
+        _state()
+        AuditHourlyRollup.objects.all().delete()
+        AuditActorRollup.objects.all().delete()
+        AuditRollupState.objects.update(last_entry_id=0)
+    return compact(batch_size, lag)
+
+
+def forget_before(cutoff):
+    """
+    Borra los buckets anteriores a `cutoff` (usar tras purgar LogEntry hasta
+    una hora exacta, ver floor_hour)
+    """
+    AuditHourlyRollup.objects.filter(bucket__lt=cutoff).delete()
+    AuditActorRollup.objects.filter(bucket__lt=cutoff).delete()
+
+
+def _raw_filters(filters):
+    raw = {}
+    for name, value in filters.items():
+        if name == 'actor_id':
+            raw.update({'actor__isnull': True} if value == 0 else {'actor_id': value})
+        else:
+            raw[name] = value
+    return raw
+
+
+def _raw_fields(fields):
+    return ['actor' if name == 'actor_id' else name for name in fields]
+
+
+def grouped(fields, start=None, end=None, mark=None, **filters):
+    """
+    Conteos de LogEntry con timestamp en [start, end) agrupados por `fields`
+    (subconjunto de DIMENSIONS) como {tupla de valores: count}. Los filtros
+    admiten action, content_type y actor_id (0 = sin actor). `mark` evita
+    volver a leer la marca cuando se hacen varias consultas seguidas.
+    """
+    fields = tuple(fields)
+    unknown = set(fields) | set(filters)
+    unknown -= set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Dimensiones desconocidas: {', '.join(sorted(unknown))}")
+    mark = watermark() if mark is None else mark
+    model = AuditActorRollup if 'actor_id' in fields or 'actor_id' in filters else AuditHourlyRollup
+
+    # Horas completas dentro del rango: rollups
+    first_full = ceil_hour(start) if start else None
+    last_full = floor_hour(end) if end else None
+    if first_full and last_full and first_full > last_full:
+        # Rango dentro de una sola hora: todo sale de LogEntry
+        first_full = last_full = None
+        mark = None
+    rollup = model.objects.filter(**filters)
+    if mark is None:
+        rollup = rollup.none()
+    if first_full:
+        rollup = rollup.filter(bucket__gte=first_full)
+    if last_full:
+        rollup = rollup.filter(bucket__lt=last_full)
+
+    # Extremos parciales y entradas sin compactar: LogEntry
+    raw_base = LogEntry.objects.filter(**_raw_filters(filters))
+    if 'bucket' in fields:
+        raw_base = raw_base.annotate(bucket=TruncHour('timestamp', tzinfo=dt_timezone.utc))
+    parts = []
+    if first_full:
+        parts.append(raw_base.filter(timestamp__gte=start, timestamp__lt=first_full, id__lte=mark))
+    if last_full:
+        parts.append(raw_base.filter(timestamp__gte=last_full, id__lte=mark))
+    tail = raw_base if mark is None else raw_base.filter(id__gt=mark)
+    if start:
+        tail = tail.filter(timestamp__gte=start)
+    parts.append(tail)
+    if end:
+        parts = [part.filter(timestamp__lt=end) for part in parts]
+
+    counts = Counter()
+    if fields:
+        rollup = rollup.values(*fields).annotate(n=Sum('count')).order_by().values_list(*fields, 'n')
+        raw = [
+            part.values(*_raw_fields(fields)).annotate(n=Count('id')).order_by()
+            .values_list(*_raw_fields(fields), 'n')
+            for part in parts
+        ]
+        raw = raw[0].union(*raw[1:], all=True) if len(raw) > 1 else raw[0]
+        for source in (rollup, raw):
+            for *key, n in source:
+                if 'actor_id' in fields:
+                    key[fields.index('actor_id')] = key[fields.index('actor_id')] or 0
+                counts[tuple(key)] += n
+    else:
+        counts[()] = rollup.aggregate(n=Sum('count'))['n'] or 0
+        for part in parts:
+            counts[()] += part.count()
+    return counts
+
+
+def count(start=None, end=None, mark=None, **filters):
+    """Número de LogEntry en [start, end) con los filtros de grouped()"""
+    return grouped((), start, end, mark, **filters)[()]
+
+
+def local_counts(unit, by_bucket, start=None, end=None, tzinfo=None, **filters):
+    """
+    Suma un grouped(('bucket',), start, end, **filters) por hora ('hour') o
+    día ('date') local. Si la zona no está a horas completas de UTC
+    (Asia/Kolkata, America/St_Johns), una hora UTC cae en dos horas locales:
+    entonces se agrupa LogEntry con la zona, como stats.hourly_activity (las
+    entradas ya archivadas no cuentan en ese caso).
+    """
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    counts = Counter()
+    for (bucket,), n in by_bucket.items():
+        local = bucket.astimezone(tzinfo)
+        if local.minute or local.second:
+            return _raw_local_counts(unit, start, end, tzinfo, **filters)
+        counts[local.hour if unit == 'hour' else local.date()] += n
+    return counts
+
+
+def _raw_local_counts(unit, start, end, tzinfo, **filters):
+    extract = ExtractHour if unit == 'hour' else TruncDate
+    entries = LogEntry.objects.filter(**_raw_filters(filters))
+    if start:
+        entries = entries.filter(timestamp__gte=start)
+    if end:
+        entries = entries.filter(timestamp__lt=end)
+    return Counter(dict(
+        entries.annotate(local=extract('timestamp', tzinfo=tzinfo))
+        .values('local').annotate(n=Count('id')).order_by()
+        .values_list('local', 'n')
+    ))
+
+
+def local_day_start(day, tzinfo=None):
+    """Inicio (aware) del día local `day`"""
+    return datetime.combine(day, dt_time.min, tzinfo or timezone.get_current_timezone())
@@ -0,0 +1,184 @@
+"""
+Búsqueda indexada del log de auditoría (?search= del listado y la exportación)
+
+SearchFilter traduce ?search= a un icontains sobre actor__username,
+object_repr y content_type__model unidos con OR: un recorrido completo de
+auditlog_logentry (más el JOIN con usuarios) por cada búsqueda. Aquí cada
+término se resuelve con índices:
+
+- actor y modelo: primero se buscan los usuarios y content types que
+  coinciden (tablas pequeñas) y se filtra LogEntry por sus ids, con los
+  índices de actor y content_type.
+- object_repr: en PostgreSQL, índice GIN de pg_trgm sobre
+  UPPER(object_repr), el mismo que usa icontains; en SQLite, una tabla FTS5
+  con tokenizador trigram (audit_logentry_fts) que los triggers mantienen
+  al insertar, borrar o modificar LogEntry.
+
+La semántica es la de SearchFilter: cada término debe aparecer en alguno de
+los campos, sin distinguir mayúsculas. Si el índice no existe (otro motor,
+SQLite sin FTS5 o términos de menos de 3 caracteres, que el trigrama no
+indexa) se usa el icontains de siempre sobre object_repr. En SQLite también
+para los términos que aparecen en muchas filas (DENSE_MATCHES): ahí el
+recorrido en orden de timestamp encuentra la página enseguida.
+"""
+
+import operator
+from functools import reduce
+
+from auditlog.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+FTS_TABLE = 'audit_logentry_fts'
+TRIGRAM_INDEX = 'audit_logentry_repr_trgm'
+USERNAME_TRIGRAM_INDEX = 'audit_username_trgm'
+# Triggers de SQLite: inserción, borrado y modificación de object_repr
+TRIGGERS = ('audit_logentry_fts_ai', 'audit_logentry_fts_ad', 'audit_logentry_fts_au')
+MIN_TRIGRAM_LENGTH = 3
+# Con más coincidencias que esto un término es "denso": recorrer el índice
+# de timestamp con icontains llena la página antes que ordenar todas las
+# filas que devuelve FTS5 (en SQLite no hay estadísticas para decidirlo)
+DENSE_MATCHES = 10000
+
+_available = {}
+
+
+def _sqlite_statements(table):
+    fts = FTS_TABLE
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"object_repr, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGERS[0]} AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, object_repr) VALUES (new.id, new.object_repr); END",
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGERS[1]} AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, object_repr) VALUES ('delete', old.id, old.object_repr); END",
+        f"CREATE TRIGGER IF NOT EXISTS {TRIGGERS[2]} AFTER UPDATE OF object_repr ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, object_repr) VALUES ('delete', old.id, old.object_repr); "
+        f"INSERT INTO {fts}(rowid, object_repr) VALUES (new.id, new.object_repr); END",
+    ]
+
+
+def sqlite_fts_supported(connection):
+    """FTS5 con tokenizador trigram (SQLite 3.34+ compilado con FTS5)"""
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.audit_fts_probe USING fts5(x, tokenize='trigram')")
+        except Exception:
+            return False
+        cursor.execute("DROP TABLE temp.audit_fts_probe")
+    return True
+
+
+def install(connection, user_table):
+    """
+    Crea el índice de búsqueda del motor y lo llena con las filas
+    existentes (idempotente; lo usan la migración 0004 y
+    `manage.py rebuild_audit_search`). En PostgreSQL no debe correr dentro
+    de una transacción (CONCURRENTLY).
+    """
+    table = LogEntry._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            # Misma expresión que genera icontains: UPPER(col::text) LIKE UPPER(%s)
+            cursor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {TRIGRAM_INDEX} '
+                f'ON {table} USING gin ((UPPER("object_repr"::text)) gin_trgm_ops)'
+            )
+            cursor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {USERNAME_TRIGRAM_INDEX} '
+                f'ON {user_table} USING gin ((UPPER("username"::text)) gin_trgm_ops)'
+            )
+        elif connection.vendor == 'sqlite' and sqlite_fts_supported(connection):
+            for statement in _sqlite_statements(table):
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            # 'rebuild' deja miles de segmentos y cada volcado de los triggers
+            # los fusionaría; compactados en uno, insertar es ~3 veces más rápido
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    _available.pop(connection.alias, None)
+
+
+def uninstall(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {TRIGRAM_INDEX}')
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {USERNAME_TRIGRAM_INDEX}')
+        elif connection.vendor == 'sqlite':
+            for trigger in TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    _available.pop(connection.alias, None)
+
+
+def fts_available(using='default'):
+    """
+    Si la tabla FTS5 y sus triggers existen en SQLite. Se comprueba una vez
+    por proceso: si un cambio de esquema recrea auditlog_logentry, SQLite
+    borra los triggers y la búsqueda vuelve a icontains hasta reinstalarlos.
+    """
+    if using not in _available:
+        connection = connections[using]
+        found = set()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE name IN (%s)" % ', '.join(['%s'] * (len(TRIGGERS) + 1)),
+                    [FTS_TABLE, *TRIGGERS],
+                )
+                found = {row[0] for row in cursor.fetchall()}
+        _available[using] = found == {FTS_TABLE, *TRIGGERS}
+    return _available[using]
+
+
+def _fts_phrase(term):
+    # Frase entre comillas: subcadena literal, sin operadores de FTS5
+    return '"%s"' % term.replace('"', '""')
+
+
+def _dense(phrase, using):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s)",
+            [phrase, DENSE_MATCHES],
+        )
+        return cursor.fetchone()[0] >= DENSE_MATCHES
+
+
+def object_repr_filter(term, using='default'):
+    if len(term) >= MIN_TRIGRAM_LENGTH and fts_available(using):
+        phrase = _fts_phrase(term)
+        if not _dense(phrase, using):
+            return Q(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [phrase]))
+    # PostgreSQL usa aquí el índice trigram; el resto recorre la tabla
+    return Q(object_repr__icontains=term)
+
+
+def term_filter(term, using='default'):
+    """Q de LogEntry con las filas en las que `term` aparece en actor, object_repr o modelo"""
+    actors = list(
+        get_user_model().objects.using(using).filter(username__icontains=term).values_list('pk', flat=True)
+    )
+    content_types = list(
+        ContentType.objects.using(using).filter(model__icontains=term).values_list('pk', flat=True)
+    )
+    condition = object_repr_filter(term, using)
+    if actors:
+        condition |= Q(actor_id__in=actors)
+    if content_types:
+        condition |= Q(content_type_id__in=content_types)
+    return condition
+
+
+class AuditLogSearchFilter(SearchFilter):
+    """SearchFilter de LogEntry sobre actor__username, object_repr y content_type__model con índices"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return queryset.filter(reduce(operator.and_, (term_filter(term, queryset.db) for term in terms)))
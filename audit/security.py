@@ -0,0 +1,367 @@
+"""
+Detector en memoria de fuerza bruta y anomalías de autenticación
+
+Las señales user_login_failed y user_logged_in alimentan contadores de
+ventana deslizante (SECURITY_WINDOW_SECONDS, 5 minutos por defecto) por IP,
+por nombre de usuario y globales. Cada contador es un anillo de
+SECURITY_BUCKET_SECONDS por casilla en un array de enteros con su total:
+sumar un evento y leer la ventana solo recorre las casillas vencidas, sin
+consultar la BD ni los logs.
+
+Alertas (se registran en el log 'auditlog' con event='security_alert'):
+
+- ip_brute_force: SECURITY_IP_FAILURES fallos desde una IP.
+- username_brute_force: SECURITY_USERNAME_FAILURES fallos contra un
+  usuario (desde cualquier IP).
+- failure_spike: SECURITY_GLOBAL_FAILURES fallos en total (credential
+  stuffing repartido entre muchas IPs y usuarios).
+- success_after_failures: login correcto de un usuario que superaba el
+  umbral de fallos (posible contraseña adivinada).
+
+Cada alerta salta al cruzar el umbral, no en cada fallo posterior. Las IPs
+y usuarios seguidos se limitan a SECURITY_MAX_KEYS por dimensión (se olvida
+el menos reciente): un ataque con miles de IPs no agota la memoria y lo
+sigue detectando el contador global.
+
+Cuando han pasado SECURITY_FLUSH_INTERVAL segundos, el siguiente evento de
+autenticación vuelca antes de contarse un resumen del periodo en
+AuditSecuritySummary; sin eventos no se escribe nada y el resto de requests
+nunca tocan la BD por el detector. Al salir del proceso no se escribe: la BD
+puede no existir ya (la de tests se destruye antes) y se pierde como mucho
+el periodo en curso. El dashboard lee esos resúmenes. Los contadores son por
+proceso: con varios workers, cada uno detecta lo que le llega (el balanceo
+reparte un ataque entre ellos). La IP es la de trusted_client_ip: un
+X-Forwarded-For inventado no reparte los fallos entre IPs falsas.
+"""
+
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from .middleware import trusted_client_ip
+from .models import AuditSecuritySummary
+
+logger = logging.getLogger('auditlog')
+
+DEFAULT_SETTINGS = {
+    'SECURITY_WINDOW_SECONDS': 300,
+    'SECURITY_BUCKET_SECONDS': 10,
+    'SECURITY_IP_FAILURES': 10,
+    'SECURITY_USERNAME_FAILURES': 5,
+    'SECURITY_GLOBAL_FAILURES': 100,
+    'SECURITY_MAX_KEYS': 10000,
+    'SECURITY_FLUSH_INTERVAL': 60,
+}
+
+IP_BRUTE_FORCE = 'ip_brute_force'
+USERNAME_BRUTE_FORCE = 'username_brute_force'
+FAILURE_SPIKE = 'failure_spike'
+SUCCESS_AFTER_FAILURES = 'success_after_failures'
+
+# Alertas detalladas por periodo (el total se cuenta igual) y por resumen
+MAX_PERIOD_ALERTS = 100
+TOP_KEYS = 5
+MAX_USERNAME_LENGTH = 150
+
+
+def security_settings():
+    audit = getattr(settings, 'AUDIT_SETTINGS', {})
+    return {key: audit.get(key, default) for key, default in DEFAULT_SETTINGS.items()}
+
+
+class SlidingCounter:
+    """Eventos de las últimas `len(counts)` casillas: anillo de enteros con su total"""
+
+    __slots__ = ('counts', 'last', 'total')
+
+    def __init__(self, slots, bucket):
+        self.counts = array('I', [0]) * slots
+        self.last = bucket
+        self.total = 0
+
+    def advance(self, bucket):
+        """Vacía las casillas que salieron de la ventana hasta `bucket`"""
+        if bucket <= self.last:
+            # Caso habitual: la misma casilla que el evento anterior
+            return
+        slots = len(self.counts)
+        if bucket - self.last >= slots:
+            if self.total:
+                self.counts = array('I', [0]) * slots
+                self.total = 0
+        else:
+            for past in range(self.last + 1, bucket + 1):
+                index = past % slots
+                self.total -= self.counts[index]
+                self.counts[index] = 0
+        self.last = bucket
+
+    def add(self, bucket):
+        self.advance(bucket)
+        self.counts[bucket % len(self.counts)] += 1
+        self.total += 1
+        return self.total
+
+    def value(self, bucket):
+        self.advance(bucket)
+        return self.total
+
+
+class KeyedCounters:
+    """Un SlidingCounter por clave (IP, usuario), con a lo sumo `max_keys` claves"""
+
+    def __init__(self, slots, max_keys):
+        self.slots = slots
+        self.max_keys = max_keys
+        self.evicted = 0
+        self._counters = OrderedDict()
+
+    def __len__(self):
+        return len(self._counters)
+
+    def add(self, key, bucket):
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = SlidingCounter(self.slots, bucket)
+            if len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._counters.move_to_end(key)
+        return counter.add(bucket)
+
+    def value(self, key, bucket):
+        counter = self._counters.get(key)
+        return counter.value(bucket) if counter is not None else 0
+
+    def top(self, bucket, limit):
+        values = ((key, counter.value(bucket)) for key, counter in self._counters.items())
+        return [(key, n) for key, n in heapq.nlargest(limit, values, key=lambda item: item[1]) if n]
+
+    def prune(self, bucket):
+        """Olvida las claves sin eventos en la ventana"""
+        for key in [key for key, counter in self._counters.items() if not counter.value(bucket)]:
+            del self._counters[key]
+
+
+class AuthEventDetector:
+    """Contadores de ventana deslizante y resumen del periodo en curso (seguro entre hilos)"""
+
+    def __init__(self, window=300, bucket_seconds=10, ip_failures=10, username_failures=5,
+                 global_failures=100, max_keys=10000, clock=time.monotonic):
+        self.bucket_seconds = bucket_seconds
+        self.slots = max(1, math.ceil(window / bucket_seconds))
+        self.window = self.slots * bucket_seconds
+        self.thresholds = {
+            IP_BRUTE_FORCE: ip_failures,
+            USERNAME_BRUTE_FORCE: username_failures,
+            FAILURE_SPIKE: global_failures,
+        }
+        self.clock = clock
+        self.by_ip = KeyedCounters(self.slots, max_keys)
+        self.by_username = KeyedCounters(self.slots, max_keys)
+        self.failures = SlidingCounter(self.slots, self._bucket())
+        self._lock = threading.Lock()
+        self._new_period()
+
+    @classmethod
+    def from_settings(cls):
+        conf = security_settings()
+        return cls(
+            window=conf['SECURITY_WINDOW_SECONDS'],
+            bucket_seconds=conf['SECURITY_BUCKET_SECONDS'],
+            ip_failures=conf['SECURITY_IP_FAILURES'],
+            username_failures=conf['SECURITY_USERNAME_FAILURES'],
+            global_failures=conf['SECURITY_GLOBAL_FAILURES'],
+            max_keys=conf['SECURITY_MAX_KEYS'],
+        )
+
+    def _bucket(self):
+        return int(self.clock() // self.bucket_seconds)
+
+    def _new_period(self):
+        self._period = {
+            'start': timezone.now(),
+            'started': self.clock(),
+            'failed_logins': 0,
+            'successful_logins': 0,
+            'alerts': 0,
+            'details': [],
+        }
+
+    def _alert(self, kind, key, count):
+        alert = {'kind': kind, 'key': key, 'count': count, 'window_seconds': self.window,
+                 'at': timezone.now().isoformat()}
+        self._period['alerts'] += 1
+        if len(self._period['details']) < MAX_PERIOD_ALERTS:
+            self._period['details'].append(alert)
+        return alert
+
+    def login_failed(self, ip=None, username=None):
+        """Cuenta un fallo; devuelve las alertas que cruzaron su umbral"""
+        alerts = []
+        with self._lock:
+            bucket = self._bucket()
+            self._period['failed_logins'] += 1
+            if ip:
+                n = self.by_ip.add(ip, bucket)
+                if n == self.thresholds[IP_BRUTE_FORCE]:
+                    alerts.append(self._alert(IP_BRUTE_FORCE, ip, n))
+            if username:
+                n = self.by_username.add(username, bucket)
+                if n == self.thresholds[USERNAME_BRUTE_FORCE]:
+                    alerts.append(self._alert(USERNAME_BRUTE_FORCE, username, n))
+            n = self.failures.add(bucket)
+            if n == self.thresholds[FAILURE_SPIKE]:
+                alerts.append(self._alert(FAILURE_SPIKE, None, n))
+        return alerts
+
+    def login_succeeded(self, ip=None, username=None):
+        alerts = []
+        with self._lock:
+            self._period['successful_logins'] += 1
+            if username:
+                n = self.by_username.value(username, self._bucket())
+                if n >= self.thresholds[USERNAME_BRUTE_FORCE]:
+                    alerts.append(self._alert(SUCCESS_AFTER_FAILURES, username, n))
+        return alerts
+
+    def due(self, interval):
+        period = self._period
+        return self.clock() - period['started'] >= interval and (
+            period['failed_logins'] or period['successful_logins']
+        )
+
+    def take_period(self):
+        """Resumen del periodo en curso (None si no hubo eventos) y empieza otro"""
+        with self._lock:
+            period = self._period
+            if not (period['failed_logins'] or period['successful_logins']):
+                return None
+            bucket = self._bucket()
+            summary = {
+                'period_start': period['start'],
+                'period_end': timezone.now(),
+                'failed_logins': period['failed_logins'],
+                'successful_logins': period['successful_logins'],
+                'alerts': period['alerts'],
+                'details': {
+                    'alerts': period['details'],
+                    'top_ips': self.by_ip.top(bucket, TOP_KEYS),
+                    'top_usernames': self.by_username.top(bucket, TOP_KEYS),
+                    'window_failures': self.failures.value(bucket),
+                    'tracked_keys': len(self.by_ip) + len(self.by_username),
+                },
+            }
+            self.by_ip.prune(bucket)
+            self.by_username.prune(bucket)
+            self._new_period()
+        return summary
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_detector():
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = AuthEventDetector.from_settings()
+    return _detector
+
+
+def _forget_detector():
+    # Tras fork, cada worker cuenta lo suyo
+    global _detector, _detector_lock
+    _detector = None
+    _detector_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_detector)
+
+
+def flush(force=False):
+    """Guarda el resumen del periodo si venció SECURITY_FLUSH_INTERVAL (o `force`)"""
+    detector = _detector
+    if detector is None:
+        return None
+    if not force and not detector.due(security_settings()['SECURITY_FLUSH_INTERVAL']):
+        return None
+    summary = detector.take_period()
+    if summary is None:
+        return None
+    try:
+        return AuditSecuritySummary.objects.create(**summary)
+    except Exception:
+        logger.exception('No se pudo guardar el resumen de seguridad (%d fallos, %d alertas)',
+                         summary['failed_logins'], summary['alerts'])
+        return None
+
+
+def _report(alerts, ip):
+    for alert in alerts:
+        logger.warning(
+            f"Security alert {alert['kind']}: {alert['key'] or 'global'} "
+            f"({alert['count']} in {alert['window_seconds']}s)",
+            extra={'event': 'security_alert', 'kind': alert['kind'], 'key': alert['key'],
+                   'count': alert['count'], 'ip': ip},
+        )
+
+
+def _normalize_username(username):
+    # Sin distinguir mayúsculas: 'Admin' y 'admin' son el mismo objetivo
+    return str(username)[:MAX_USERNAME_LENGTH].lower() if username else None
+
+
+def _client_ip(request):
+    return trusted_client_ip(request) if request is not None else None
+
+
+def on_login_failed(sender, credentials, request=None, **kwargs):
+    """Receptor de user_login_failed"""
+    ip = _client_ip(request)
+    username = _normalize_username(credentials.get('username'))
+    flush()
+    _report(get_detector().login_failed(ip, username), ip)
+
+
+def on_logged_in(sender, user, request=None, **kwargs):
+    """Receptor de user_logged_in"""
+    ip = _client_ip(request)
+    flush()
+    _report(get_detector().login_succeeded(ip, _normalize_username(user.get_username())), ip)
+
+
+def dashboard_summary(start, end=None, recent=10):
+    """Totales de los resúmenes del rango y sus alertas más recientes (sin leer LogEntry)"""
+    summaries = AuditSecuritySummary.objects.filter(period_end__gt=start)
+    if end is not None:
+        summaries = summaries.filter(period_start__lt=end)
+    totals = summaries.aggregate(
+        failed_logins=Sum('failed_logins'),
+        successful_logins=Sum('successful_logins'),
+        alerts=Sum('alerts'),
+    )
+    alerts = []
+    if totals['alerts']:
+        recent_summaries = summaries.filter(alerts__gt=0).order_by('-period_end')
+        for details in recent_summaries.values_list('details', flat=True)[:recent]:
+            alerts.extend(details.get('alerts', []))
+    alerts.sort(key=lambda alert: alert['at'], reverse=True)
+    return {
+        'security_events': totals['alerts'] or 0,
+        'failed_logins': totals['failed_logins'] or 0,
+        'successful_logins': totals['successful_logins'] or 0,
+        'recent_alerts': alerts[:recent],
+    }
@@ -0,0 +1,69 @@
+"""
+Serialización del listado de logs de auditoría sin instanciar LogEntry
+
+El listado lee solo las columnas que devuelve con .values() (el nombre del
+actor por LEFT JOIN, el content type como id) y arma los diccionarios
+directamente: sin construir un LogEntry, un User y un ContentType por fila.
+Las etiquetas 'app_label.model' salen de un mapa en memoria alimentado por
+la caché de ContentType, así que no hay una consulta por fila.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+
+LIST_FIELDS = (
+    'id', 'timestamp', 'actor__username', 'action', 'content_type', 'object_id',
+    'object_repr', 'changes', 'additional_data', 'remote_addr',
+)
+
+RECENT_FIELDS = ('timestamp', 'action', 'content_type', 'object_repr', 'changes')
+
+
+class ModelLabels(dict):
+    """{content_type_id: 'app_label.model'}, resuelto la primera vez que se pide"""
+
+    def __missing__(self, content_type_id):
+        if content_type_id is None:
+            return 'Unknown'
+        content_type = ContentType.objects.get_for_id(content_type_id)
+        label = self[content_type_id] = f"{content_type.app_label}.{content_type.model}"
+        return label
+
+
+def list_values(queryset):
+    """El queryset del listado como diccionarios con LIST_FIELDS (conserva filtros y orden)"""
+    return queryset.values(*LIST_FIELDS)
+
+
+def serialize_logs(rows, labels=None):
+    """Filas de list_values() con el formato de GET /audit/api/logs/"""
+    labels = ModelLabels() if labels is None else labels
+    return [
+        {
+            'id': row['id'],
+            'timestamp': row['timestamp'],
+            'actor': row['actor__username'] if row['actor__username'] is not None else 'System',
+            'action': row['action'],
+            'model': labels[row['content_type']],
+            'object_id': row['object_id'],
+            'object_repr': row['object_repr'],
+            'changes': row['changes'],
+            'additional_data': row['additional_data'],
+            'remote_addr': row['remote_addr'],
+        }
+        for row in rows
+    ]
+
+
+def recent_activity(queryset, limit=20, labels=None):
+    """Las `limit` primeras entradas del queryset para la actividad de un usuario"""
+    labels = ModelLabels() if labels is None else labels
+    return [
+        {
+            'timestamp': row['timestamp'],
+            'action': row['action'],
+            'model': labels[row['content_type']],
+            'object_repr': row['object_repr'],
+            'changes_count': len(row['changes']) if row['changes'] else 0,
+        }
+        for row in queryset.values(*RECENT_FIELDS)[:limit]
+    ]
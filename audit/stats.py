@@ -0,0 +1,141 @@
+"""
+Agregaciones de LogEntry para el dashboard y las estadísticas de auditoría
+
+Cada gráfico es una sola consulta agrupada (GROUP BY) en lugar de un
+COUNT por bucket. Las horas se agrupan en la zona horaria actual
+(TIME_ZONE salvo que se active otra), igual que timestamp__hour.
+
+Los endpoints usan las variantes sobre rollups (dashboard(), ranking()),
+que leen audit/rollups.py en lugar de recorrer LogEntry; las funciones
+sobre querysets quedan para consultas ad hoc.
+"""
+
+from collections import Counter
+
+from auditlog.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from . import rollups
+
+CRITICAL_ACTIONS = (LogEntry.Action.CREATE, LogEntry.Action.UPDATE, LogEntry.Action.DELETE)
+
+
+def summary_metrics(queryset):
+    """Total, usuarios distintos y acciones críticas en una consulta"""
+    return queryset.aggregate(
+        total_actions=Count('id'),
+        unique_users=Count('actor', distinct=True),
+        critical_actions=Count('id', filter=Q(action__in=CRITICAL_ACTIONS)),
+    )
+
+
+def hourly_activity(queryset, tzinfo=None):
+    """[{'hour': 0..23, 'count': n}] con las 24 horas, en una consulta"""
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    counts = dict(
+        queryset.annotate(hour=ExtractHour('timestamp', tzinfo=tzinfo))
+        .values('hour').annotate(count=Count('id')).order_by()
+        .values_list('hour', 'count')
+    )
+    return [{'hour': hour, 'count': counts.get(hour, 0)} for hour in range(24)]
+
+
+def top_models(queryset, limit=5):
+    """Agrupa por content_type_id (sin JOIN) y resuelve nombres con la caché de ContentType"""
+    rows = (
+        queryset.values('content_type').annotate(count=Count('id'))
+        .order_by('-count')[:limit]
+    )
+    result = []
+    for row in rows:
+        content_type = ContentType.objects.get_for_id(row['content_type'])
+        result.append({
+            'content_type__app_label': content_type.app_label,
+            'content_type__model': content_type.model,
+            'count': row['count'],
+        })
+    return result
+
+
+def top_users(queryset, limit=5):
+    """Agrupa por actor_id y busca los nombres solo de los `limit` primeros"""
+    rows = list(
+        queryset.filter(actor__isnull=False).values('actor')
+        .annotate(count=Count('id')).order_by('-count')[:limit]
+    )
+    usernames = dict(
+        get_user_model().objects.filter(pk__in=[row['actor'] for row in rows])
+        .values_list('pk', 'username')
+    )
+    return [
+        {'actor__username': usernames.get(row['actor']), 'count': row['count']}
+        for row in rows
+    ]
+
+
+def content_type_label(content_type_id):
+    content_type = ContentType.objects.get_for_id(content_type_id)
+    return {'content_type__app_label': content_type.app_label, 'content_type__model': content_type.model}
+
+
+def ranking(counts, limit=None):
+    """[(clave, count)] de mayor a menor (desempate por clave) de un resultado de grouped()"""
+    ordered = sorted(((key, n) for key, n in counts.items() if n), key=lambda item: (-item[1], item[0]))
+    return ordered[:limit] if limit else ordered
+
+
+def usernames(actor_ids):
+    return dict(get_user_model().objects.filter(pk__in=actor_ids).values_list('pk', 'username'))
+
+
+def existing_actors(actors):
+    """
+    (conteos, nombres) de un grouped(('actor_id',)) sin las entradas sin actor
+    ni las de usuarios borrados: LogEntry.actor pasa a NULL, pero los rollups
+    conservan el id
+    """
+    names = usernames([actor_id for (actor_id,) in actors if actor_id])
+    return {key: n for key, n in actors.items() if key[0] in names}, names
+
+
+def dashboard(start, end=None, limit=5, tzinfo=None):
+    """
+    Métricas y gráficos del dashboard desde los rollups: una consulta por
+    tabla (hora × acción × modelo y actor) más los nombres de usuario
+    """
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    mark = rollups.watermark()
+    hourly = rollups.grouped(('bucket', 'action', 'content_type'), start, end, mark)
+    actors = rollups.grouped(('actor_id',), start, end, mark)
+
+    by_bucket, models = Counter(), Counter()
+    total = critical = 0
+    for (bucket, action, content_type), n in hourly.items():
+        total += n
+        if action in CRITICAL_ACTIONS:
+            critical += n
+        by_bucket[(bucket,)] += n
+        models[content_type] += n
+    hours = rollups.local_counts('hour', by_bucket, start, end, tzinfo)
+    actors, names = existing_actors(actors)
+    top = ranking(actors, limit)
+
+    return {
+        'metrics': {
+            'total_actions': total,
+            'unique_users': sum(1 for n in actors.values() if n),
+            'critical_actions': critical,
+        },
+        'hourly_activity': [{'hour': hour, 'count': hours.get(hour, 0)} for hour in range(24)],
+        'top_models': [
+            {**content_type_label(content_type), 'count': n}
+            for content_type, n in ranking(models, limit)
+        ],
+        'top_users': [
+            {'actor__username': names.get(actor_id), 'count': n} for (actor_id,), n in top
+        ],
+    }
@@ -0,0 +1,138 @@
+"""
+Caché de las estadísticas de auditoría (statistics y dashboard)
+
+El dashboard se refresca solo y varios administradores lo tienen abierto a
+la vez: sin caché cada refresco repite las mismas agregaciones. Los
+resultados se guardan en la caché de Django por endpoint, parámetros de la
+petición y zona horaria:
+
+- Frescos durante STATS_CACHE_TTL segundos: se devuelven tal cual.
+- Vencidos, durante STATS_CACHE_STALE_SECONDS más: se devuelven igual
+  (stale-while-revalidate) y un solo hilo los recalcula en segundo plano.
+- Sin entrada: una sola petición calcula (single-flight, con un candado
+  por clave vía cache.add) y las demás esperan su resultado.
+
+invalidate() descarta todo lo guardado; la llama la purga de retención,
+que quita de los rollups horas que los resultados todavía cuentan.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+logger = logging.getLogger('auditlog')
+
+GENERATION_KEY = 'audit:stats:generation'
+KEY = 'audit:stats:%s:%s:%s'  # generación, endpoint, hash de los parámetros
+LOCK_KEY = 'audit:stats:lock:%s'
+# Tiempo máximo de un cálculo: vence el candado de un proceso caído y
+# acota la espera de las peticiones concurrentes
+LOCK_TIMEOUT = 60
+POLL_INTERVAL = 0.05
+
+HIT, STALE, MISS = 'hit', 'stale', 'miss'
+
+
+def cache_settings():
+    conf = getattr(settings, 'AUDIT_SETTINGS', {})
+    return {
+        'ttl': conf.get('STATS_CACHE_TTL', 30),
+        'stale': conf.get('STATS_CACHE_STALE_SECONDS', 300),
+    }
+
+
+def _generation():
+    # Si la caché pierde el contador se crea otro distinto, nunca uno anterior
+    cache.add(GENERATION_KEY, time.time_ns(), None)
+    return cache.get(GENERATION_KEY)
+
+
+def invalidate():
+    """Descarta todas las estadísticas guardadas"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+
+
+def cache_key(name, params):
+    """Clave de `name` para los parámetros (QueryDict o dict) en la zona horaria actual"""
+    items = sorted(params.lists()) if hasattr(params, 'lists') else sorted(params.items())
+    payload = json.dumps([timezone.get_current_timezone_name(), items], default=str)
+    return KEY % (_generation(), name, hashlib.sha1(payload.encode()).hexdigest())
+
+
+def _store(key, value, conf):
+    cache.set(key, {'value': value, 'fresh_until': time.time() + conf['ttl']}, conf['ttl'] + conf['stale'])
+    return value
+
+
+def _spawn(target):
+    def run():
+        close_old_connections()
+        try:
+            target()
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, name='audit-stats', daemon=True).start()
+
+
+def _revalidate(key, compute, conf):
+    tzinfo = timezone.get_current_timezone()
+
+    def run():
+        try:
+            with timezone.override(tzinfo):
+                _store(key, compute(), conf)
+        except Exception:
+            logger.exception(f"Audit stats refresh failed for {key}")
+        finally:
+            cache.delete(LOCK_KEY % key)
+
+    _spawn(run)
+
+
+def cached(name, params, compute):
+    """
+    (resultado de compute(), estado) con estado HIT, STALE o MISS; con
+    STATS_CACHE_TTL=0 siempre calcula
+    """
+    conf = cache_settings()
+    if conf['ttl'] <= 0:
+        return compute(), MISS
+    key = cache_key(name, params)
+    lock = LOCK_KEY % key
+
+    entry = cache.get(key)
+    if entry is not None:
+        if time.time() < entry['fresh_until']:
+            return entry['value'], HIT
+        if cache.add(lock, 1, LOCK_TIMEOUT):
+            _revalidate(key, compute, conf)
+        return entry['value'], STALE
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(lock, 1, LOCK_TIMEOUT):
+        # Otra petición está calculando la misma clave
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value'], HIT
+        if time.monotonic() >= deadline:
+            return compute(), MISS
+    try:
+        # Pudo guardarse entre la lectura y el candado
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value'], HIT
+        return _store(key, compute(), conf), MISS
+    finally:
+        cache.delete(lock)
@@ -16,7 +16,9 @@ urlpatterns = [
     # API endpoints
     path('api/', include(router.urls)),
     path('api/dashboard/', views.audit_dashboard_data, name='dashboard-data'),
+    path('api/live/', views.audit_live_feed, name='live-feed'),
     path('api/cleanup/', views.cleanup_old_logs, name='cleanup-logs'),
+    path('api/cleanup/<str:job_id>/', views.cleanup_status, name='cleanup-status'),
     
     # Vistas HTML
     path('dashboard/', views.audit_dashboard_view, name='dashboard'),
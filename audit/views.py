@@ -3,11 +3,15 @@ Views para auditoría y análisis de logs
 Proporciona endpoints para consultar y analizar logs de auditoría
 """
 
+import logging
+
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.urls import reverse
 from django.core.paginator import Paginator
 from django.db.models import Q, Count
 from django.utils import timezone
@@ -22,8 +26,14 @@ from auditlog.models import LogEntry
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth import get_user_model
 
+from . import archive, export, live, retention, rollups, security, serializers, stats, stats_cache
+from .pagination import AuditLogCursorPagination
+from .search import AuditLogSearchFilter
+
 User = get_user_model()
 
+logger = logging.getLogger('auditlog')
+
 
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -31,10 +41,13 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     Solo lectura, disponible para administradores
     """
     permission_classes = [IsAuthenticated, IsAdminUser]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    # ?search= con índices (pg_trgm / FTS5) en lugar de icontains, ver audit/search.py
+    filter_backends = [AuditLogSearchFilter, filters.OrderingFilter]
     search_fields = ['actor__username', 'object_repr', 'content_type__model']
     ordering_fields = ['timestamp', 'action']
     ordering = ['-timestamp']
+    # Cursor sobre (timestamp, id); ?page=N mantiene la paginación numerada
+    pagination_class = AuditLogCursorPagination
     
     def _map_action_param(self, action_param: str):
         """Mapea el parámetro de acción (string) al valor entero esperado por LogEntry.action."""
@@ -67,132 +80,196 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         if action is not None:
             queryset = queryset.filter(action=action)
         
-        model_name = self.request.query_params.get('model', None)
-        if model_name:
-            try:
-                # Permitir 'app_label.Model' o solo 'model'
-                if '.' in model_name:
-                    app_label, model = model_name.split('.', 1)
-                    content_type = ContentType.objects.get(app_label=app_label, model=model.lower())
-                else:
-                    content_type = ContentType.objects.get(model=model_name.lower())
-                queryset = queryset.filter(content_type=content_type)
-            except ContentType.DoesNotExist:
-                pass
+        content_type = self._content_type_param(self.request.query_params.get('model', None))
+        if content_type:
+            queryset = queryset.filter(content_type=content_type)
         
         # Filtro por rango de fechas
-        date_from = self.request.query_params.get('date_from', None)
-        date_to = self.request.query_params.get('date_to', None)
+        from_date = self._date_param(self.request.query_params.get('date_from', None))
+        to_date = self._date_param(self.request.query_params.get('date_to', None))
         
-        if date_from:
-            try:
-                from_date = datetime.fromisoformat(date_from.replace('Z', '+00:00'))
-                queryset = queryset.filter(timestamp__gte=from_date)
-            except ValueError:
-                pass
+        if from_date:
+            queryset = queryset.filter(timestamp__gte=from_date)
         
-        if date_to:
-            try:
-                to_date = datetime.fromisoformat(date_to.replace('Z', '+00:00'))
-                queryset = queryset.filter(timestamp__lte=to_date)
-            except ValueError:
-                pass
+        if to_date:
+            queryset = queryset.filter(timestamp__lte=to_date)
         
         return queryset
     
+    def _content_type_param(self, model_name):
+        """ContentType de 'app_label.Model' o solo 'model' (None si no existe)"""
+        if not model_name:
+            return None
+        try:
+            if '.' in model_name:
+                app_label, model = model_name.split('.', 1)
+                return ContentType.objects.get(app_label=app_label, model=model.lower())
+            return ContentType.objects.get(model=model_name.lower())
+        except ContentType.DoesNotExist:
+            return None
+    
+    def _date_param(self, value):
+        """datetime aware de un parámetro ISO; sin zona, en la zona horaria actual"""
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+    
+    def _rollup_query(self):
+        """
+        Los filtros de get_queryset() para audit/rollups.py:
+        (filtros, desde, hasta exclusivo)
+        """
+        params = self.request.query_params
+        filters = {}
+        user_id = params.get('user_id', None)
+        if user_id:
+            filters['actor_id'] = int(user_id)
+        action = self._map_action_param(params.get('action', None))
+        if action is not None:
+            filters['action'] = action
+        content_type = self._content_type_param(params.get('model', None))
+        if content_type:
+            filters['content_type'] = content_type.pk
+        return (filters, *self._date_range())
+    
+    def _date_range(self):
+        """(desde, hasta exclusivo) de date_from/date_to (inclusivo en get_queryset())"""
+        start = self._date_param(self.request.query_params.get('date_from', None))
+        end = self._date_param(self.request.query_params.get('date_to', None))
+        return start, end + timedelta(microseconds=1) if end else None
+    
     def list(self, request, *args, **kwargs):
         """
         Lista logs con información adicional
         """
-        queryset = self.filter_queryset(self.get_queryset())
+        # .values() en lugar de instancias; el paginador recibe diccionarios
+        rows = serializers.list_values(self.filter_queryset(self.get_queryset()))
         
-        page = self.paginate_queryset(queryset)
+        page = self.paginate_queryset(rows)
         if page is not None:
-            serialized_data = []
-            for log_entry in page:
-                serialized_data.append({
-                    'id': log_entry.id,
-                    'timestamp': log_entry.timestamp,
-                    'actor': log_entry.actor.username if log_entry.actor else 'System',
-                    'action': log_entry.action,
-                    'model': (f"{log_entry.content_type.app_label}.{log_entry.content_type.model}" if log_entry.content_type else 'Unknown'),
-                    'object_id': log_entry.object_id,
-                    'object_repr': log_entry.object_repr,
-                    'changes': log_entry.changes,
-                    'additional_data': log_entry.additional_data,
-                    'remote_addr': log_entry.remote_addr,
-                })
-            
-            return self.get_paginated_response(serialized_data)
+            return self.get_paginated_response(serializers.serialize_logs(page))
         
         # Si no hay paginación, devolver todos los resultados
-        serialized_data = []
-        for log_entry in queryset:
-            serialized_data.append({
-                'id': log_entry.id,
-                'timestamp': log_entry.timestamp,
-                'actor': log_entry.actor.username if log_entry.actor else 'System',
-                'action': log_entry.action,
-                'model': (f"{log_entry.content_type.app_label}.{log_entry.content_type.model}" if log_entry.content_type else 'Unknown'),
-                'object_id': log_entry.object_id,
-                'object_repr': log_entry.object_repr,
-                'changes': log_entry.changes,
-                'additional_data': log_entry.additional_data,
-                'remote_addr': log_entry.remote_addr,
-            })
-        
-        return Response(serialized_data)
+        return Response(serializers.serialize_logs(rows))
     
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """
-        Estadísticas de auditoría
+        Estadísticas de auditoría (desde los rollups, ver audit/rollups.py)
         """
-        queryset = self.get_queryset()
-        
-        # Estadísticas básicas
-        total_logs = queryset.count()
-        
-        # Logs por acción
-        actions_stats = queryset.values('action').annotate(
-            count=Count('id')
-        ).order_by('-count')
-        
-        # Logs por modelo
-        models_stats = queryset.select_related('content_type').values(
-            'content_type__app_label', 'content_type__model'
-        ).annotate(
-            count=Count('id')
-        ).order_by('-count')
+        try:
+            filters, start, end = self._rollup_query()
+        except ValueError:
+            return Response({'error': 'user_id must be an integer'}, status=400)
         
-        # Logs por usuario (top 10)
-        users_stats = queryset.filter(actor__isnull=False).values(
-            'actor__username'
-        ).annotate(
-            count=Count('id')
-        ).order_by('-count')[:10]
+        def compute():
+            mark = rollups.watermark()
+            
+            # Logs por acción (el total sale de aquí)
+            by_action = rollups.grouped(('action',), start, end, mark, **filters)
+            total_logs = sum(by_action.values())
+            actions_stats = [{'action': action, 'count': n} for (action,), n in stats.ranking(by_action)]
+            
+            # Logs por modelo
+            by_model = rollups.grouped(('content_type',), start, end, mark, **filters)
+            models_stats = [
+                {**stats.content_type_label(content_type), 'count': n}
+                for (content_type,), n in stats.ranking(by_model)
+            ]
+            
+            # Logs por usuario (top 10)
+            by_user, names = stats.existing_actors(rollups.grouped(('actor_id',), start, end, mark, **filters))
+            top = stats.ranking(by_user, 10)
+            users_stats = [{'actor__username': names.get(actor_id), 'count': n} for (actor_id,), n in top]
+            
+            # Actividad por día (últimos 30 días, días en la zona horaria local)
+            now = timezone.now()
+            thirty_days_ago = now - timedelta(days=30)
+            since = max(start, thirty_days_ago) if start else thirty_days_ago
+            by_hour = rollups.grouped(('bucket',), since, end, mark, **filters)
+            days = rollups.local_counts('date', by_hour, since, end, **filters)
+            daily_activity = [{'day': day.isoformat(), 'count': days[day]} for day in sorted(days) if days[day]]
+            
+            return {
+                'total_logs': total_logs,
+                'actions': actions_stats,
+                'models': models_stats,
+                'top_users': users_stats,
+                'daily_activity': daily_activity,
+                'period': {
+                    'from': thirty_days_ago.isoformat(),
+                    'to': now.isoformat()
+                }
+            }
         
-        # Actividad por día (últimos 30 días)
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        daily_activity = queryset.filter(
-            timestamp__gte=thirty_days_ago
-        ).extra(
-            select={'day': "date(timestamp)"}
-        ).values('day').annotate(
-            count=Count('id')
-        ).order_by('day')
+        # Caché con TTL y recálculo único (ver audit/stats_cache.py)
+        data, state = stats_cache.cached('statistics', request.query_params, compute)
+        return Response(data, headers={'X-Cache': state})
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exporta en streaming (CSV o NDJSON) todos los logs que devolvería el
+        listado con los mismos filtros, sin paginar (ver audit/export.py)
+        """
+        export_format = request.query_params.get('export_format', 'csv').lower()
+        if export_format not in export.FORMATS:
+            return Response({'error': f"export_format must be one of: {', '.join(export.FORMATS)}"}, status=400)
+        queryset = self.filter_queryset(self.get_queryset())
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-timestamp', '-id')
+        logger.info(
+            f"Audit log export ({export_format}) by {request.user} with filters {dict(request.query_params)}",
+            extra={'event': 'audit_export', 'user': str(request.user), 'format': export_format,
+                   'filters': dict(request.query_params)},
+        )
+        return export.streaming_export(queryset, export_format)
+    
+    @action(detail=False, methods=['get'])
+    def archived(self, request):
+        """
+        Logs ya movidos al archivo comprimido (ver audit/archive.py), con los
+        mismos filtros que el listado; solo se abren los archivos del rango
+        """
+        params = request.query_params
+        try:
+            limit = min(int(params.get('limit', 100)), 1000)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=400)
+        filters = {}
+        user_id = params.get('user_id', None)
+        if user_id:
+            user = User.objects.filter(pk=user_id).first() if user_id.isdigit() else None
+            if user is None:
+                return Response({'results': [], 'count': 0})
+            filters['actor'] = user.get_username()
+        action = self._map_action_param(params.get('action', None))
+        if action is not None:
+            filters['action'] = action
+        content_type = self._content_type_param(params.get('model', None))
+        if content_type:
+            filters['content_type'] = (content_type.app_label, content_type.model)
+        start, end = self._date_range()
         
-        return Response({
-            'total_logs': total_logs,
-            'actions': list(actions_stats),
-            'models': list(models_stats),
-            'top_users': list(users_stats),
-            'daily_activity': list(daily_activity),
-            'period': {
-                'from': thirty_days_ago.isoformat(),
-                'to': timezone.now().isoformat()
-            }
-        })
+        entries = archive.read(start, end, limit=limit, **filters)
+        results = [{
+            'id': entry['id'],
+            'timestamp': entry['timestamp'],
+            'actor': entry['actor'] or 'System',
+            'action': entry['action'],
+            'model': '.'.join(entry['content_type']),
+            'object_id': entry['object_id'],
+            'object_repr': entry['object_repr'],
+            'changes': entry['changes'],
+            'additional_data': entry['additional_data'],
+            'remote_addr': entry['remote_addr'],
+            'archived': True,
+        } for entry in entries]
+        return Response({'results': results, 'count': len(results)})
     
     @action(detail=False, methods=['get'])
     def user_activity(self, request):
@@ -211,27 +288,17 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         # Logs del usuario
         user_logs = LogEntry.objects.filter(actor=user).order_by('-timestamp')
         
-        # Estadísticas del usuario
-        total_actions = user_logs.count()
-        recent_actions = user_logs.filter(
-            timestamp__gte=timezone.now() - timedelta(days=7)
-        ).count()
+        # Estadísticas del usuario (desde los rollups)
+        mark = rollups.watermark()
+        by_action = rollups.grouped(('action',), mark=mark, actor_id=user.id)
+        total_actions = sum(by_action.values())
+        recent_actions = rollups.count(timezone.now() - timedelta(days=7), mark=mark, actor_id=user.id)
         
         # Acciones por tipo
-        actions_breakdown = user_logs.values('action').annotate(
-            count=Count('id')
-        ).order_by('-count')
+        actions_breakdown = [{'action': action, 'count': n} for (action,), n in stats.ranking(by_action)]
         
         # Actividad reciente (últimas 20 acciones)
-        recent_logs = []
-        for log in user_logs[:20]:
-            recent_logs.append({
-                'timestamp': log.timestamp,
-                'action': log.action,
-                'model': (f"{log.content_type.app_label}.{log.content_type.model}" if log.content_type else 'Unknown'),
-                'object_repr': log.object_repr,
-                'changes_count': len(log.changes) if log.changes else 0
-            })
+        recent_logs = serializers.recent_activity(user_logs, 20)
         
         return Response({
             'user': {
@@ -242,7 +309,7 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
             'statistics': {
                 'total_actions': total_actions,
                 'recent_actions_7d': recent_actions,
-                'actions_breakdown': list(actions_breakdown)
+                'actions_breakdown': actions_breakdown
             },
             'recent_activity': recent_logs
         })
@@ -256,57 +323,60 @@ def audit_dashboard_data(request):
     """
     # Período de análisis
     days = int(request.GET.get('days', 30))
-    start_date = timezone.now() - timedelta(days=days)
-    
-    queryset = LogEntry.objects.filter(timestamp__gte=start_date)
-    
-    # Métricas principales
-    total_actions = queryset.count()
-    unique_users = queryset.filter(actor__isnull=False).values('actor').distinct().count()
-    
-    # Acciones críticas (crear, modificar, eliminar)
-    critical_actions = queryset.filter(
-        action__in=[LogEntry.Action.CREATE, LogEntry.Action.UPDATE, LogEntry.Action.DELETE]
-    ).count()
-    
-    # Detecciones de seguridad (logins fallidos, etc.)
-    # Esto requeriría logs adicionales, por ahora simulamos
-    security_events = 0
     
-    # Actividad por hora del día
-    hourly_activity = []
-    for hour in range(24):
-        count = queryset.filter(timestamp__hour=hour).count()
-        hourly_activity.append({'hour': hour, 'count': count})
-    
-    # Modelos más modificados
-    top_models = queryset.select_related('content_type').values(
-        'content_type__app_label', 'content_type__model'
-    ).annotate(count=Count('id')).order_by('-count')[:5]
-    
-    # Usuarios más activos
-    top_users = queryset.filter(actor__isnull=False).values(
-        'actor__username'
-    ).annotate(count=Count('id')).order_by('-count')[:5]
-    
-    return Response({
-        'period': {
-            'days': days,
-            'start_date': start_date.isoformat(),
-            'end_date': timezone.now().isoformat()
-        },
-        'metrics': {
-            'total_actions': total_actions,
-            'unique_users': unique_users,
-            'critical_actions': critical_actions,
-            'security_events': security_events
-        },
-        'charts': {
-            'hourly_activity': hourly_activity,
-            'top_models': list(top_models),
-            'top_users': list(top_users)
+    def compute():
+        start_date = timezone.now() - timedelta(days=days)
+        
+        # Rollups por hora + LogEntry solo en los extremos del rango
+        data = stats.dashboard(start_date)
+        
+        # Resúmenes del detector de fuerza bruta (audit/security.py)
+        security_summary = security.dashboard_summary(start_date)
+        
+        return {
+            'period': {
+                'days': days,
+                'start_date': start_date.isoformat(),
+                'end_date': timezone.now().isoformat()
+            },
+            'metrics': {
+                **data['metrics'],
+                'security_events': security_summary.pop('security_events')
+            },
+            'security': security_summary,
+            'charts': {
+                # Horas en la zona horaria del servidor (TIME_ZONE)
+                'hourly_activity': data['hourly_activity'],
+                'top_models': data['top_models'],
+                'top_users': data['top_users'],
+                'timezone': timezone.get_current_timezone_name(),
+            }
         }
-    })
+    
+    # Caché con TTL y recálculo único (ver audit/stats_cache.py)
+    data, state = stats_cache.cached('dashboard', {'days': days}, compute)
+    return Response(data, headers={'X-Cache': state})
+
+
+async def audit_live_feed(request):
+    """
+    Feed en vivo del dashboard (Server-Sent Events, ver audit/live.py)
+
+    Vista asíncrona fuera de DRF: EventSource no envía cabeceras, así que se
+    autentica con la sesión del dashboard HTML.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'The live feed requires an ASGI server'}, status=501)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+    if not user.is_staff:
+        return JsonResponse({'error': 'Admin access required'}, status=403)
+    response = StreamingHttpResponse(live.event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx: no almacenar la respuesta antes de reenviarla
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @staff_member_required
@@ -326,32 +396,42 @@ def audit_dashboard_view(request):
 def cleanup_old_logs(request):
     """
     Limpieza de logs antiguos basada en políticas de retención
-    """
-    from django.conf import settings
-    
-    retain_days = getattr(settings, 'AUDIT_SETTINGS', {}).get('RETAIN_LOGS_DAYS', 365)
-    cutoff_date = timezone.now() - timedelta(days=retain_days)
     
-    # Contar logs que se eliminarán
-    old_logs = LogEntry.objects.filter(timestamp__lt=cutoff_date)
-    count_to_delete = old_logs.count()
+    Con confirm=true la purga corre en segundo plano por lotes (ver
+    audit/retention.py); el progreso se consulta en cleanup-status.
+    """
+    retain_days = retention.retention_settings()['retain_days']
+    # Hora exacta: los rollups de las horas purgadas se borran completos
+    cutoff_date = retention.retention_cutoff(retain_days)
     
     if request.data.get('confirm', False):
-        # Realizar la eliminación
-        deleted_count = old_logs.delete()[0]
-        
+        job, created = retention.start_job(cutoff_date)
         return Response({
-            'success': True,
-            'deleted_count': deleted_count,
-            'cutoff_date': cutoff_date.isoformat(),
-            'retain_days': retain_days
-        })
+            'success': created,
+            'job': job,
+            'status_url': reverse('audit:cleanup-status', args=[job['id']]),
+            'cutoff_date': job['cutoff'],
+            'retain_days': retain_days,
+            **({} if created else {'message': 'A cleanup job is already running'}),
+        }, status=202 if created else 409)
     else:
         # Solo mostrar cuántos se eliminarían
         return Response({
             'preview': True,
-            'logs_to_delete': count_to_delete,
+            'logs_to_delete': LogEntry.objects.filter(timestamp__lt=cutoff_date).count(),
             'cutoff_date': cutoff_date.isoformat(),
             'retain_days': retain_days,
             'message': 'Use confirm=true to actually delete the logs'
-        })
\ No newline at end of file
+        })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def cleanup_status(request, job_id):
+    """
+    Estado y progreso de un trabajo de limpieza
+    """
+    job = retention.get_job(job_id)
+    if job is None:
+        return Response({'error': 'Job not found'}, status=404)
+    return Response(job)
@@ -0,0 +1,286 @@
+"""
+Escritura de entradas de auditoría (LogEntry) por lotes
+
+django-auditlog inserta un LogEntry por cada save/delete/m2m de los modelos
+registrados, en serie y dentro del request: guardar una nota con varios tags
+son varios INSERT. AUDIT_SETTINGS['WRITER_MODE'] elige cómo se escriben:
+
+- 'sync' (por defecto): comportamiento de django-auditlog, un INSERT por entrada.
+- 'batched': las entradas se acumulan durante el request
+  (AuditWriterMiddleware o buffer_audit_entries) y se insertan con un solo
+  bulk_create al terminar.
+- 'background': un hilo del proceso las inserta por lotes desde una cola.
+  Al cerrar el proceso la cola se vacía antes de salir.
+
+Una entrada solo pasa al buffer o a la cola cuando su transacción confirma
+(transaction.on_commit): un cambio revertido no deja rastro, igual que en
+modo síncrono. Las entradas que no se pueden insertar se guardan como
+fixture en WRITER_FALLBACK_DIR (recuperables con `manage.py loaddata`).
+Las insertadas se publican en el feed en vivo del dashboard (audit/live.py).
+
+bulk_create no emite pre_save de LogEntry: el actor y la IP de set_actor
+se aplican al capturar la entrada, no al insertarla.
+"""
+
+import atexit
+import contextlib
+import logging
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from functools import partial, wraps
+
+from auditlog.models import LogEntry, LogEntryManager
+from django.conf import settings
+from django.core import serializers
+from django.db import close_old_connections, transaction
+from django.db.models.signals import pre_save
+
+from . import live
+
+logger = logging.getLogger('auditlog')
+
+MODES = ('sync', 'batched', 'background')
+
+DEFAULT_SETTINGS = {
+    'WRITER_MODE': 'sync',
+    'WRITER_BATCH_SIZE': 500,
+    'WRITER_FLUSH_INTERVAL': 1.0,
+    'WRITER_QUEUE_SIZE': 10000,
+    'WRITER_FALLBACK_DIR': None,
+}
+
+# True mientras django-auditlog crea una entrada (log_create/log_m2m_changes):
+# las llamadas directas a LogEntry.objects.create no se interceptan
+_capturing = ContextVar('audit_writer_capturing', default=False)
+# Lista de entradas del request en curso (modo batched)
+_buffer = ContextVar('audit_writer_buffer', default=None)
+
+
+def writer_settings():
+    audit = getattr(settings, 'AUDIT_SETTINGS', {})
+    return {key: audit.get(key, default) for key, default in DEFAULT_SETTINGS.items()}
+
+
+def get_mode():
+    return writer_settings()['WRITER_MODE']
+
+
+def write_entries(entries):
+    """Inserta las entradas con un bulk_create; si falla, las guarda como fixture"""
+    if not entries:
+        return
+    conf = writer_settings()
+    try:
+        LogEntry.objects.bulk_create(entries, batch_size=conf['WRITER_BATCH_SIZE'])
+    except Exception:
+        logger.exception('No se pudieron insertar %d entradas de auditoría', len(entries))
+        write_fallback(entries)
+        return
+    # bulk_create no emite post_save
+    live.publish_on_commit(entries)
+
+
+def write_fallback(entries):
+    directory = writer_settings()['WRITER_FALLBACK_DIR'] or os.path.join(
+        settings.BASE_DIR, 'logs', 'audit_undelivered'
+    )
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{id(entries)}.json")
+    with open(path, 'w') as fh:
+        serializers.serialize('json', entries, stream=fh)
+    logger.error('%d entradas de auditoría guardadas en %s', len(entries), path)
+    return path
+
+
+@contextlib.contextmanager
+def buffer_audit_entries():
+    """
+    Acumula las entradas creadas dentro del bloque (modo batched) y las
+    inserta al salir con un bulk_create. Anidado, el bloque exterior manda.
+    """
+    if _buffer.get() is not None:
+        yield
+        return
+    entries = []
+    token = _buffer.set(entries)
+    try:
+        yield entries
+    finally:
+        _buffer.reset(token)
+        write_entries(entries)
+
+
+class AuditWriterMiddleware:
+    """Un bulk_create de LogEntry por request en modo batched"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if get_mode() != 'batched':
+            return self.get_response(request)
+        with buffer_audit_entries():
+            return self.get_response(request)
+
+
+class BackgroundAuditWriter:
+    """
+    Hilo que inserta por lotes las entradas de una cola acotada. Si la cola
+    se llena, submit() bloquea (contrapresión) en lugar de descartar.
+    stop() vacía lo pendiente en el hilo que lo llama.
+    """
+
+    def __init__(self, batch_size=500, flush_interval=1.0, maxsize=10000, retries=3):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self._queue = queue.Queue(maxsize)
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, entry):
+        self._queue.put(entry)
+
+    def stop(self, timeout=10):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        # Lo que el hilo no llegó a escribir (o todo, si nunca arrancó)
+        while True:
+            batch = self._drain()
+            if not batch:
+                break
+            self._deliver(batch)
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        # Esperar a completar el lote como mucho flush_interval
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stopping.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _deliver(self, batch):
+        close_old_connections()
+        for attempt in range(self.retries):
+            try:
+                LogEntry.objects.bulk_create(batch)
+                live.publish(batch)
+                return
+            except Exception:
+                logger.warning('Fallo al insertar %d entradas de auditoría (intento %d)',
+                               len(batch), attempt + 1, exc_info=True)
+                if self._stopping.is_set():
+                    break
+                time.sleep(0.5 * 2 ** attempt)
+        write_fallback(batch)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._collect()
+            if batch:
+                self._deliver(batch)
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def get_background_writer():
+    global _background
+    if _background is None:
+        with _background_lock:
+            if _background is None:
+                conf = writer_settings()
+                writer = BackgroundAuditWriter(
+                    batch_size=conf['WRITER_BATCH_SIZE'],
+                    flush_interval=conf['WRITER_FLUSH_INTERVAL'],
+                    maxsize=conf['WRITER_QUEUE_SIZE'],
+                )
+                writer.start()
+                atexit.register(writer.stop)
+                _background = writer
+    return _background
+
+
+def _forget_background_writer():
+    # Tras fork (gunicorn --preload) el hilo no existe en el hijo
+    global _background, _background_lock
+    _background = None
+    _background_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_background_writer)
+
+
+def capture(manager, kwargs):
+    """Sustituto de LogEntryManager.create en los modos batched y background"""
+    entry = manager.model(**kwargs)
+    # Lo que haría save(): los receptores pre_save de set_actor completan
+    # actor, actor_email y remote_addr desde el contexto actual
+    pre_save.send(sender=manager.model, instance=entry, raw=False,
+                  using=manager.db, update_fields=None)
+    mode = get_mode()
+    if mode == 'background':
+        transaction.on_commit(partial(get_background_writer().submit, entry))
+        return entry
+    entries = _buffer.get()
+    if entries is None:
+        # Fuera de un request (shell, comandos): escritura inmediata
+        entry.save()
+        return entry
+    transaction.on_commit(partial(entries.append, entry))
+    return entry
+
+
+def _intercept_create(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        token = _capturing.set(True)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _capturing.reset(token)
+    return wrapper
+
+
+def install():
+    """Conecta el writer a django-auditlog (AuditConfig.ready)"""
+    if getattr(LogEntryManager, '_audit_writer_installed', False):
+        return
+    original_create = LogEntryManager.create
+
+    def create(self, **kwargs):
+        if _capturing.get() and get_mode() != 'sync':
+            return capture(self, kwargs)
+        return original_create(self, **kwargs)
+
+    LogEntryManager.create = create
+    LogEntryManager.log_create = _intercept_create(LogEntryManager.log_create)
+    LogEntryManager.log_m2m_changes = _intercept_create(LogEntryManager.log_m2m_changes)
+    LogEntryManager._audit_writer_installed = True
@@ -3,6 +3,11 @@ ASGI config for myinner_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+El feed en vivo del dashboard de auditoría (GET /audit/api/live/, Server-Sent
+Events) solo se sirve con esta aplicación, p. ej.
+``uvicorn myinner_backend.asgi:application``: cada conexión abierta es una
+corrutina, no un worker. Bajo WSGI ese endpoint responde 501.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -0,0 +1,152 @@
+"""
+Logging sin bloqueo: QueueHandler + QueueListener, JSON y rotación comprimida
+
+Los middlewares de auditoría escriben varias líneas por request. Con un
+FileHandler la escritura (y cualquier bloqueo del disco) ocurre en el hilo
+del request. QueuedHandler solo encola el registro; un QueueListener por
+handler lo formatea y escribe desde su propio hilo.
+
+Uso en settings.LOGGING:
+
+    'file': {
+        '()': 'myinner_backend.log.QueuedHandler',
+        'target': {
+            'class': 'myinner_backend.log.CompressingRotatingFileHandler',
+            'filename': '/var/log/myinner/django.log',
+            'maxBytes': 50 * 1024 * 1024,
+            'backupCount': 10,
+        },
+        'formatter': 'json',
+    }
+"""
+
+import atexit
+import copy
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+from datetime import datetime, timezone
+
+from django.utils.module_loading import import_string
+
+# Atributos de LogRecord; el resto son campos de `extra`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos de `extra` al mismo nivel"""
+
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'process': record.process,
+            'thread': record.thread,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc_info'] = record.exc_text
+        if record.stack_info:
+            data['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class _CompressingMixin:
+    def __init__(self, *args, compress=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        if compress:
+            self.namer = _gzip_namer
+            self.rotator = _gzip_rotator
+
+
+class CompressingRotatingFileHandler(_CompressingMixin, logging.handlers.RotatingFileHandler):
+    """Rotación por tamaño; los archivos rotados se guardan como .gz"""
+
+
+class CompressingTimedRotatingFileHandler(_CompressingMixin, logging.handlers.TimedRotatingFileHandler):
+    """Rotación por tiempo; los archivos rotados se guardan como .gz"""
+
+
+class QueuedHandler(logging.handlers.QueueHandler):
+    """
+    Encola el registro y lo entrega a `target` desde un hilo propio.
+
+    `target` es un dict con 'class' y los argumentos del handler real. El
+    formatter configurado se aplica en el hilo del listener. Con la cola
+    llena el registro se descarta (nunca se bloquea al request) y se avisa
+    del número de descartes en cuanto vuelve a haber sitio.
+    """
+
+    def __init__(self, target, queue_size=10000):
+        options = dict(target)
+        handler_class = import_string(options.pop('class'))
+        filename = options.get('filename')
+        if filename:
+            os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self.target = handler_class(**options)
+        self.dropped = 0
+        # enqueue() corre en los hilos de los requests
+        self._dropped_lock = threading.Lock()
+        super().__init__(queue.Queue(queue_size))
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Fijar el mensaje ahora (los argumentos pueden cambiar después);
+        # el formateo completo lo hace el listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        try:
+            if dropped:
+                self.queue.put_nowait(self._dropped_record(dropped))
+                dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # El aviso que no cupo se suma a los descartes pendientes
+            with self._dropped_lock:
+                self.dropped += dropped + 1
+
+    def _dropped_record(self, dropped):
+        return logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            f'Cola de logging llena: {dropped} registros descartados', None, None,
+        )
+
+    def close(self):
+        # Vacía la cola antes de cerrar el archivo
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
@@ -0,0 +1,183 @@
+"""
+Servicio de archivos de MEDIA_ROOT
+
+Sustituye a django.conf.urls.static (solo DEBUG) por una vista apta para
+producción:
+- Offload al servidor web con X-Accel-Redirect (nginx) o X-Sendfile
+  (Apache/lighttpd), de modo que Python nunca lee el archivo
+- Requests HTTP Range (un solo rango) con 206/416
+- ETag fuerte, Last-Modified y respuestas 304 condicionales
+- Cache-Control inmutable de larga duración para nombres direccionados
+  por contenido (hash hexadecimal en el nombre del archivo)
+"""
+
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from users.storage import is_content_addressed
+
+mimetypes.add_type('image/webp', '.webp')
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+CHUNK_SIZE = 64 * 1024
+
+# Los mismos que usa FileResponse para archivos comprimidos
+ENCODED_CONTENT_TYPES = {
+    'br': 'application/x-brotli',
+    'bzip2': 'application/x-bzip',
+    'compress': 'application/x-compress',
+    'gzip': 'application/gzip',
+    'xz': 'application/x-xz',
+}
+
+
+def media_content_type(path):
+    """
+    Content-Type de un archivo almacenado. Un .gz o .br es el propio archivo
+    comprimido, no una codificación de transporte: con Content-Encoding el
+    navegador lo descomprimiría y no cuadrarían Content-Length, rangos ni ETag
+    """
+    content_type, encoding = mimetypes.guess_type(path)
+    if encoding:
+        return ENCODED_CONTENT_TYPES.get(encoding, 'application/octet-stream')
+    return content_type or 'application/octet-stream'
+
+
+def compute_etag(path, st):
+    """ETag fuerte: el hash del nombre si existe, si no tamaño + mtime en ns"""
+    if is_content_addressed(path):
+        return '"%s"' % os.path.basename(path)
+    return '"%x-%x"' % (st.st_size, st.st_mtime_ns)
+
+
+def parse_range(header, size):
+    """
+    Devuelve (inicio, fin) inclusivo para un rango único 'bytes=a-b',
+    None si la cabecera no aplica (se sirve el archivo completo) o
+    'unsatisfiable' si el rango queda fuera del archivo
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Sufijo: últimos N bytes
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _iter_range(full_path, start, length):
+    with open(full_path, 'rb') as fh:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        tags = [t.strip() for t in if_none_match.split(',')]
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def _offload_response(path, full_path):
+    mode = settings.MEDIA_SERVE_MODE
+    response = HttpResponse()
+    if mode == 'x-accel':
+        prefix = settings.MEDIA_ACCEL_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = quote(f"{prefix}/{path}")
+    else:
+        response['X-Sendfile'] = full_path
+    # El servidor web calcula Content-Length y atiende los rangos
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Sirve `path` relativo a MEDIA_ROOT"""
+    try:
+        full_path = safe_join(str(settings.MEDIA_ROOT), path)
+        st = os.stat(full_path)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404('Archivo no encontrado')
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404('Archivo no encontrado')
+
+    etag = compute_etag(path, st)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(st.st_mtime),
+        'Cache-Control': (
+            f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+            if is_content_addressed(path)
+            else f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+        ),
+        'Accept-Ranges': 'bytes',
+    }
+
+    if _not_modified(request, etag, st.st_mtime):
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_SERVE_MODE in ('x-accel', 'x-sendfile'):
+        response = _offload_response(path, full_path)
+    else:
+        response = _python_response(request, full_path, st.st_size, etag)
+
+    if response.status_code not in (304, 416):
+        response['Content-Type'] = media_content_type(full_path)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def _python_response(request, full_path, size, etag):
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    # If-Range: solo aplicar el rango si la representación no cambió
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range is not None and if_range and if_range.strip() != etag:
+        byte_range = None
+
+    if byte_range == 'unsatisfiable':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        # FileResponse usa wsgi.file_wrapper (sendfile) si el servidor lo ofrece
+        return FileResponse(open(full_path, 'rb'))
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(_iter_range(full_path, start, length), status=206)
+    response['Content-Length'] = str(length)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
     # Apps propias
     'users',
     'notes',
+    'audit',
 ]
 
 MIDDLEWARE = [
@@ -56,10 +57,10 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'auditlog.middleware.AuditlogMiddleware',  # Middleware de auditoría base
-    'audit.middleware.AuditMiddleware',  # Middleware de auditoría personalizado
-    'audit.middleware.AuthenticationAuditMiddleware',  # Auditoría de autenticación
-    'audit.middleware.DataAccessAuditMiddleware',  # Auditoría de acceso a datos
+    'audit.writer.AuditWriterMiddleware',  # Escritura por lotes de LogEntry (AUDIT_WRITER_MODE)
+    # Auditoría en una pasada: contexto del request, actor de auditlog,
+    # autenticación y acceso a datos (sustituye a AuditlogMiddleware)
+    'audit.middleware.AuditMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -241,6 +242,69 @@ else:
 CSRF_COOKIE_NAME = 'csrftoken'
 SESSION_COOKIE_NAME = 'sessionid'
 
+# =============================================================================
+# CACHE & SESSION ENGINE
+# =============================================================================
+# Backend de caché local: locmem (por proceso), file (compartido entre
+# procesos de la misma máquina) o redis (compartido entre máquinas)
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+CACHE_DEFAULT_LOCATIONS = {
+    'locmem': 'myinner-default',
+    'file': str(BASE_DIR / 'cache'),
+    'redis': 'redis://127.0.0.1:6379/1',
+    'dummy': '',
+}
+
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(
+        f"CACHE_BACKEND='{CACHE_BACKEND}' no soportado. "
+        f"Opciones: {', '.join(CACHE_BACKENDS)}"
+    )
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_DEFAULT_LOCATIONS[CACHE_BACKEND]),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+    }
+}
+
+# Caché dedicada a los buckets de throttling (ver users/throttling.py);
+# con locmem usa su propia región para no vaciarse junto a 'default'
+CACHES['throttle'] = {**CACHES['default'], 'KEY_PREFIX': 'throttle'}
+if CACHE_BACKEND == 'locmem':
+    CACHES['throttle']['LOCATION'] = 'myinner-throttle'
+THROTTLE_CACHE_ALIAS = 'throttle'
+
+# Motor de sesiones: 'db' (por defecto de Django, un SELECT por request),
+# 'cached_db' (lectura desde caché con escritura a BD), 'cache' (solo caché)
+# o 'signed_cookies' (sin almacenamiento en servidor)
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+SESSION_BACKEND = config('SESSION_BACKEND', default='db')
+if SESSION_BACKEND not in SESSION_ENGINES:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(
+        f"SESSION_BACKEND='{SESSION_BACKEND}' no soportado. "
+        f"Opciones: {', '.join(SESSION_ENGINES)}"
+    )
+
+SESSION_ENGINE = SESSION_ENGINES[SESSION_BACKEND]
+SESSION_CACHE_ALIAS = 'default'
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -251,6 +315,19 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'users.pagination.CustomPageNumberPagination',
     'PAGE_SIZE': 10,
+    # Throttling token bucket (users/throttling.py); formato 'N/periodo'
+    'DEFAULT_THROTTLE_CLASSES': [
+        'users.throttling.AnonBurstThrottle',
+        'users.throttling.UserBurstThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': config('THROTTLE_RATE_ANON', default='120/min'),
+        'user': config('THROTTLE_RATE_USER', default='600/min'),
+        'login': config('THROTTLE_RATE_LOGIN', default='30/min'),
+        'login_identifier': config('THROTTLE_RATE_LOGIN_IDENTIFIER', default='10/min'),
+        'register': config('THROTTLE_RATE_REGISTER', default='20/hour'),
+        'search': config('THROTTLE_RATE_SEARCH', default='60/min'),
+    },
 }
 
 # Modelo de usuario personalizado
@@ -262,13 +339,18 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 # Clave de encriptación para campos sensibles
 # IMPORTANTE: En producción debe estar en variables de entorno
-FIELD_ENCRYPTION_KEY = config(
+# Rotación: varias claves separadas por comas ("nueva,antigua"). La primera
+# cifra y todas descifran (MultiFernet); después de desplegar la nueva clave,
+# `python manage.py rotate_encryption_key` re-cifra los datos existentes.
+FIELD_ENCRYPTION_KEYS = config(
     'FIELD_ENCRYPTION_KEY',
-    default='tu-clave-de-encriptacion-32-bytes-cambiar-en-produccion'
+    default='tu-clave-de-encriptacion-32-bytes-cambiar-en-produccion',
+    cast=Csv()
 )
+FIELD_ENCRYPTION_KEY = FIELD_ENCRYPTION_KEYS if len(FIELD_ENCRYPTION_KEYS) > 1 else FIELD_ENCRYPTION_KEYS[0]
 
-# Validar que la clave tenga el tamaño correcto (32 bytes para Fernet)
-if len(FIELD_ENCRYPTION_KEY.encode()) != 32:
+# Validar que cada clave tenga el tamaño correcto (32 bytes en base64url = 44 caracteres)
+if any(len(key.encode()) != 44 for key in FIELD_ENCRYPTION_KEYS):
     import warnings
     if DEBUG:
         warnings.warn(
@@ -277,6 +359,15 @@ if len(FIELD_ENCRYPTION_KEY.encode()) != 32:
             UserWarning
         )
 
+# Encriptación de sobre: clave de datos por usuario cifrada con la clave
+# maestra (users/envelope.py). Caché en proceso de claves desenvueltas.
+ENVELOPE_ENCRYPTION = {
+    'KEY_CACHE_SIZE': config('ENVELOPE_KEY_CACHE_SIZE', default=1024, cast=int),
+    'KEY_CACHE_TTL': config('ENVELOPE_KEY_CACHE_TTL', default=300, cast=int),  # segundos
+    # Cifrado de los campos envelope binarios: aes-gcm | chacha20-poly1305
+    'AEAD_ALGORITHM': config('ENVELOPE_AEAD_ALGORITHM', default='aes-gcm'),
+}
+
 # =============================================================================
 # ADDITIONAL SECURITY SETTINGS (PRODUCTION)
 # =============================================================================
@@ -316,10 +407,54 @@ else:
     STATIC_ROOT = BASE_DIR / 'staticfiles'
     MEDIA_ROOT = BASE_DIR / 'media'
 
+# Procesamiento de imágenes de perfil (users/images.py)
+PROFILE_IMAGE_SETTINGS = {
+    'ASYNC': config('PROFILE_IMAGE_ASYNC', default=True, cast=bool),  # Variantes fuera del request
+    'WORKERS': config('PROFILE_IMAGE_WORKERS', default=2, cast=int),
+    'MAX_UPLOAD_MB': config('PROFILE_IMAGE_MAX_MB', default=5, cast=int),
+    'MAX_PIXELS': 25_000_000,
+    'VARIANT_SIZES': {'thumb': 64, 'small': 128, 'medium': 256},
+}
+
+# Servicio de media (myinner_backend/media.py):
+# python (FileResponse + Range) | x-accel (nginx) | x-sendfile (Apache) | off
+MEDIA_SERVE_MODE = config('MEDIA_SERVE_MODE', default='python')
+# Location interna de nginx que apunta a MEDIA_ROOT (ver PERFORMANCE.md)
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# max-age para archivos no direccionados por contenido
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)
+
 # =============================================================================
 # LOGGING CONFIGURATION
 # =============================================================================
 
+# Los handlers solo encolan: el formateo y la escritura ocurren en un hilo
+# por handler (myinner_backend/log.py), fuera del request
+LOG_FILE = config('LOG_FILE', default=str(BASE_DIR / 'logs' / 'django.log'))
+# Formato del archivo: json (una línea JSON por registro) | text
+LOG_FORMAT = config('LOG_FORMAT', default='json')
+# Rotación: size | time | none (archivos rotados comprimidos con gzip)
+LOG_ROTATION = config('LOG_ROTATION', default='size')
+
+_LOG_FILE_TARGETS = {
+    'size': {
+        'class': 'myinner_backend.log.CompressingRotatingFileHandler',
+        'maxBytes': config('LOG_MAX_BYTES', default=50 * 1024 * 1024, cast=int),
+        'backupCount': config('LOG_BACKUP_COUNT', default=10, cast=int),
+        'compress': config('LOG_COMPRESS', default=True, cast=bool),
+    },
+    'time': {
+        'class': 'myinner_backend.log.CompressingTimedRotatingFileHandler',
+        'when': config('LOG_ROTATION_WHEN', default='midnight'),
+        'backupCount': config('LOG_BACKUP_COUNT', default=10, cast=int),
+        'compress': config('LOG_COMPRESS', default=True, cast=bool),
+        'utc': True,
+    },
+    'none': {
+        'class': 'logging.FileHandler',
+    },
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -332,17 +467,21 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'myinner_backend.log.JSONFormatter',
+        },
     },
     'handlers': {
         'file': {
+            '()': 'myinner_backend.log.QueuedHandler',
             'level': config('LOG_LEVEL', default='INFO'),
-            'class': 'logging.FileHandler',
-            'filename': config('LOG_FILE', default=BASE_DIR / 'logs' / 'django.log'),
-            'formatter': 'verbose',
+            'target': {**_LOG_FILE_TARGETS[LOG_ROTATION], 'filename': LOG_FILE},
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'verbose',
         },
         'console': {
+            '()': 'myinner_backend.log.QueuedHandler',
             'level': 'DEBUG' if DEBUG else 'INFO',
-            'class': 'logging.StreamHandler',
+            'target': {'class': 'logging.StreamHandler'},
             'formatter': 'simple',
         },
     },
@@ -386,15 +525,80 @@ AUDITLOG_DISABLE_BULK_CREATE = False  # Auditar bulk operations
 # Configuración personalizada de auditoría
 AUDIT_SETTINGS = {
     'RETAIN_LOGS_DAYS': config('AUDIT_RETAIN_DAYS', default=365, cast=int),  # 1 año por defecto
+    # Purga por lotes (audit/retention.py, manage.py purge_audit_logs)
+    'RETENTION_BATCH_SIZE': config('AUDIT_RETENTION_BATCH_SIZE', default=5000, cast=int),
+    'RETENTION_SLEEP_SECONDS': config('AUDIT_RETENTION_SLEEP_SECONDS', default=0.1, cast=float),
+    # Archivo comprimido de logs antiguos (audit/archive.py, manage.py archive_audit_logs)
+    'ARCHIVE_DIR': config('AUDIT_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'audit')),
+    'ARCHIVE_COMPRESSION': config('AUDIT_ARCHIVE_COMPRESSION', default='gzip'),  # gzip | zstd
+    'ARCHIVE_BATCH_SIZE': config('AUDIT_ARCHIVE_BATCH_SIZE', default=50000, cast=int),
     'ENABLE_API_AUDIT': config('ENABLE_API_AUDIT', default=True, cast=bool),
     'ENABLE_AUTH_AUDIT': config('ENABLE_AUTH_AUDIT', default=True, cast=bool),
     'ENABLE_ADMIN_AUDIT': config('ENABLE_ADMIN_AUDIT', default=True, cast=bool),
+    # Escritura de LogEntry (audit/writer.py): sync | batched | background
+    'WRITER_MODE': config('AUDIT_WRITER_MODE', default='sync'),
+    'WRITER_BATCH_SIZE': config('AUDIT_WRITER_BATCH_SIZE', default=500, cast=int),
+    'WRITER_FLUSH_INTERVAL': config('AUDIT_WRITER_FLUSH_INTERVAL', default=1.0, cast=float),
+    'WRITER_QUEUE_SIZE': config('AUDIT_WRITER_QUEUE_SIZE', default=10000, cast=int),
+    # Rollups por hora (audit/rollups.py, manage.py compact_audit_rollups)
+    'ROLLUP_BATCH_SIZE': config('AUDIT_ROLLUP_BATCH_SIZE', default=50000, cast=int),
+    'ROLLUP_LAG_SECONDS': config('AUDIT_ROLLUP_LAG_SECONDS', default=60, cast=int),
+    # Caché de statistics y dashboard (audit/stats_cache.py); TTL 0 la desactiva
+    'STATS_CACHE_TTL': config('AUDIT_STATS_CACHE_TTL', default=30, cast=int),
+    'STATS_CACHE_STALE_SECONDS': config('AUDIT_STATS_CACHE_STALE_SECONDS', default=300, cast=int),
+    # Feed en vivo del dashboard por SSE (audit/live.py, solo bajo ASGI)
+    'LIVE_QUEUE_SIZE': config('AUDIT_LIVE_QUEUE_SIZE', default=1000, cast=int),
+    'LIVE_INTERVAL': config('AUDIT_LIVE_INTERVAL', default=1.0, cast=float),
+    'LIVE_KEEPALIVE': config('AUDIT_LIVE_KEEPALIVE', default=15.0, cast=float),
+    # Detector de fuerza bruta (audit/security.py): fallos de login en la
+    # ventana que disparan una alerta por IP, por usuario y en total
+    'SECURITY_WINDOW_SECONDS': config('AUDIT_SECURITY_WINDOW_SECONDS', default=300, cast=int),
+    'SECURITY_BUCKET_SECONDS': config('AUDIT_SECURITY_BUCKET_SECONDS', default=10, cast=int),
+    'SECURITY_IP_FAILURES': config('AUDIT_SECURITY_IP_FAILURES', default=10, cast=int),
+    'SECURITY_USERNAME_FAILURES': config('AUDIT_SECURITY_USERNAME_FAILURES', default=5, cast=int),
+    'SECURITY_GLOBAL_FAILURES': config('AUDIT_SECURITY_GLOBAL_FAILURES', default=100, cast=int),
+    'SECURITY_MAX_KEYS': config('AUDIT_SECURITY_MAX_KEYS', default=10000, cast=int),
+    'SECURITY_FLUSH_INTERVAL': config('AUDIT_SECURITY_FLUSH_INTERVAL', default=60, cast=int),
+    # Clasificación de rutas por prefijo (gana el más largo): categoría
+    # (flag ENABLE_*), acceso sensible, evento de login/logout y muestreo
+    'ROUTES': {
+        '/api/': {'category': 'api'},
+        '/api/auth/': {'category': 'auth', 'sensitive': True},
+        '/api/auth/login/': {'category': 'auth', 'sensitive': True, 'event': 'login'},
+        '/api/auth/logout/': {'category': 'auth', 'sensitive': True, 'event': 'logout'},
+        '/api/password-reset/': {'category': 'auth', 'sensitive': True},
+        '/api/users/': {'category': 'api', 'sensitive': True},
+        '/api/notes/': {'category': 'api', 'sensitive': True},
+        '/admin/': {'category': 'admin', 'sensitive': True},
+        '/admin/login/': {'category': 'admin', 'sensitive': True, 'event': 'login'},
+        '/admin/logout/': {'category': 'admin', 'sensitive': True, 'event': 'logout'},
+        '/audit/': {'category': 'admin'},
+    },
+    # Vistas cuyo acceso se registra (prefijo del módulo)
+    'DATA_ACCESS_VIEWS': ['notes.views', 'users.views'],
     'SENSITIVE_FIELDS': [
         'password', 'token', 'key', 'secret', 'api_key',
         'email', 'first_name', 'last_name'  # Campos encriptados
     ],
 }
 
+# Muestreo por ruta: AUDIT_SAMPLE_RATES="/api/notes/=0.01,/api/tags/=0.1"
+# (los errores y excepciones se registran siempre)
+for _rule in config('AUDIT_SAMPLE_RATES', default='', cast=Csv()):
+    _prefix, _, _rate = _rule.rpartition('=')
+    try:
+        _rate = float(_rate)
+    except ValueError:
+        _rate = None
+    if not _prefix.strip() or _rate is None or not 0 <= _rate <= 1:
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured(
+            f"AUDIT_SAMPLE_RATES: regla '{_rule}' no válida. "
+            f"Formato: prefijo=tasa, con tasa entre 0 y 1 (p. ej. /api/notes/=0.01)"
+        )
+    _route = AUDIT_SETTINGS['ROUTES'].setdefault(_prefix.strip(), {'category': 'api'})
+    _route['sample_rate'] = _rate
+
 # Configuración para captura de IP y User Agent
 AUDIT_IP_CAPTURE = {
     'ENABLE': True,
@@ -14,10 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+from urllib.parse import urlsplit
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+
+from .media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -25,5 +29,13 @@ urlpatterns = [
     path('audit/', include('audit.urls')),  # URLs de auditoría
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Media servida por la app (con offload opcional al servidor web); se omite
+# si MEDIA_URL apunta a otro host (CDN / almacenamiento externo)
+if settings.MEDIA_SERVE_MODE != 'off' and not urlsplit(settings.MEDIA_URL).netloc:
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+            serve_media,
+            name='media',
+        ),
+    ]
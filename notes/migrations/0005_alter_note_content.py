@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:30
+
+import users.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0004_alter_note_content'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='note',
+            name='content',
+            field=users.fields.LazyEncryptedTextField(),
+        ),
+    ]
@@ -0,0 +1,44 @@
+"""
+Quita el contenido en claro de las notas de los LogEntry ya guardados.
+
+Antes de registrar Note.content con mask_callable=users.envelope.redact,
+cada cambio de una nota guardaba el texto en LogEntry.changes, que
+sobrevivía al crypto-shredding de la clave del usuario.
+"""
+
+from django.db import migrations
+
+REDACTED = '[cifrado]'
+BATCH_SIZE = 1000
+
+
+def redact_content(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    LogEntry = apps.get_model('auditlog', 'LogEntry')
+
+    content_type = ContentType.objects.filter(app_label='notes', model='note').first()
+    if content_type is None:
+        return
+    entries = LogEntry.objects.filter(content_type=content_type, changes__has_key='content').only('id', 'changes')
+    batch = []
+    for entry in entries.iterator(chunk_size=BATCH_SIZE):
+        entry.changes['content'] = [REDACTED for _ in entry.changes['content']]
+        batch.append(entry)
+        if len(batch) >= BATCH_SIZE:
+            LogEntry.objects.bulk_update(batch, ['changes'])
+            batch = []
+    if batch:
+        LogEntry.objects.bulk_update(batch, ['changes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0007_alter_note_content'),
+        ('auditlog', '__latest__'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(redact_content, migrations.RunPython.noop),
+    ]
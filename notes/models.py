@@ -1,8 +1,8 @@
 from django.db import models
 from django.conf import settings
-from encrypted_model_fields.fields import EncryptedTextField
 from auditlog.registry import auditlog
 from auditlog.models import AuditlogHistoryField
+from users.fields import EnvelopeEncryptedBinaryField
 
 
 class Tag(models.Model):
@@ -22,8 +22,10 @@ class Tag(models.Model):
 class Note(models.Model):
 	user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notes')
 	title = models.CharField(max_length=200)
-	# Contenido encriptado para proteger datos sensibles
-	content = EncryptedTextField()
+	# Contenido encriptado con la clave de datos del usuario (envelope, AEAD
+	# binario); se desencripta solo al leer el atributo (listados y admin no
+	# pagan el coste)
+	content = EnvelopeEncryptedBinaryField(owner_field='user')
 	tags = models.ManyToManyField(Tag, related_name='notes', blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
@@ -39,5 +41,11 @@ class Note(models.Model):
 
 
 # Registro de modelos para auditoría
-auditlog.register(Note, exclude_fields=['updated_at'])
+# content se registra sin valor: el log sobreviviría al crypto-shredding
+auditlog.register(
+	Note,
+	exclude_fields=['updated_at'],
+	mask_fields=['content'],
+	mask_callable='users.envelope.redact',
+)
 auditlog.register(Tag, exclude_fields=['created_at'])
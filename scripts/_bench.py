@@ -0,0 +1,84 @@
+"""
+Utilidades compartidas por los benchmarks de scripts/
+
+Configura Django, crea una base de datos de pruebas desechable y ofrece
+helpers de medición e impresión de resultados.
+"""
+
+import os
+import sys
+import time
+import statistics
+from contextlib import contextmanager
+
+import django
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myinner_backend.settings')
+
+
+def setup():
+    """Inicializa Django (idempotente)"""
+    django.setup()
+
+
+@contextmanager
+def test_database(verbosity=0, keepdb=False):
+    """
+    Crea una base de datos de pruebas aislada para el benchmark y la
+    destruye al terminar, sin tocar db.sqlite3 ni la BD de producción.
+    Con keepdb=True se reutiliza y se conserva (datasets grandes).
+    """
+    from django.test.utils import (
+        setup_test_environment, teardown_test_environment,
+        setup_databases, teardown_databases,
+    )
+
+    setup_test_environment()
+    # Sin serializar el contenido (solo lo usan los TransactionTestCase):
+    # con keepdb y millones de filas costaría minutos y mucha memoria
+    old_config = setup_databases(verbosity=verbosity, interactive=False, keepdb=keepdb,
+                                 serialized_aliases=set())
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def measure(func, iterations, warmup=5):
+    """
+    Ejecuta func() `iterations` veces y devuelve estadísticas en milisegundos
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'mean_ms': statistics.fmean(samples),
+        'p50_ms': samples[len(samples) // 2],
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'total_ms': sum(samples),
+    }
+
+
+def print_table(headers, rows):
+    """Imprime una tabla alineada en texto plano"""
+    widths = [len(h) for h in headers]
+    formatted = []
+    for row in rows:
+        cells = [f"{c:.3f}" if isinstance(c, float) else str(c) for c in row]
+        widths = [max(w, len(c)) for w, c in zip(widths, cells)]
+        formatted.append(cells)
+
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join('-' * w for w in widths))
+    for cells in formatted:
+        print("  ".join(c.ljust(w) for c, w in zip(cells, widths)))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Benchmark del archivo comprimido de auditoría - MyInner
+
+Archiva las LogEntry fuera de la retención (audit/archive.py) y mide la
+velocidad de archivado, el tamaño de los archivos frente a la tabla y la
+latencia del camino de lectura: la página más reciente de un rango de un
+día y un filtro por actor sobre todo el archivo.
+
+Uso:
+    python scripts/bench_audit_archive.py [--rows 500000] [--compression gzip]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+import _bench
+
+_bench.setup()
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.db.models import Sum
+
+from audit import archive, retention
+from audit.models import AuditArchiveSegment
+from bench_audit_retention import seed
+from notes.models import Note
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--old-fraction', type=float, default=0.8, help='Fracción fuera de la retención')
+    parser.add_argument('--batch-size', type=int, default=50000)
+    parser.add_argument('--compression', choices=sorted(archive.EXTENSIONS), default='gzip')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--db-file', default=os.path.join(tempfile.gettempdir(), 'bench_audit_archive.sqlite3'),
+                        help='Archivo de la BD de pruebas con SQLite')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = args.db_file
+
+    with _bench.test_database(), tempfile.TemporaryDirectory() as directory:
+        content_type = ContentType.objects.get_for_model(Note).pk
+        cutoff = retention.retention_cutoff(30)
+        old_rows = seed(args.rows, args.old_fraction, cutoff, content_type)
+        table_bytes = None
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [LogEntry._meta.db_table])
+                table_bytes = cursor.fetchone()[0]
+
+        started = time.monotonic()
+        archived = archive.archive(cutoff, args.batch_size, args.compression, directory)
+        elapsed = time.monotonic() - started
+        assert archived == old_rows, (archived, old_rows)
+        archive_bytes = AuditArchiveSegment.objects.aggregate(total=Sum('size_bytes'))['total']
+
+        day_end = cutoff - timedelta(days=10)
+        results = []
+        timing = _bench.measure(
+            lambda: archive.read(day_end - timedelta(days=1), day_end, limit=100, directory=directory),
+            args.iterations, warmup=1,
+        )
+        results.append(('100 más recientes de un día', timing['mean_ms'], timing['p95_ms']))
+        timing = _bench.measure(
+            lambda: archive.read(action=LogEntry.Action.DELETE, limit=100, directory=directory),
+            args.iterations, warmup=1,
+        )
+        results.append(('100 más recientes por acción', timing['mean_ms'], timing['p95_ms']))
+
+    print(f"Archivadas {archived} entradas ({args.compression}) en {elapsed:.1f}s ({archived / elapsed:.0f}/s)")
+    if table_bytes:
+        print(f"Tabla LogEntry antes: {table_bytes / 2**20:.1f} MiB (sin índices)")
+    print(f"Archivos: {archive_bytes / 2**20:.1f} MiB ({archive_bytes / archived:.0f} bytes/entrada)")
+    _bench.print_table(['lectura', 'media ms', 'p95 ms'], results)
+
+
+if __name__ == '__main__':
+    main()
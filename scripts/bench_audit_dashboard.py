@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""
+Benchmark del dashboard de auditoría - MyInner
+
+Mide el cálculo de /audit/api/dashboard/ sobre una tabla LogEntry grande,
+comparando la implementación anterior (24 COUNT por hora + 3 COUNT), las
+consultas agrupadas sobre LogEntry de audit/stats.py y la lectura de los
+rollups por hora (audit/rollups.py), y la latencia del endpoint completo.
+
+La tabla se llena con INSERT directos (sin auditlog ni señales): entradas
+repartidas en --days días, con 4 acciones, 4 modelos y --users actores.
+Con SQLite la base de datos es un archivo (--db-file); --keepdb la conserva
+para no volver a generarla en la siguiente ejecución.
+
+Uso:
+    python scripts/bench_audit_dashboard.py [--rows 5000000] [--iterations 5] [--keepdb]
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+import _bench
+
+_bench.setup()
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from audit import rollups, stats
+from notes.models import Note, Tag
+from users.models import UserPreference
+
+User = get_user_model()
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+CHUNK = 50000
+
+
+def legacy_dashboard(queryset):
+    """audit_dashboard_data antes de audit/stats.py"""
+    total_actions = queryset.count()
+    unique_users = queryset.filter(actor__isnull=False).values('actor').distinct().count()
+    critical_actions = queryset.filter(
+        action__in=[LogEntry.Action.CREATE, LogEntry.Action.UPDATE, LogEntry.Action.DELETE]
+    ).count()
+    hourly = [{'hour': h, 'count': queryset.filter(timestamp__hour=h).count()} for h in range(24)]
+    top_models = list(queryset.select_related('content_type').values(
+        'content_type__app_label', 'content_type__model'
+    ).annotate(count=Count('id')).order_by('-count')[:5])
+    top_users = list(queryset.filter(actor__isnull=False).values(
+        'actor__username'
+    ).annotate(count=Count('id')).order_by('-count')[:5])
+    return total_actions, unique_users, critical_actions, hourly, top_models, top_users
+
+
+def grouped_dashboard(queryset):
+    return (
+        stats.summary_metrics(queryset), stats.hourly_activity(queryset),
+        stats.top_models(queryset), stats.top_users(queryset),
+    )
+
+
+def seed(rows, users, days):
+    if LogEntry.objects.count() >= rows:
+        print(f"Reutilizando {LogEntry.objects.count()} entradas existentes")
+        return
+    LogEntry.objects.all().delete()
+    User.objects.bulk_create([
+        User(username=f'bench_{i}', email=f'bench_{i}@example.com') for i in range(users)
+    ], ignore_conflicts=True)
+    actor_ids = list(User.objects.values_list('pk', flat=True))
+    content_types = [ContentType.objects.get_for_model(m).pk for m in (Note, Tag, User, UserPreference)]
+
+    table = connection.ops.quote_name(LogEntry._meta.db_table)
+    timestamp_field = LogEntry._meta.get_field('timestamp')
+    sql = (
+        f"INSERT INTO {table} (content_type_id, object_pk, object_id, object_repr, action, "
+        f"changes_text, actor_id, timestamp) VALUES (%s, %s, %s, %s, %s, '', %s, %s)"
+    )
+    now = timezone.now()
+    span = days * 86400
+    rng = random.Random(42)
+    started = time.monotonic()
+    for offset in range(0, rows, CHUNK):
+        params = []
+        for i in range(offset, min(rows, offset + CHUNK)):
+            moment = now - timedelta(seconds=rng.random() * span)
+            params.append((
+                rng.choice(content_types), str(i), i, f'objeto {i}', rng.randrange(4),
+                rng.choice(actor_ids) if rng.random() < 0.9 else None,
+                timestamp_field.get_db_prep_value(moment, connection),
+            ))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+        print(f"\r  {offset + len(params)}/{rows} entradas", end='', flush=True)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {table}")
+    print(f"\n  generadas en {time.monotonic() - started:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=60, help='Días que cubren las entradas')
+    parser.add_argument('--window', type=int, default=30, help='Parámetro days del dashboard')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--db-file', default=os.path.join(tempfile.gettempdir(), 'bench_audit_dashboard.sqlite3'),
+                        help='Archivo de la BD de pruebas con SQLite')
+    parser.add_argument('--keepdb', action='store_true', help='Conservar y reutilizar la BD generada')
+    parser.add_argument('--skip-legacy', action='store_true', help='No medir la implementación anterior')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = args.db_file
+
+    with _bench.test_database(keepdb=args.keepdb), override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        seed(args.rows, args.users, args.days)
+        started = time.monotonic()
+        compacted = rollups.compact(lag=0)
+        print(f"Rollups: {compacted} entradas compactadas en {time.monotonic() - started:.1f}s")
+        start = timezone.now() - timedelta(days=args.window)
+        queryset = LogEntry.objects.filter(timestamp__gte=start)
+        admin = User.objects.filter(username='bench_admin').first() or User.objects.create_superuser(
+            username='bench_admin', email='bench_admin@example.com', password='BenchPass123',
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        results = []
+        if not args.skip_legacy:
+            timing = _bench.measure(lambda: legacy_dashboard(queryset), args.iterations, warmup=1)
+            results.append(('anterior (28 consultas)', timing['mean_ms'], timing['p95_ms']))
+        timing = _bench.measure(lambda: grouped_dashboard(queryset), args.iterations, warmup=1)
+        results.append(('agrupado (4-5 consultas)', timing['mean_ms'], timing['p95_ms']))
+        timing = _bench.measure(lambda: stats.dashboard(start), args.iterations, warmup=1)
+        results.append(('rollups (stats.dashboard)', timing['mean_ms'], timing['p95_ms']))
+        timing = _bench.measure(lambda: rollups.compact(lag=0), args.iterations, warmup=0)
+        results.append(('compact sin entradas nuevas', timing['mean_ms'], timing['p95_ms']))
+        url = f'/audit/api/dashboard/?days={args.window}'
+        timing = _bench.measure(lambda: client.get(url), args.iterations, warmup=1)
+        results.append(('GET /audit/api/dashboard/', timing['mean_ms'], timing['p95_ms']))
+
+    print(f"LogEntry: {args.rows} filas en {args.days} días, ventana {args.window} días "
+          f"({connection.vendor})")
+    _bench.print_table(['caso', 'media ms', 'p95 ms'], results)
+
+
+if __name__ == '__main__':
+    main()
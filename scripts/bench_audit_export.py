@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Benchmark de la exportación en streaming de auditoría - MyInner
+
+Descarga GET /audit/api/logs/export/ completo (CSV y NDJSON) sobre la BD de
+scripts/bench_audit_dashboard.py y mide filas por segundo, bytes generados
+y el máximo de memoria residente del proceso antes y después de cada
+exportación (con streaming no debe crecer con el número de filas).
+
+Uso:
+    python scripts/bench_audit_export.py [--rows 5000000] [--keepdb]
+"""
+
+import argparse
+import logging
+import os
+import resource
+import tempfile
+import time
+
+import _bench
+
+_bench.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from bench_audit_dashboard import FAST_HASHERS, seed
+
+User = get_user_model()
+
+
+def max_rss_mib():
+    # ru_maxrss está en KiB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--db-file', default=os.path.join(tempfile.gettempdir(), 'bench_audit_dashboard.sqlite3'),
+                        help='Archivo de la BD de pruebas con SQLite')
+    parser.add_argument('--keepdb', action='store_true', help='Conservar y reutilizar la BD generada')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = args.db_file
+
+    results = []
+    with _bench.test_database(keepdb=args.keepdb), override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        seed(args.rows, args.users, args.days)
+        admin = User.objects.filter(username='bench_admin').first() or User.objects.create_superuser(
+            username='bench_admin', email='bench_admin@example.com', password='BenchPass123',
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        for export_format in ('csv', 'ndjson'):
+            rss_before = max_rss_mib()
+            started = time.monotonic()
+            response = client.get('/audit/api/logs/export/', {'export_format': export_format})
+            size = lines = 0
+            for block in response.streaming_content:
+                size += len(block)
+                lines += block.count(b'\n')
+            elapsed = time.monotonic() - started
+            rows = lines - 1 if export_format == 'csv' else lines
+            results.append((
+                export_format, rows, f"{elapsed:.1f}", f"{rows / elapsed:.0f}",
+                f"{size / 2**20:.0f}", f"{rss_before:.0f}", f"{max_rss_mib():.0f}",
+            ))
+
+    print(f"LogEntry: {args.rows} filas ({connection.vendor})")
+    _bench.print_table(
+        ['formato', 'filas', 'segundos', 'filas/s', 'MiB generados', 'RSS máx antes', 'RSS máx después'],
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
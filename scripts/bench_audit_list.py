@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Benchmark de la serialización del listado de auditoría - MyInner
+
+Compara la serialización anterior del listado (una instancia de LogEntry
+con actor y content_type por fila vía select_related) con la de
+audit/serializers.py (.values() y mapa de etiquetas) en páginas grandes,
+contando consultas y tiempo, y la actividad reciente de user_activity
+antes (content_type perezoso: una consulta por entrada) y después.
+
+Reutiliza la BD de scripts/bench_audit_dashboard.py (mismo --db-file);
+con --keepdb no se vuelve a generar.
+
+Uso:
+    python scripts/bench_audit_list.py [--rows 5000000] [--keepdb]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+
+import _bench
+
+_bench.setup()
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from audit import serializers
+from bench_audit_dashboard import seed
+
+
+def legacy_list(queryset, size):
+    """La serialización que hacía AuditLogViewSet.list con instancias"""
+    return [
+        {
+            'id': log_entry.id,
+            'timestamp': log_entry.timestamp,
+            'actor': log_entry.actor.username if log_entry.actor else 'System',
+            'action': log_entry.action,
+            'model': (f"{log_entry.content_type.app_label}.{log_entry.content_type.model}" if log_entry.content_type else 'Unknown'),
+            'object_id': log_entry.object_id,
+            'object_repr': log_entry.object_repr,
+            'changes': log_entry.changes,
+            'additional_data': log_entry.additional_data,
+            'remote_addr': log_entry.remote_addr,
+        }
+        for log_entry in queryset.select_related('actor', 'content_type')[:size]
+    ]
+
+
+def legacy_recent(queryset, size):
+    """La actividad reciente de user_activity, sin select_related"""
+    return [
+        {
+            'timestamp': log.timestamp,
+            'action': log.action,
+            'model': (f"{log.content_type.app_label}.{log.content_type.model}" if log.content_type else 'Unknown'),
+            'object_repr': log.object_repr,
+            'changes_count': len(log.changes) if log.changes else 0,
+        }
+        for log in queryset[:size]
+    ]
+
+
+def run(func, iterations):
+    # Consultas de una llamada ya en régimen (caché de ContentType cargada)
+    func()
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    timing = _bench.measure(func, iterations, warmup=0)
+    return len(queries), timing['mean_ms'], timing['p95_ms']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--db-file', default=os.path.join(tempfile.gettempdir(), 'bench_audit_dashboard.sqlite3'),
+                        help='Archivo de la BD de pruebas con SQLite')
+    parser.add_argument('--keepdb', action='store_true', help='Conservar y reutilizar la BD generada')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = args.db_file
+
+    results = []
+    with _bench.test_database(keepdb=args.keepdb):
+        seed(args.rows, args.users, args.days)
+        queryset = LogEntry.objects.order_by('-timestamp', '-id')
+        for size in (100, 1000, 10000):
+            queries, mean, p95 = run(lambda: legacy_list(queryset, size), args.iterations)
+            results.append(('listado', size, 'instancias', queries, mean, p95))
+            queries, mean, p95 = run(
+                lambda: serializers.serialize_logs(serializers.list_values(queryset)[:size]), args.iterations,
+            )
+            results.append(('listado', size, 'values()', queries, mean, p95))
+
+        actor = LogEntry.objects.filter(actor__isnull=False).values_list('actor', flat=True).first()
+        user_logs = LogEntry.objects.filter(actor_id=actor).order_by('-timestamp')
+        # Sin caché de ContentType, como el primer request de cada proceso
+        clear = ContentType.objects.clear_cache
+        queries, mean, p95 = run(lambda: (clear(), legacy_recent(user_logs, 20)), args.iterations)
+        results.append(('actividad reciente', 20, 'instancias', queries, mean, p95))
+        queries, mean, p95 = run(lambda: (clear(), serializers.recent_activity(user_logs, 20)), args.iterations)
+        results.append(('actividad reciente', 20, 'values()', queries, mean, p95))
+
+    print(f"LogEntry: {args.rows} filas ({connection.vendor})")
+    _bench.print_table(['caso', 'filas', 'serialización', 'consultas', 'media ms', 'p95 ms'], results)
+
+
+if __name__ == '__main__':
+    main()
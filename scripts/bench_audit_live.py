@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+"""
+Benchmark del feed en vivo del dashboard de auditoría - MyInner
+
+Compara lo que cuesta mantener el dashboard al día:
+
+- polling (lo anterior): cada refresco pide /audit/api/dashboard/ y
+  /audit/api/logs/; se mide con la caché de estadísticas vacía y llena.
+- SSE (audit/live.py): cuánto añade publicar a quien escribe el log según
+  el número de conexiones abiertas, y cuánto tarda una entrada en llegar a
+  todas ellas (--clients generadores event_stream en un event loop, con
+  LIVE_INTERVAL=0 para medir solo el reparto).
+- cliente lento: una conexión que no lee no acumula más de LIVE_QUEUE_SIZE
+  entradas; el resto se descarta y se le pide resync.
+
+Reutiliza la BD de scripts/bench_audit_dashboard.py (mismo --db-file);
+con --keepdb no se vuelve a generar.
+
+Uso:
+    python scripts/bench_audit_live.py [--rows 5000000] [--clients 1000] [--keepdb]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import _bench
+
+_bench.setup()
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from audit import live, stats_cache
+from bench_audit_dashboard import FAST_HASHERS, seed
+
+User = get_user_model()
+
+
+def make_entries(content_type, count):
+    now = timezone.now()
+    return [
+        LogEntry(id=i, content_type=content_type, object_pk=str(i), object_id=i,
+                 object_repr=f'objeto {i}', action=LogEntry.Action.UPDATE, timestamp=now)
+        for i in range(count)
+    ]
+
+
+class Clients:
+    """`count` conexiones SSE (event_stream) en un event loop de otro hilo"""
+
+    def __init__(self, count):
+        self.count = count
+        self.received = 0
+        self.all_received = threading.Event()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.tasks = []
+
+    async def _consume(self):
+        async for chunk in live.event_stream():
+            if chunk.startswith('event: entries'):
+                self.received += 1
+                if self.received == self.count:
+                    self.all_received.set()
+
+    def __enter__(self):
+        self.thread.start()
+        for _ in range(self.count):
+            self.tasks.append(asyncio.run_coroutine_threadsafe(self._consume(), self.loop))
+        while len(live.broadcast._subscribers) < self.count:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        for task in self.tasks:
+            task.cancel()
+        while live.broadcast:
+            time.sleep(0.01)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def deliver(self, entries):
+        """Milisegundos desde publicar hasta que todas las conexiones reciben el evento"""
+        self.received = 0
+        self.all_received.clear()
+        started = time.perf_counter()
+        live.publish(entries)
+        self.all_received.wait()
+        return (time.perf_counter() - started) * 1000
+
+
+def publish_cost(entries, iterations):
+    return _bench.measure(lambda: live.publish(entries), iterations, warmup=10)['mean_ms'] * 1000
+
+
+def slow_client(content_type, published):
+    """(entradas retenidas, descartadas) de una conexión que no lee"""
+    async def scenario():
+        subscription = live.broadcast.subscribe(live.live_settings()['LIVE_QUEUE_SIZE'])
+        try:
+            for offset in range(0, published, 500):
+                await asyncio.to_thread(live.publish, make_entries(content_type, 500))
+            return len(subscription._items), subscription.dropped
+        finally:
+            live.broadcast.unsubscribe(subscription)
+    return asyncio.run(scenario())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--db-file', default=os.path.join(tempfile.gettempdir(), 'bench_audit_dashboard.sqlite3'),
+                        help='Archivo de la BD de pruebas con SQLite')
+    parser.add_argument('--keepdb', action='store_true', help='Conservar y reutilizar la BD generada')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = args.db_file
+
+    live_settings = {**settings.AUDIT_SETTINGS, 'LIVE_INTERVAL': 0, 'LIVE_KEEPALIVE': 3600}
+    with _bench.test_database(keepdb=args.keepdb), override_settings(PASSWORD_HASHERS=FAST_HASHERS), \
+            override_settings(AUDIT_SETTINGS=live_settings):
+        seed(args.rows, args.users, args.days)
+        admin = User.objects.filter(username='bench_admin').first() or User.objects.create_superuser(
+            username='bench_admin', email='bench_admin@example.com', password='BenchPass123',
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        def refresh():
+            client.get('/audit/api/dashboard/')
+            client.get('/audit/api/logs/', {'page_size': 10})
+
+        def cold_refresh():
+            stats_cache.invalidate()
+            refresh()
+
+        polling = [
+            ('caché vacía', _bench.measure(cold_refresh, 5, warmup=1)),
+            ('caché llena', _bench.measure(refresh, args.iterations, warmup=1)),
+        ]
+
+        content_type = ContentType.objects.get_for_model(User)
+        one, batch = make_entries(content_type, 1), make_entries(content_type, 500)
+        publishing = [(0, publish_cost(one, 10000), publish_cost(batch, 200))]
+        fanout = []
+        for count in sorted({1, 100, args.clients}):
+            with Clients(count) as clients:
+                samples = sorted(clients.deliver(one) for _ in range(args.iterations))
+                fanout.append((count, samples[len(samples) // 2], samples[int(len(samples) * 0.95)]))
+                # Después del reparto: estas ráfagas llenan las colas (resync)
+                publishing.append((count, publish_cost(one, 200), publish_cost(batch, 20)))
+        retained, dropped = slow_client(content_type, 100_000)
+
+    print(f"LogEntry: {args.rows} filas ({connection.vendor})")
+    _bench.print_table(['refresco por polling (dashboard + 10 logs)', 'media ms', 'p95 ms'], [
+        (label, result['mean_ms'], result['p95_ms']) for label, result in polling
+    ])
+    _bench.print_table(['conexiones SSE', 'publicar 1 entrada µs', 'publicar 500 entradas µs'], publishing)
+    _bench.print_table(['conexiones SSE', 'reparto p50 ms', 'reparto p95 ms'], fanout)
+    print(f"Cliente que no lee tras 100000 entradas: {retained} en cola, {dropped} descartadas")
+
+
+if __name__ == '__main__':
+    main()
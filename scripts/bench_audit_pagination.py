@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Benchmark de la paginación del listado de auditoría - MyInner
+
+Compara GET /audit/api/logs/ con la paginación numerada (?page=N: COUNT +
+OFFSET) y con la paginación por cursor sobre (timestamp, id) de
+audit/pagination.py, en la primera página y en una página profunda, sin
+filtro y filtrando por actor y por rango de fechas.
+
+Reutiliza la BD de scripts/bench_audit_dashboard.py (mismo --db-file);
+con --keepdb no se vuelve a generar.
+
+Uso:
+    python scripts/bench_audit_pagination.py [--rows 5000000] [--depth 2000] [--keepdb]
+"""
+
+import argparse
+import base64
+import json
+import logging
+import os
+import tempfile
+from datetime import timedelta
+
+import _bench
+
+_bench.setup()
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bench_audit_dashboard import FAST_HASHERS, seed
+
+User = get_user_model()
+
+
+def cursor_at(queryset, offset):
+    """Cursor que continúa después de la fila `offset` (orden -timestamp, -id)"""
+    row = queryset.order_by('-timestamp', '-id')[offset - 1]
+    data = {'t': row.timestamp.isoformat(), 'i': row.pk, 'r': 0}
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode('ascii')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--depth', type=int, default=2000, help='Página profunda a medir')
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--db-file', default=os.path.join(tempfile.gettempdir(), 'bench_audit_dashboard.sqlite3'),
+                        help='Archivo de la BD de pruebas con SQLite')
+    parser.add_argument('--keepdb', action='store_true', help='Conservar y reutilizar la BD generada')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = args.db_file
+
+    results = []
+    with _bench.test_database(keepdb=args.keepdb), override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        seed(args.rows, args.users, args.days)
+        admin = User.objects.filter(username='bench_admin').first() or User.objects.create_superuser(
+            username='bench_admin', email='bench_admin@example.com', password='BenchPass123',
+        )
+        actor = LogEntry.objects.filter(actor__isnull=False).values_list('actor', flat=True).first()
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        since = (timezone.now() - timedelta(days=7)).isoformat()
+        cases = [
+            ('sin filtro', {}, LogEntry.objects.all()),
+            ('actor', {'user_id': actor}, LogEntry.objects.filter(actor_id=actor)),
+            ('últimos 7 días', {'date_from': since}, LogEntry.objects.filter(timestamp__gte=since)),
+        ]
+        size = args.page_size
+        for label, params, queryset in cases:
+            params = {**params, 'page_size': size}
+            depth = min(args.depth, queryset.count() // size)
+            for page in (1, depth):
+                timing = _bench.measure(lambda: client.get('/audit/api/logs/', {**params, 'page': page}),
+                                        args.iterations, warmup=1)
+                results.append((label, f'?page={page}', timing['mean_ms'], timing['p95_ms']))
+                extra = {'cursor': cursor_at(queryset, (page - 1) * size)} if page > 1 else {}
+                timing = _bench.measure(lambda: client.get('/audit/api/logs/', {**params, **extra}),
+                                        args.iterations, warmup=1)
+                results.append((label, f'cursor (página {page})', timing['mean_ms'], timing['p95_ms']))
+
+    print(f"LogEntry: {args.rows} filas, páginas de {args.page_size} ({connection.vendor})")
+    _bench.print_table(['filtro', 'paginación', 'media ms', 'p95 ms'], results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Benchmark de la purga de retención de auditoría - MyInner
+
+Compara el borrado anterior de cleanup_old_logs (un solo
+LogEntry.objects.filter(timestamp__lt=cutoff).delete()) con la purga por
+lotes de audit/retention.py, mientras un hilo sigue escribiendo LogEntry
+como lo haría la aplicación. Para cada caso mide la duración total y la
+latencia de esas escrituras concurrentes (máximo, p95 y las que fallan
+porque la tabla estuvo bloqueada más que el timeout de la conexión).
+
+Uso:
+    python scripts/bench_audit_retention.py [--rows 1000000] [--old-fraction 0.8]
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+import _bench
+
+_bench.setup()
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from audit import retention
+from notes.models import Note
+
+CHUNK = 50000
+
+
+def seed(rows, old_fraction, cutoff, content_type):
+    """Entradas en orden de id aproximadamente cronológico, como en producción"""
+    LogEntry.objects.all().delete()
+    table = connection.ops.quote_name(LogEntry._meta.db_table)
+    timestamp_field = LogEntry._meta.get_field('timestamp')
+    sql = (
+        f"INSERT INTO {table} (content_type_id, object_pk, object_id, object_repr, action, "
+        f"changes_text, timestamp) VALUES (%s, %s, %s, %s, %s, '', %s)"
+    )
+    old_rows = int(rows * old_fraction)
+    rng = random.Random(42)
+    for offset in range(0, rows, CHUNK):
+        params = []
+        for i in range(offset, min(rows, offset + CHUNK)):
+            age = timedelta(days=30 + (old_rows - i) / max(old_rows, 1) * 30) if i < old_rows \
+                else timedelta(days=rng.random() * 29)
+            params.append((
+                content_type, str(i), i, f'objeto {i}', rng.randrange(4),
+                timestamp_field.get_db_prep_value(cutoff + timedelta(days=30) - age, connection),
+            ))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+    return old_rows
+
+
+class Writer(threading.Thread):
+    """Inserta una LogEntry cada `interval` segundos y guarda la latencia"""
+
+    def __init__(self, content_type, interval=0.01):
+        super().__init__(daemon=True)
+        self.content_type = content_type
+        self.interval = interval
+        self.latencies = []
+        self.errors = 0
+        self.stop = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stop.is_set():
+                started = time.perf_counter()
+                try:
+                    LogEntry.objects.bulk_create([LogEntry(
+                        content_type_id=self.content_type, object_pk='w', object_repr='w',
+                        action=LogEntry.Action.UPDATE,
+                    )])
+                    self.latencies.append((time.perf_counter() - started) * 1000)
+                except OperationalError:
+                    self.errors += 1
+                time.sleep(self.interval)
+        finally:
+            connection.close()
+
+
+def run_case(label, purge, args, cutoff, content_type):
+    old_rows = seed(args.rows, args.old_fraction, cutoff, content_type)
+    writer = Writer(content_type)
+    writer.start()
+    time.sleep(0.2)
+    started = time.monotonic()
+    deleted = purge()
+    elapsed = time.monotonic() - started
+    time.sleep(0.2)
+    writer.stop.set()
+    writer.join()
+    latencies = sorted(writer.latencies) or [0.0]
+    assert deleted == old_rows, (deleted, old_rows)
+    return (
+        label, deleted, elapsed, latencies[-1],
+        latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], writer.errors,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--old-fraction', type=float, default=0.8, help='Fracción fuera de la retención')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--sleep', type=float, default=0.1)
+    parser.add_argument('--db-file', default=os.path.join(tempfile.gettempdir(), 'bench_audit_retention.sqlite3'),
+                        help='Archivo de la BD de pruebas con SQLite (el hilo escritor necesita un archivo)')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = args.db_file
+
+    results = []
+    with _bench.test_database():
+        content_type = ContentType.objects.get_for_model(Note).pk
+        cutoff = retention.retention_cutoff(30)
+        results.append(run_case(
+            'delete() único (anterior)',
+            lambda: LogEntry.objects.filter(timestamp__lt=cutoff).delete()[0],
+            args, cutoff, content_type,
+        ))
+        results.append(run_case(
+            f'lotes de {args.batch_size} + {args.sleep}s',
+            lambda: retention.purge(cutoff, args.batch_size, args.sleep),
+            args, cutoff, content_type,
+        ))
+
+    print(f"LogEntry: {args.rows} filas, {args.old_fraction:.0%} fuera de la retención ({connection.vendor})")
+    _bench.print_table(
+        ['caso', 'borradas', 'duración s', 'escritura máx ms', 'escritura p95 ms', 'escrituras fallidas'],
+        results,
+    )
+
+
+if __name__ == '__main__':
+    main()
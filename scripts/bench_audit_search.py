@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+"""
+Benchmark de la búsqueda del log de auditoría - MyInner
+
+Compara GET /audit/api/logs/?search= con SearchFilter (icontains sobre
+actor__username, object_repr y content_type__model) y con la búsqueda
+indexada de audit/search.py (pg_trgm / FTS5 trigram), para términos que
+coinciden con una sola entrada, con unas pocas, con un actor y con nada.
+Mide también lo que cuestan los triggers de FTS5 al insertar en SQLite.
+
+Reutiliza la BD de scripts/bench_audit_dashboard.py (mismo --db-file);
+con --keepdb no se vuelve a generar. La primera vez, la migración 0004
+llena el índice con las filas existentes.
+
+Uso:
+    python scripts/bench_audit_search.py [--rows 5000000] [--keepdb]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+import _bench
+
+_bench.setup()
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import filters
+from rest_framework.test import APIClient
+
+from audit import search
+from audit.views import AuditLogViewSet
+from bench_audit_dashboard import FAST_HASHERS, seed
+
+User = get_user_model()
+
+
+class Rollback(Exception):
+    pass
+
+
+def insert_rate(rows, batch_size, triggers):
+    """
+    Entradas por segundo al insertar `rows` en lotes de `batch_size`, cada
+    uno en su savepoint como los lotes de audit/writer.py (FTS5 vuelca sus
+    datos pendientes en cada uno); todo se deshace al terminar
+    """
+    table = connection.ops.quote_name(LogEntry._meta.db_table)
+    content_type = LogEntry.objects.values_list('content_type', flat=True).first()
+    sql = (
+        f"INSERT INTO {table} (content_type_id, object_pk, object_id, object_repr, action, "
+        f"changes_text, timestamp) VALUES (%s, %s, %s, %s, 0, '', %s)"
+    )
+    now = LogEntry._meta.get_field('timestamp').get_db_prep_value(timezone.now(), connection)
+    params = [(content_type, str(i), i, f'inserción de prueba {i}', now) for i in range(rows)]
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not triggers:
+                for trigger in search.TRIGGERS:
+                    cursor.execute(f'DROP TRIGGER {trigger}')
+            started = time.monotonic()
+            for offset in range(0, rows, batch_size):
+                with transaction.atomic():
+                    cursor.executemany(sql, params[offset:offset + batch_size])
+            elapsed = time.monotonic() - started
+            raise Rollback
+    except Rollback:
+        pass
+    return rows / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--iterations', type=int, default=3)
+    parser.add_argument('--insert-rows', type=int, default=50000)
+    parser.add_argument('--insert-batch', type=int, default=500, help='Filas por transacción al insertar')
+    parser.add_argument('--db-file', default=os.path.join(tempfile.gettempdir(), 'bench_audit_dashboard.sqlite3'),
+                        help='Archivo de la BD de pruebas con SQLite')
+    parser.add_argument('--keepdb', action='store_true', help='Conservar y reutilizar la BD generada')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = args.db_file
+
+    results = []
+    with _bench.test_database(keepdb=args.keepdb), override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        seed(args.rows, args.users, args.days)
+        admin = User.objects.filter(username='bench_admin').first() or User.objects.create_superuser(
+            username='bench_admin', email='bench_admin@example.com', password='BenchPass123',
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        last = args.rows - 1
+        terms = [
+            ('una entrada', f'objeto {last}'),
+            ('pocas entradas', f'objeto {str(last)[:-2]}'),
+            ('un actor', 'bench_999'),
+            ('sin resultados', 'inexistente'),
+        ]
+        legacy_backends = [filters.SearchFilter, filters.OrderingFilter]
+        for label, term in terms:
+            params = {'search': term, 'page_size': 50}
+            with patch.object(AuditLogViewSet, 'filter_backends', legacy_backends):
+                legacy = _bench.measure(lambda: client.get('/audit/api/logs/', params), args.iterations, warmup=1)
+            indexed = _bench.measure(lambda: client.get('/audit/api/logs/', params), args.iterations, warmup=1)
+            matches = len(client.get('/audit/api/logs/', params).json()['results'])
+            results.append((label, term, matches, legacy['mean_ms'], indexed['mean_ms']))
+
+        rates = None
+        if search.fts_available():
+            rates = (
+                insert_rate(args.insert_rows, args.insert_batch, triggers=False),
+                insert_rate(args.insert_rows, args.insert_batch, triggers=True),
+            )
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name LIKE %s", [f'{search.FTS_TABLE}%'])
+                fts_bytes = cursor.fetchone()[0]
+
+    print(f"LogEntry: {args.rows} filas ({connection.vendor})")
+    _bench.print_table(['búsqueda', 'término', 'resultados (máx. 50)', 'icontains ms', 'indexada ms'], results)
+    if rates:
+        print(f"Índice FTS5: {fts_bytes / 2**20:.0f} MiB")
+        print(f"Inserción en lotes de {args.insert_batch}: {rates[0]:.0f}/s sin triggers, "
+              f"{rates[1]:.0f}/s con triggers FTS5")
+
+
+if __name__ == '__main__':
+    main()
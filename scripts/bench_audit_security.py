@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+Benchmark del detector de fuerza bruta - MyInner
+
+Mide audit/security.py frente a la alternativa directa de guardar, por IP
+y por usuario, una deque con el instante de cada fallo de la ventana:
+
+- coste por fallo de login (µs) con un ataque desde una IP, uno repartido
+  entre --keys IPs y usuarios distintos (más que SECURITY_MAX_KEYS) y
+  tráfico normal de pocos fallos por clave;
+- memoria retenida (tracemalloc) tras cada escenario;
+- el receptor completo de user_login_failed con un request real;
+- dashboard_summary() sobre --days días de resúmenes (uno por minuto).
+
+Uso:
+    python scripts/bench_audit_security.py [--events 200000] [--keys 100000] [--days 30]
+"""
+
+import argparse
+import logging
+import time
+import tracemalloc
+from collections import OrderedDict, deque
+from datetime import timedelta
+
+import _bench
+
+_bench.setup()
+
+from django.test import RequestFactory
+from django.utils import timezone
+
+from audit import security
+from audit.models import AuditSecuritySummary
+
+
+class Clock:
+    """Reloj simulado: cada evento avanza `step` segundos"""
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        return self.now
+
+
+class DequeDetector:
+    """Alternativa directa: instantes de los fallos por clave, sin límite de claves"""
+
+    def __init__(self, window, ip_failures, username_failures, clock):
+        self.window = window
+        self.ip_failures = ip_failures
+        self.username_failures = username_failures
+        self.clock = clock
+        self.by_ip = OrderedDict()
+        self.by_username = OrderedDict()
+
+    def _count(self, table, key, now):
+        times = table.get(key)
+        if times is None:
+            times = table[key] = deque()
+        times.append(now)
+        while times[0] <= now - self.window:
+            times.popleft()
+        return len(times)
+
+    def login_failed(self, ip=None, username=None):
+        now = self.clock()
+        alerts = []
+        if ip and self._count(self.by_ip, ip, now) == self.ip_failures:
+            alerts.append(ip)
+        if username and self._count(self.by_username, username, now) == self.username_failures:
+            alerts.append(username)
+        return alerts
+
+
+def scenarios(events, keys):
+    return [
+        ('una IP, un usuario', lambda i: ('203.0.113.7', 'admin')),
+        (f'{keys} IPs y usuarios', lambda i: (f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}',
+                                               f'user{i % keys}')),
+        ('tráfico normal (50 claves)', lambda i: (f'192.168.0.{i % 50}', f'user{i % 50}')),
+    ]
+
+
+def feed(detector, clock, keys):
+    for ip, username in keys:
+        clock.now += clock.step
+        detector.login_failed(ip, username)
+
+
+def run(make_detector, events, pick, step):
+    """(µs por fallo, KiB retenidos) de `events` fallos contra un detector nuevo"""
+    keys = [pick(i) for i in range(events)]
+    clock = Clock(step)
+    detector = make_detector(clock)
+    started = time.perf_counter()
+    feed(detector, clock, keys)
+    elapsed = time.perf_counter() - started
+    # La memoria en otra pasada: tracemalloc ralentiza cada asignación
+    clock = Clock(step)
+    tracemalloc.start()
+    detector = make_detector(clock)
+    feed(detector, clock, keys)
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed / events * 1e6, retained / 1024
+
+
+def signal_cost(iterations):
+    """µs del receptor on_login_failed con un request de la factoría (IP y usuario)"""
+    request = RequestFactory().post('/api/auth/login/', REMOTE_ADDR='198.51.100.4')
+    credentials = {'username': 'Admin', 'password': '********'}
+    security._detector = security.AuthEventDetector.from_settings()
+    result = _bench.measure(lambda: security.on_login_failed(None, credentials, request), iterations, warmup=100)
+    return result['mean_ms'] * 1000
+
+
+def seed_summaries(days):
+    now = timezone.now()
+    AuditSecuritySummary.objects.bulk_create([
+        AuditSecuritySummary(
+            period_start=now - timedelta(minutes=i + 1), period_end=now - timedelta(minutes=i),
+            failed_logins=i % 7, successful_logins=i % 3, alerts=1 if i % 500 == 0 else 0,
+            details={'alerts': [{'kind': security.IP_BRUTE_FORCE, 'key': '203.0.113.7', 'count': 10,
+                                 'window_seconds': 300, 'at': (now - timedelta(minutes=i)).isoformat()}]}
+            if i % 500 == 0 else {},
+        )
+        for i in range(days * 24 * 60)
+    ], batch_size=2000)
+    return now
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--events', type=int, default=200_000)
+    parser.add_argument('--keys', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    conf = security.security_settings()
+    # Un fallo cada 10 ms: la ventana de 5 minutos retiene 30000
+    step = 0.01
+
+    def ring(clock):
+        return security.AuthEventDetector(
+            window=conf['SECURITY_WINDOW_SECONDS'], bucket_seconds=conf['SECURITY_BUCKET_SECONDS'],
+            ip_failures=conf['SECURITY_IP_FAILURES'], username_failures=conf['SECURITY_USERNAME_FAILURES'],
+            global_failures=conf['SECURITY_GLOBAL_FAILURES'], max_keys=conf['SECURITY_MAX_KEYS'], clock=clock,
+        )
+
+    def timestamps(clock):
+        return DequeDetector(conf['SECURITY_WINDOW_SECONDS'], conf['SECURITY_IP_FAILURES'],
+                             conf['SECURITY_USERNAME_FAILURES'], clock)
+
+    rows = []
+    for label, pick in scenarios(args.events, args.keys):
+        ring_us, ring_kib = run(ring, args.events, pick, step)
+        deque_us, deque_kib = run(timestamps, args.events, pick, step)
+        rows.append((label, deque_us, ring_us, deque_kib, ring_kib))
+
+    receiver_us = signal_cost(20_000)
+
+    with _bench.test_database():
+        now = seed_summaries(args.days)
+        ranges = [
+            (label, _bench.measure(lambda: security.dashboard_summary(now - delta), args.iterations))
+            for label, delta in (('24 horas', timedelta(days=1)), ('7 días', timedelta(days=7)),
+                                 (f'{args.days} días', timedelta(days=args.days)))
+        ]
+
+    print(f"{args.events} fallos, uno cada {step * 1000:.0f} ms; ventana {conf['SECURITY_WINDOW_SECONDS']} s, "
+          f"SECURITY_MAX_KEYS={conf['SECURITY_MAX_KEYS']}")
+    _bench.print_table(['escenario', 'deque µs', 'anillo µs', 'deque KiB', 'anillo KiB'], rows)
+    print(f"Receptor user_login_failed completo: {receiver_us:.2f} µs por fallo")
+    _bench.print_table(['dashboard_summary', 'media ms', 'p95 ms'], [
+        (label, result['mean_ms'], result['p95_ms']) for label, result in ranges
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Benchmark de la caché de estadísticas de auditoría - MyInner
+
+Simula a varios administradores abriendo el dashboard a la vez: --clients
+hilos piden GET /audit/api/dashboard/ simultáneamente, sin caché
+(AUDIT_STATS_CACHE_TTL=0) y con la caché vacía (audit/stats_cache.py), y
+cuenta cuántas veces se calculan las agregaciones. Mide además la latencia
+de una respuesta fresca y de una vencida (stale-while-revalidate).
+
+Reutiliza la BD de scripts/bench_audit_dashboard.py (mismo --db-file);
+con --keepdb no se vuelve a generar.
+
+Uso:
+    python scripts/bench_audit_stats_cache.py [--rows 5000000] [--clients 8] [--keepdb]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+import _bench
+
+_bench.setup()
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from audit import stats, stats_cache
+from bench_audit_dashboard import FAST_HASHERS, seed
+
+User = get_user_model()
+
+
+def concurrent(admin, clients):
+    """(segundos hasta la última respuesta, máximo por cliente, cálculos del dashboard)"""
+    computations = []
+    dashboard = stats.dashboard
+
+    def counted(*args, **kwargs):
+        computations.append(1)
+        return dashboard(*args, **kwargs)
+
+    latencies = []
+    barrier = threading.Barrier(clients)
+
+    def request():
+        client = APIClient()
+        client.force_authenticate(admin)
+        barrier.wait()
+        started = time.monotonic()
+        response = client.get('/audit/api/dashboard/')
+        assert response.status_code == 200, response.status_code
+        latencies.append(time.monotonic() - started)
+        connection.close()
+
+    with patch('audit.stats.dashboard', side_effect=counted):
+        started = time.monotonic()
+        threads = [threading.Thread(target=request) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return time.monotonic() - started, max(latencies), len(computations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--db-file', default=os.path.join(tempfile.gettempdir(), 'bench_audit_dashboard.sqlite3'),
+                        help='Archivo de la BD de pruebas con SQLite')
+    parser.add_argument('--keepdb', action='store_true', help='Conservar y reutilizar la BD generada')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    if connection.vendor == 'sqlite':
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = args.db_file
+
+    results = []
+    with _bench.test_database(keepdb=args.keepdb), override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        seed(args.rows, args.users, args.days)
+        admin = User.objects.filter(username='bench_admin').first() or User.objects.create_superuser(
+            username='bench_admin', email='bench_admin@example.com', password='BenchPass123',
+        )
+        no_cache = {**settings.AUDIT_SETTINGS, 'STATS_CACHE_TTL': 0}
+        with override_settings(AUDIT_SETTINGS=no_cache):
+            elapsed, slowest, computations = concurrent(admin, args.clients)
+        results.append(('sin caché', f"{elapsed:.2f}", f"{slowest:.2f}", computations))
+        stats_cache.invalidate()
+        elapsed, slowest, computations = concurrent(admin, args.clients)
+        results.append(('caché vacía', f"{elapsed:.2f}", f"{slowest:.2f}", computations))
+
+        client = APIClient()
+        client.force_authenticate(admin)
+        fresh = _bench.measure(lambda: client.get('/audit/api/dashboard/'), args.iterations, warmup=1)
+        # Vencida: se sirve al instante y el recálculo queda en segundo plano
+        later = time.time() + stats_cache.cache_settings()['ttl'] + 1
+        with patch('audit.stats_cache.time.time', return_value=later), \
+                patch('audit.stats_cache._spawn'):
+            stale = _bench.measure(lambda: client.get('/audit/api/dashboard/'), args.iterations, warmup=1)
+
+    print(f"LogEntry: {args.rows} filas, {args.clients} clientes simultáneos ({connection.vendor})")
+    _bench.print_table(['dashboard', 'segundos (todos)', 'segundos (más lento)', 'cálculos'], results)
+    _bench.print_table(['respuesta en caché', 'media ms', 'p95 ms'], [
+        ('fresca', fresh['mean_ms'], fresh['p95_ms']),
+        ('vencida (stale-while-revalidate)', stale['mean_ms'], stale['p95_ms']),
+    ])
+
+
+if __name__ == '__main__':
+    main()
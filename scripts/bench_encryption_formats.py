@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Benchmark de formatos de cifrado de campos - MyInner
+
+Compara, para varios tamaños de contenido, los bytes guardados por fila y el
+throughput de cifrado/descifrado de:
+
+- fernet: encrypt_str de encrypted_model_fields (clave maestra, base64)
+- env1: token Fernet con la clave de datos del usuario (texto)
+- aes-gcm / chacha20-poly1305: formato AEAD binario de users/envelope.py
+
+No usa la base de datos: mide solo la capa criptográfica.
+
+Uso:
+    python scripts/bench_encryption_formats.py [--iterations 2000]
+"""
+
+import argparse
+import os
+
+import _bench
+
+_bench.setup()
+
+from cryptography.fernet import Fernet
+from encrypted_model_fields import fields as encrypted_fields
+
+from users.envelope import (
+    AEAD_ALGORITHMS, AEAD_MAGIC, AEAD_NONCE_SIZE, AEAD_VERSION, DataKey, ENVELOPE_PREFIX,
+)
+
+SIZES = [100, 1024, 10 * 1024, 100 * 1024]
+
+
+def aead_codec(data_key, alg_id):
+    header = AEAD_MAGIC + bytes((AEAD_VERSION, alg_id))
+    cipher = data_key.aead(alg_id)
+
+    def encrypt(text):
+        nonce = os.urandom(AEAD_NONCE_SIZE)
+        return header + nonce + cipher.encrypt(nonce, text.encode('utf-8'), header)
+
+    def decrypt(blob):
+        nonce = blob[3:3 + AEAD_NONCE_SIZE]
+        return cipher.decrypt(nonce, blob[3 + AEAD_NONCE_SIZE:], header).decode('utf-8')
+
+    return encrypt, decrypt
+
+
+def codecs():
+    data_key = DataKey(Fernet.generate_key().decode())
+    result = [
+        ('fernet', lambda t: encrypted_fields.encrypt_str(t).decode('utf-8'),
+         encrypted_fields.decrypt_str),
+        ('env1',
+         lambda t: ENVELOPE_PREFIX + data_key.fernet.encrypt(t.encode('utf-8')).decode('utf-8'),
+         lambda v: data_key.fernet.decrypt(v[len(ENVELOPE_PREFIX):].encode('utf-8')).decode('utf-8')),
+    ]
+    for alg_id, (name, _) in AEAD_ALGORITHMS.items():
+        encrypt, decrypt = aead_codec(data_key, alg_id)
+        result.append((name, encrypt, decrypt))
+    return result
+
+
+def stored_size(value):
+    return len(value.encode('utf-8')) if isinstance(value, str) else len(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = []
+    for size in SIZES:
+        text = 'x' * size
+        iterations = max(20, args.iterations * 1024 // max(size, 1024))
+        for name, encrypt, decrypt in codecs():
+            token = encrypt(text)
+            assert decrypt(token) == text
+            enc = _bench.measure(lambda: encrypt(text), iterations)
+            dec = _bench.measure(lambda: decrypt(token), iterations)
+            mb = size / (1024 * 1024)
+            rows.append((
+                size, name, stored_size(token), stored_size(token) - size,
+                mb / (enc['mean_ms'] / 1000), mb / (dec['mean_ms'] / 1000),
+            ))
+
+    _bench.print_table(
+        ['bytes', 'formato', 'guardado', 'overhead', 'cifrar MB/s', 'descifrar MB/s'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""
+Benchmark de throughput de campos encriptados - MyInner
+
+Mide cifrado y descifrado por campo (get_db_prep_save / lectura desde la BD)
+para EncryptedTextField y EncryptedEmailField de encrypted_model_fields y
+para los campos usados por los modelos (Note.content AEAD, CustomUser.email
+lazy), con contenidos de 100 B a 1 MB, más el round-trip completo por el ORM
+(save + fetch + lectura del campo). Reporta ops/s y MB/s.
+
+También estima la parte criptográfica de la latencia de GET /api/notes/.
+
+Como harness de regresión:
+    python scripts/bench_field_encryption.py --json resultados.json
+    python scripts/bench_field_encryption.py --compare resultados.json --tolerance 0.2
+termina con código 1 si algún caso pierde más del 20% de ops/s.
+
+Uso:
+    python scripts/bench_field_encryption.py [--iterations 200] [--max-size 1048576]
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+import _bench
+
+_bench.setup()
+
+from django.db import connection
+from django.test import Client, override_settings
+from django.contrib.auth import get_user_model
+from encrypted_model_fields.fields import EncryptedEmailField, EncryptedTextField
+
+from notes.models import Note
+
+User = get_user_model()
+
+SIZES = [100, 1024, 10 * 1024, 100 * 1024, 1024 * 1024]
+EMAIL_MAX = 254
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+def iterations_for(size, base):
+    # Menos repeticiones para contenidos grandes: ~ mismo volumen por caso
+    return max(5, base * 1024 // max(size, 1024))
+
+
+def email_of(size):
+    return 'u' * max(1, size - len('@example.com')) + '@example.com'
+
+
+def library_cases():
+    """(nombre, campo, generador de valor, tamaño máximo) del paquete original"""
+    return [
+        ('EncryptedTextField', EncryptedTextField(), lambda n: 'x' * n, None),
+        ('EncryptedEmailField', EncryptedEmailField(), email_of, EMAIL_MAX),
+    ]
+
+
+def bench_library_field(field, value, iterations):
+    token = field.get_db_prep_save(value, connection)
+    assert field.from_db_value(token, None, connection) == value
+    enc = _bench.measure(lambda: field.get_db_prep_save(value, connection), iterations)
+    dec = _bench.measure(lambda: field.from_db_value(token, None, connection), iterations)
+    return enc, dec
+
+
+def bench_note_field(owner, value, iterations):
+    field = Note._meta.get_field('content')
+    token = field.encrypt_for(value, owner.id)
+    assert field.decrypt_strict(token, owner.id) == value
+    enc = _bench.measure(lambda: field.encrypt_for(value, owner.id), iterations)
+    dec = _bench.measure(lambda: field.decrypt_strict(token, owner.id), iterations)
+    return enc, dec
+
+
+def bench_note_roundtrip(owner, value, iterations):
+    def roundtrip():
+        note = Note.objects.create(user=owner, title='bench', content=value)
+        assert Note.objects.get(pk=note.pk).content == value
+        note.delete()
+    return _bench.measure(roundtrip, iterations, warmup=2)
+
+
+def bench_email_roundtrip(owner, value, iterations):
+    def roundtrip():
+        owner.email = value
+        owner.save(update_fields=['email'])
+        assert User.objects.get(pk=owner.pk).email == value
+    return _bench.measure(roundtrip, iterations, warmup=2)
+
+
+def result(case, size, timing):
+    ops = 1000 / timing['mean_ms'] if timing['mean_ms'] else float('inf')
+    return {
+        'case': case, 'bytes': size, 'mean_ms': timing['mean_ms'],
+        'ops_s': ops, 'mb_s': ops * size / (1024 * 1024),
+    }
+
+
+def crypto_share_of_notes_list(owner, base_iterations):
+    """Latencia de GET /api/notes/ frente al descifrado de su página"""
+    size = 1024
+    Note.objects.filter(user=owner).delete()
+    Note.objects.bulk_create([
+        Note(user=owner, title=f'Nota {i}', content='x' * size) for i in range(50)
+    ])
+    client = Client()
+    client.force_login(owner)
+    request = _bench.measure(lambda: client.get('/api/notes/'), base_iterations)
+
+    page = len(client.get('/api/notes/').json()['results'])
+    _, dec = bench_note_field(owner, 'x' * size, base_iterations)
+    crypto_ms = page * dec['mean_ms']
+    return request['mean_ms'], crypto_ms, page
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as fh:
+        baseline = {(r['case'], r['bytes']): r for r in json.load(fh)['results']}
+    regressions = []
+    rows = []
+    for r in results:
+        base = baseline.get((r['case'], r['bytes']))
+        if not base:
+            continue
+        change = r['ops_s'] / base['ops_s'] - 1
+        rows.append((r['case'], r['bytes'], base['ops_s'], r['ops_s'], f"{change:+.1%}"))
+        if change < -tolerance:
+            regressions.append(r)
+    _bench.print_table(['caso', 'bytes', 'base ops/s', 'ops/s', 'cambio'], rows)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=200,
+                        help='Repeticiones base (se reducen con el tamaño)')
+    parser.add_argument('--max-size', type=int, default=SIZES[-1])
+    parser.add_argument('--json', help='Guardar resultados en este archivo')
+    parser.add_argument('--compare', help='Archivo de resultados de referencia')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Pérdida de ops/s tolerada frente a la referencia (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    sizes = [s for s in SIZES if s <= args.max_size]
+    results = []
+
+    with _bench.test_database(), override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        owner = User.objects.create_user(
+            username='bench_crypto', email='bench_crypto@example.com', password='BenchPass123'
+        )
+
+        for size in sizes:
+            iterations = iterations_for(size, args.iterations)
+            for name, field, make, max_size in library_cases():
+                if max_size and size > max_size:
+                    continue
+                enc, dec = bench_library_field(field, make(size), iterations)
+                results.append(result(f'{name} cifrar', size, enc))
+                results.append(result(f'{name} descifrar', size, dec))
+
+            enc, dec = bench_note_field(owner, 'x' * size, iterations)
+            results.append(result('Note.content AEAD cifrar', size, enc))
+            results.append(result('Note.content AEAD descifrar', size, dec))
+            results.append(result(
+                'Note ORM save+fetch', size,
+                bench_note_roundtrip(owner, 'x' * size, max(3, iterations // 4)),
+            ))
+            if size <= EMAIL_MAX:
+                results.append(result(
+                    'CustomUser.email ORM save+fetch', size,
+                    bench_email_roundtrip(owner, email_of(size), max(3, iterations // 4)),
+                ))
+
+        request_ms, crypto_ms, page = crypto_share_of_notes_list(owner, max(10, args.iterations // 4))
+
+    _bench.print_table(
+        ['caso', 'bytes', 'ms', 'ops/s', 'MB/s'],
+        [(r['case'], r['bytes'], r['mean_ms'], r['ops_s'], r['mb_s']) for r in results],
+    )
+    print()
+    print(f"GET /api/notes/ ({page} notas de 1 KB): {request_ms:.3f} ms por request, "
+          f"descifrado {crypto_ms:.3f} ms ({crypto_ms / request_ms:.1%})")
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump({'results': results}, fh, indent=2)
+
+    if args.compare:
+        print()
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} casos por debajo de la tolerancia ({args.tolerance:.0%})")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
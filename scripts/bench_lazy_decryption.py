@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+Benchmark de desencriptado perezoso - MyInner
+
+Cuenta los desencriptados (clave maestra y claves de datos) y mide la latencia de las rutas que cargan
+filas con campos encriptados, comparando los campos Lazy* (users/fields.py)
+con el comportamiento anterior (desencriptar cada fila en from_db_value):
+
+- Listado de notas de la API (página de 10)
+- Listado filtrado por tag
+- Changelist del admin de notas (100 por página)
+- Request autenticado que no lee datos del usuario (/api/health/)
+
+Uso:
+    python scripts/bench_lazy_decryption.py [--notes 500] [--iterations 50]
+"""
+
+import argparse
+import logging
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import _bench
+
+_bench.setup()
+
+from django.db.models import Model
+from django.test import Client, override_settings
+from django.contrib.auth import get_user_model
+from encrypted_model_fields import fields as encrypted_fields
+
+from notes.models import Note, Tag
+from users import envelope
+from users.fields import LazyEncryptedMixin
+
+User = get_user_model()
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+PATHS = [
+    ('lista API', '/api/notes/'),
+    ('filtro tag', '/api/notes/?tag=bench'),
+    ('admin notas', '/admin/notes/note/'),
+    ('health auth', '/api/health/'),
+]
+
+
+class DecryptCounter:
+    """Cuenta desencriptados con la clave maestra y con claves de datos"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def wrap(self, func):
+        def counted(*args):
+            self.calls += 1
+            return func(*args)
+        return counted
+
+    @contextmanager
+    def patched(self):
+        with patch.object(encrypted_fields, 'decrypt_str', self.wrap(encrypted_fields.decrypt_str)), \
+                patch.object(envelope, 'decrypt_for_owner', self.wrap(envelope.decrypt_for_owner)):
+            yield self
+
+
+@contextmanager
+def eager_decryption():
+    """
+    Reproduce el comportamiento de EncryptedMixin: desencriptar todos los
+    campos encriptados al construir cada instancia desde la BD
+    """
+    original = Model.from_db.__func__
+
+    def from_db(cls, db, field_names, values):
+        instance = original(cls, db, field_names, values)
+        for field in cls._meta.concrete_fields:
+            if isinstance(field, LazyEncryptedMixin) and field.attname in instance.__dict__:
+                getattr(instance, field.attname)
+        return instance
+
+    with patch.object(Model, 'from_db', classmethod(from_db)):
+        yield
+
+
+def seed(count):
+    user = User.objects.create_superuser(
+        username='bench_lazy', email='bench_lazy@example.com', password='BenchPass123',
+        first_name='Bench', last_name='Lazy',
+    )
+    tag = Tag.objects.create(name='bench')
+    notes = [
+        Note(user=user, title=f'Nota {i}', content=f'Contenido de prueba {i} ' * 20)
+        for i in range(count)
+    ]
+    Note.objects.bulk_create(notes)
+    tag.notes.add(*Note.objects.filter(user=user)[:count // 2])
+    return user
+
+
+def bench_path(client, url, iterations):
+    with DecryptCounter().patched() as counter:
+        resp = client.get(url)
+    assert resp.status_code == 200, (url, resp.status_code)
+    timing = _bench.measure(lambda: client.get(url), iterations)
+    return counter.calls, timing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--notes', type=int, default=500)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    with _bench.test_database(), override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+        user = seed(args.notes)
+        client = Client()
+        client.force_login(user)
+
+        rows = []
+        for label, url in PATHS:
+            with eager_decryption():
+                eager_calls, eager = bench_path(client, url, args.iterations)
+            lazy_calls, lazy = bench_path(client, url, args.iterations)
+            rows.append((
+                label, eager_calls, lazy_calls, eager['mean_ms'], lazy['mean_ms'],
+            ))
+
+    print(f"Notas: {args.notes}")
+    _bench.print_table(
+        ['ruta', 'decrypt antes', 'decrypt lazy', 'antes ms', 'lazy ms'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Benchmark de motores de sesión - MyInner
+
+Compara la latencia por request de /api/auth/me/ (lectura de sesión) y de
+/api/auth/login/ (escritura de sesión) con cada SESSION_ENGINE soportado,
+usando el stack de middlewares real definido en settings.MIDDLEWARE.
+
+Uso:
+    python scripts/bench_session_engines.py [--iterations 500]
+"""
+
+import argparse
+import logging
+
+import _bench
+
+_bench.setup()
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+USERNAME = 'bench_session'
+PASSWORD = 'BenchPass123'
+
+# Hasher rápido para que el coste de la sesión no quede oculto por PBKDF2
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Límites que el benchmark no alcanza: se mide la sesión, no respuestas 429
+# (el throttling sigue en el stack, con el mismo coste para todos los motores)
+REST_FRAMEWORK = {
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        scope: '1000000/min' for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+    },
+}
+
+
+def ok(response):
+    assert response.status_code == 200, f"{response.request['PATH_INFO']} -> {response.status_code}"
+    return response
+
+
+def bench_engine(engine, iterations):
+    """Mide lectura y escritura de sesión para un motor concreto"""
+    with override_settings(SESSION_ENGINE=engine, PASSWORD_HASHERS=FAST_HASHERS, REST_FRAMEWORK=REST_FRAMEWORK):
+        cache.clear()
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+        client = Client()
+        credentials = {'username': USERNAME, 'password': PASSWORD}
+        ok(client.post('/api/auth/login/', credentials, content_type='application/json'))
+
+        # Consultas SQL de una lectura autenticada típica
+        with CaptureQueriesContext(connection) as ctx:
+            ok(client.get('/api/auth/me/'))
+        session_queries = sum(
+            1 for q in ctx.captured_queries if 'django_session' in q['sql']
+        )
+
+        read = _bench.measure(lambda: ok(client.get('/api/auth/me/')), iterations)
+        write = _bench.measure(
+            lambda: ok(client.post('/api/auth/login/', credentials, content_type='application/json')),
+            max(1, iterations // 5),
+        )
+
+    return engine.rsplit('.', 1)[-1], read, write, session_queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    # Los middlewares de auditoría registran cada request; se silencian para
+    # no medir la consola (el coste es idéntico para todos los motores)
+    logging.disable(logging.CRITICAL)
+
+    with _bench.test_database():
+        with override_settings(PASSWORD_HASHERS=FAST_HASHERS):
+            User.objects.create_user(
+                username=USERNAME, email='bench@example.com', password=PASSWORD
+            )
+
+        rows = []
+        for engine in settings.SESSION_ENGINES.values():
+            name, read, write, session_queries = bench_engine(engine, args.iterations)
+            rows.append((
+                name, read['mean_ms'], read['p95_ms'],
+                write['mean_ms'], write['p95_ms'], session_queries,
+            ))
+
+    print(f"Backend de caché: {settings.CACHES['default']['BACKEND']}")
+    _bench.print_table(
+        ['engine', 'me mean', 'me p95', 'login mean', 'login p95', 'session SQL'],
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Tests del archivo comprimido de logs de auditoría (audit/archive.py)
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from audit import archive, rollups
+from audit.models import AuditArchiveSegment
+from notes.models import Note, Tag
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+User = get_user_model()
+
+CUTOFF = datetime(2025, 1, 10, 0, 0, tzinfo=dt_timezone.utc)
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+        cls.tag_type = ContentType.objects.get_for_model(Tag)
+        cls.note_type = ContentType.objects.get_for_model(Note)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        conf = {**settings.AUDIT_SETTINGS, 'ARCHIVE_DIR': self.directory}
+        override = override_settings(AUDIT_SETTINGS=conf)
+        override.enable()
+        self.addCleanup(override.disable)
+        logger = patch('audit.archive.logger')
+        logger.start()
+        self.addCleanup(logger.stop)
+
+    def seed(self):
+        """6 entradas antiguas en dos días (8 y 9 de enero) y 2 recientes"""
+        moments = [
+            (CUTOFF - timedelta(days=2, hours=-1), self.admin, self.tag_type),
+            (CUTOFF - timedelta(days=2, hours=-2), None, self.note_type),
+            (CUTOFF - timedelta(days=2, hours=-3), self.admin, self.note_type),
+            (CUTOFF - timedelta(days=1, hours=-1), self.admin, self.tag_type),
+            (CUTOFF - timedelta(days=1, hours=-2), None, self.tag_type),
+            (CUTOFF - timedelta(hours=1), self.admin, self.tag_type),
+            (CUTOFF + timedelta(hours=1), self.admin, self.tag_type),
+            (CUTOFF + timedelta(days=1), None, self.tag_type),
+        ]
+        LogEntry.objects.bulk_create([
+            LogEntry(content_type=content_type, object_pk=str(i), object_id=i, object_repr=f'objeto {i}',
+                     action=LogEntry.Action.UPDATE, actor=actor, timestamp=moment,
+                     changes={'title': ['a', 'b']})
+            for i, (moment, actor, content_type) in enumerate(moments)
+        ])
+
+    def test_archive_moves_rows_to_daily_files(self):
+        self.seed()
+        self.assertEqual(archive.archive(CUTOFF, batch_size=4), 6)
+        self.assertEqual(LogEntry.objects.count(), 2)
+        self.assertFalse(LogEntry.objects.filter(timestamp__lt=CUTOFF).exists())
+        segments = list(AuditArchiveSegment.objects.all())
+        # lote 1: 8 ene (3) + 9 ene (1); lote 2: 9 ene (2)
+        self.assertEqual([(s.day.isoformat(), s.count) for s in segments],
+                         [('2025-01-08', 3), ('2025-01-09', 1), ('2025-01-09', 2)])
+        path = os.path.join(self.directory, segments[0].path)
+        self.assertTrue(path.endswith('.jsonl.gz'))
+        self.assertIn(os.path.join('2025', '01', '08'), path)
+        with gzip.open(path, 'rt') as fh:
+            first = json.loads(fh.readline())
+        self.assertEqual(first['fields']['content_type'], ['notes', 'tag'])
+        self.assertEqual(first['fields']['actor'], ['boss'])
+        self.assertEqual(segments[0].sha256, archive._sha256(path))
+
+    def test_rollups_keep_archived_entries(self):
+        self.seed()
+        archive.archive(CUTOFF)
+        self.assertEqual(rollups.count(), 8)
+
+    def test_loaddata_restores_gzip_segment(self):
+        self.seed()
+        archive.archive(CUTOFF)
+        for segment in AuditArchiveSegment.objects.all():
+            call_command('loaddata', os.path.join(self.directory, segment.path), verbosity=0)
+        self.assertEqual(LogEntry.objects.count(), 8)
+        restored = LogEntry.objects.order_by('id').first()
+        self.assertEqual(restored.actor, self.admin)
+        self.assertEqual(restored.changes, {'title': ['a', 'b']})
+
+    def test_read_filters_and_order(self):
+        self.seed()
+        archive.archive(CUTOFF, batch_size=4)
+        entries = archive.read()
+        self.assertEqual([e['object_pk'] for e in entries], ['5', '4', '3', '2', '1', '0'])
+        self.assertEqual(len(archive.read(actor='boss')), 4)
+        self.assertEqual(len(archive.read(content_type=('notes', 'note'))), 2)
+        entries = archive.read(start=CUTOFF - timedelta(days=1), end=CUTOFF)
+        self.assertEqual([e['object_pk'] for e in entries], ['5', '4', '3'])
+
+    def test_read_limit_skips_older_segments(self):
+        self.seed()
+        archive.archive(CUTOFF, batch_size=4)
+        with patch('audit.archive._read_segment', wraps=archive._read_segment) as reader:
+            entries = archive.read(limit=2)
+        self.assertEqual([e['object_pk'] for e in entries], ['5', '4'])
+        self.assertEqual(reader.call_count, 1)
+
+    def test_failed_batch_keeps_rows_and_removes_files(self):
+        self.seed()
+        with patch('audit.archive.AuditArchiveSegment.objects.bulk_create', side_effect=RuntimeError('db')):
+            with self.assertRaises(RuntimeError):
+                archive.archive(CUTOFF)
+        self.assertEqual(LogEntry.objects.count(), 8)
+        self.assertEqual([files for _, _, files in os.walk(self.directory) if files], [])
+
+    def test_unknown_compression(self):
+        with self.assertRaises(Exception):
+            archive.archive(CUTOFF, compression='bz2')
+
+    @skipUnless(zstandard, 'zstandard no está instalado')
+    def test_zstd_roundtrip(self):
+        self.seed()
+        archive.archive(CUTOFF, compression='zstd')
+        self.assertTrue(AuditArchiveSegment.objects.first().path.endswith('.jsonl.zst'))
+        self.assertEqual(len(archive.read()), 6)
+
+    def test_command_and_api(self):
+        self.seed()
+        out = StringIO()
+        with patch('audit.retention.timezone.now', return_value=CUTOFF + timedelta(days=365)):
+            call_command('archive_audit_logs', '--days=365', stdout=out)
+        self.assertIn('6 entradas', out.getvalue())
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/audit/api/logs/archived/', {'user_id': self.admin.pk, 'limit': 2})
+        data = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['results'][0]['actor'], 'boss')
+        self.assertEqual(data['results'][0]['model'], 'notes.tag')
+        self.assertTrue(data['results'][0]['archived'])
+        response = client.get('/audit/api/logs/archived/', {'model': 'notes.note', 'action': 'update'})
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_api_date_only_range(self):
+        self.seed()
+        archive.archive(CUTOFF)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/audit/api/logs/archived/', {'date_from': '2020-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 6)
+        # Sin zona, en la hora local (Ciudad de México): la tarde del 8 de enero
+        response = client.get('/audit/api/logs/archived/', {'date_from': '2025-01-08', 'date_to': '2025-01-09'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
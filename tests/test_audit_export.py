@@ -0,0 +1,93 @@
+"""
+Tests de la exportación en streaming de logs de auditoría (audit/export.py)
+"""
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest.mock import patch
+
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from audit import export
+from notes.models import Note, Tag
+
+User = get_user_model()
+
+BASE = datetime(2026, 5, 1, 12, 0, 0, 123456, tzinfo=dt_timezone.utc)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+        tag_type = ContentType.objects.get_for_model(Tag)
+        note_type = ContentType.objects.get_for_model(Note)
+        LogEntry.objects.bulk_create([
+            LogEntry(content_type=tag_type if i % 2 else note_type, object_pk=str(i), object_id=i,
+                     object_repr=f'objeto, "{i}"', action=LogEntry.Action.UPDATE,
+                     actor=cls.admin if i < 3 else None, timestamp=BASE + timedelta(minutes=i),
+                     changes={'title': ['a', f'b{i}']}, remote_addr='203.0.113.9')
+            for i in range(7)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        logger = patch('audit.views.logger')
+        self.mock_logger = logger.start()
+        self.addCleanup(logger.stop)
+
+    def get(self, **params):
+        response = self.client.get('/audit/api/logs/export/', params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, body = self.get()
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="auditlog-', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]['object_pk'], '6')  # más reciente primero
+        self.assertEqual(rows[-1]['actor'], 'boss')
+        self.assertEqual(rows[-1]['object_repr'], 'objeto, "0"')
+        self.assertEqual(rows[-1]['model'], 'notes.note')
+        self.assertEqual(json.loads(rows[-1]['changes']), {'title': ['a', 'b0']})
+        self.assertEqual(rows[-1]['timestamp'], BASE.isoformat())
+
+    def test_ndjson_with_filters(self):
+        response, body = self.get(export_format='ndjson', user_id=self.admin.pk, model='notes.tag')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([line['object_pk'] for line in lines], ['1'])
+        self.assertEqual(lines[0]['actor'], 'boss')
+        self.assertEqual(lines[0]['remote_addr'], '203.0.113.9')
+        self.mock_logger.info.assert_called_once()
+
+    def test_rows_without_instances(self):
+        ContentType.objects.clear_cache()
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(export.export_rows(LogEntry.objects.order_by('id'), chunk_size=3))
+        self.assertEqual(len(rows), 7)
+        # una consulta de filas (iterator) + una por ContentType fuera de la caché
+        self.assertEqual(len(queries), 3)
+
+    def test_unknown_format(self):
+        response = self.client.get('/audit/api/logs/export/', {'export_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_regular_user_denied(self):
+        with disable_auditlog():
+            user = User.objects.create_user(username='u', email='u@example.com', password='x')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get('/audit/api/logs/export/').status_code, 403)
@@ -0,0 +1,97 @@
+"""
+Tests de la serialización del listado de auditoría con .values() (audit/serializers.py)
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from audit import serializers
+from notes.models import Note, Tag
+
+User = get_user_model()
+
+BASE = datetime(2026, 5, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+
+class ListSerializationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+            cls.users = [
+                User.objects.create_user(username=f'user{i}', email=f'user{i}@example.com', password='x')
+                for i in range(3)
+            ]
+        cls.types = [ContentType.objects.get_for_model(model) for model in (Note, Tag, User)]
+        LogEntry.objects.bulk_create([
+            LogEntry(content_type=cls.types[i % 3], object_pk=str(i), object_id=i, object_repr=f'objeto {i}',
+                     action=LogEntry.Action.UPDATE, actor=cls.users[i % 4] if i % 4 < 3 else None,
+                     timestamp=BASE + timedelta(minutes=i), changes={'title': ['a', f'b{i}']},
+                     additional_data={'n': i}, remote_addr='203.0.113.9')
+            for i in range(60)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def legacy(self, log_entry):
+        """El formato que armaba el listado a partir de instancias de LogEntry"""
+        return {
+            'id': log_entry.id,
+            'timestamp': log_entry.timestamp,
+            'actor': log_entry.actor.username if log_entry.actor else 'System',
+            'action': log_entry.action,
+            'model': f"{log_entry.content_type.app_label}.{log_entry.content_type.model}",
+            'object_id': log_entry.object_id,
+            'object_repr': log_entry.object_repr,
+            'changes': log_entry.changes,
+            'additional_data': log_entry.additional_data,
+            'remote_addr': log_entry.remote_addr,
+        }
+
+    def test_matches_instance_serialization(self):
+        queryset = LogEntry.objects.select_related('actor', 'content_type').order_by('-timestamp')
+        self.assertEqual(
+            serializers.serialize_logs(serializers.list_values(queryset)),
+            [self.legacy(log_entry) for log_entry in queryset],
+        )
+
+    def test_list_queries_do_not_grow_with_page_size(self):
+        ContentType.objects.clear_cache()
+        self.client.get('/audit/api/logs/', {'page_size': 5})
+        for size in (5, 60):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get('/audit/api/logs/', {'page_size': size})
+            self.assertEqual(len(response.data['results']), size)
+            self.assertEqual(len(queries), 1)
+        row = response.data['results'][-1]
+        self.assertEqual((row['actor'], row['model']), ('user0', 'notes.note'))
+        self.assertEqual(response.data['results'][-4]['actor'], 'System')
+
+    def test_cursor_and_page_number_with_values(self):
+        first = self.client.get('/audit/api/logs/', {'page_size': 25}).json()
+        second = self.client.get(first['next']).json()
+        numbered = self.client.get('/audit/api/logs/', {'page_size': 25, 'page': 2}).json()
+        self.assertEqual(second['results'], numbered['results'])
+        self.assertEqual(numbered['count'], 60)
+
+    def test_user_activity_without_n_plus_one(self):
+        ContentType.objects.clear_cache()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/audit/api/logs/user_activity/', {'user_id': self.users[0].id})
+        recent = response.data['recent_activity']
+        self.assertEqual(len(recent), 15)
+        self.assertEqual(recent[0]['changes_count'], 1)
+        self.assertEqual({row['model'] for row in recent}, {'notes.note', 'notes.tag', 'users.customuser'})
+        # Una consulta por content type distinto, no una por entrada
+        content_type_queries = [q for q in queries.captured_queries if 'django_content_type' in q['sql']]
+        self.assertEqual(len(content_type_queries), 3)
@@ -0,0 +1,203 @@
+"""
+Tests del feed en vivo del dashboard de auditoría (audit/live.py)
+"""
+
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from audit import live, writer
+from notes.models import Tag
+
+User = get_user_model()
+
+FAST_LIVE = {**settings.AUDIT_SETTINGS, 'LIVE_INTERVAL': 0, 'LIVE_KEEPALIVE': 0.05, 'LIVE_QUEUE_SIZE': 3}
+
+
+def parse(chunk):
+    """[(evento, datos)] de un fragmento SSE (los comentarios salen como (None, texto))"""
+    if isinstance(chunk, bytes):
+        chunk = chunk.decode()
+    events = []
+    for block in chunk.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+        else:
+            events.append((None, block))
+    return events
+
+
+class BroadcastTests(SimpleTestCase):
+    def test_publish_from_other_thread_reaches_every_subscriber(self):
+        async def scenario():
+            channel = live.Broadcast()
+            first, second = channel.subscribe(10), channel.subscribe(10)
+            thread = threading.Thread(target=channel.publish, args=([1, 2],))
+            thread.start()
+            received = await first.get(timeout=1), await second.get(timeout=1)
+            thread.join()
+            channel.unsubscribe(first)
+            channel.publish([3])
+            return received, (await first.get(timeout=0)), (await second.get(timeout=1))
+
+        received, after_unsubscribe, still_subscribed = asyncio.run(scenario())
+        self.assertEqual(received, (([1, 2], 0), ([1, 2], 0)))
+        self.assertEqual(after_unsubscribe, ([], 0))
+        self.assertEqual(still_subscribed, ([3], 0))
+
+    def test_full_queue_drops_and_counts(self):
+        async def scenario():
+            channel = live.Broadcast()
+            subscription = channel.subscribe(3)
+            channel.publish([1, 2])
+            channel.publish([3, 4, 5])
+            channel.publish([6])
+            return await subscription.get(timeout=1), await subscription.get(timeout=0)
+
+        self.assertEqual(asyncio.run(scenario()), (([1, 2, 3], 3), ([], 0)))
+
+    def test_closed_loop_unsubscribes(self):
+        channel = live.Broadcast()
+
+        async def subscribe():
+            return channel.subscribe(10)
+
+        asyncio.run(subscribe())
+        self.assertTrue(channel)
+        channel.publish([1])
+        self.assertFalse(channel)
+
+    def test_nothing_serialized_without_subscribers(self):
+        with patch('audit.live.event_items') as event_items:
+            live.publish([object()])
+        event_items.assert_not_called()
+
+
+@override_settings(AUDIT_SETTINGS=FAST_LIVE)
+class LiveFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+            cls.user = User.objects.create_user(username='ana', email='ana@example.com', password='x')
+        cls.tag_type = ContentType.objects.get_for_model(Tag)
+
+    def setUp(self):
+        channel = patch('audit.live.broadcast', live.Broadcast())
+        self.channel = channel.start()
+        self.addCleanup(channel.stop)
+
+    def entry(self, action=LogEntry.Action.CREATE, actor=None):
+        return LogEntry(content_type=self.tag_type, object_pk='1', object_id=1, object_repr='Etiqueta',
+                        action=action, actor=actor)
+
+    async def subscribed(self, scenario):
+        """(evento ready, resultado de scenario(stream)) con event_stream ya suscrito"""
+        stream = live.event_stream()
+        try:
+            ready = parse(await anext(stream))
+            return ready, await scenario(stream)
+        finally:
+            await stream.aclose()
+
+    async def test_stream_sends_entries_and_delta(self):
+        async def scenario(stream):
+            # Escritura desde otro hilo, como las de un request o del writer
+            thread = threading.Thread(target=live.publish, args=([
+                self.entry(actor=self.admin), self.entry(LogEntry.Action.ACCESS),
+            ],))
+            thread.start()
+            thread.join()
+            return parse(await anext(stream))
+
+        ready, events = await self.subscribed(scenario)
+        self.assertEqual(ready[0][0], 'ready')
+        (name, rows), (delta_name, delta) = events
+        self.assertEqual((name, delta_name), ('entries', 'delta'))
+        label = f"{self.tag_type.app_label}.{self.tag_type.model}"
+        self.assertEqual([(row['actor'], row['model']) for row in rows], [('boss', label), ('System', label)])
+        self.assertEqual(delta['metrics'], {'total_actions': 2, 'critical_actions': 1})
+        self.assertEqual(sum(bucket['count'] for bucket in delta['hourly_activity']), 2)
+        self.assertEqual(delta['top_users'], [{'actor__username': 'boss', 'count': 1}])
+        self.assertEqual(delta['top_models'], [
+            {'content_type__app_label': self.tag_type.app_label, 'content_type__model': self.tag_type.model,
+             'count': 2},
+        ])
+        self.assertFalse(self.channel)
+
+    async def test_slow_client_gets_resync_then_keepalive(self):
+        async def scenario(stream):
+            live.publish([self.entry() for _ in range(5)])
+            return parse(await anext(stream)), parse(await anext(stream))
+
+        _, (resync, keepalive) = await self.subscribed(scenario)
+        self.assertEqual(resync, [('resync', {'dropped': 5})])
+        self.assertEqual(keepalive, [(None, ': keepalive')])
+
+    async def test_sync_mode_publishes_on_commit(self):
+        def write():
+            with self.captureOnCommitCallbacks(execute=True):
+                LogEntry.objects.create(content_type=self.tag_type, object_pk='2', object_repr='Nueva',
+                                        action=LogEntry.Action.UPDATE)
+
+        async def scenario(stream):
+            await sync_to_async(write)()
+            return parse(await anext(stream))
+
+        _, events = await self.subscribed(scenario)
+        self.assertEqual([row['object_repr'] for row in events[0][1]], ['Nueva'])
+
+    async def test_bulk_writes_publish(self):
+        def write():
+            with self.captureOnCommitCallbacks(execute=True):
+                writer.write_entries([self.entry(), self.entry()])
+            writer.BackgroundAuditWriter()._deliver([self.entry()])
+
+        async def scenario(stream):
+            await sync_to_async(write)()
+            return parse(await anext(stream))
+
+        _, events = await self.subscribed(scenario)
+        self.assertEqual(events[1][1]['metrics']['total_actions'], 3)
+        self.assertTrue(all(row['id'] for row in events[0][1]))
+
+    async def test_uncommitted_entry_not_published(self):
+        def write():
+            with self.captureOnCommitCallbacks(execute=False):
+                LogEntry.objects.create(content_type=self.tag_type, object_pk='3', object_repr='x',
+                                        action=LogEntry.Action.CREATE)
+
+        async def scenario(stream):
+            await sync_to_async(write)()
+            return parse(await anext(stream))
+
+        _, events = await self.subscribed(scenario)
+        self.assertEqual(events, [(None, ': keepalive')])
+
+    def test_endpoint_requires_asgi(self):
+        client = APIClient()
+        client.force_login(self.admin)
+        self.assertEqual(client.get('/audit/api/live/').status_code, 501)
+
+    async def test_endpoint_requires_staff(self):
+        self.assertEqual((await self.async_client.get('/audit/api/live/')).status_code, 401)
+        await self.async_client.aforce_login(self.user)
+        self.assertEqual((await self.async_client.get('/audit/api/live/')).status_code, 403)
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get('/audit/api/live/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        content = aiter(response.streaming_content)
+        self.assertEqual(parse(await anext(content))[0][0], 'ready')
+        await content.aclose()
@@ -0,0 +1,104 @@
+"""
+Tests del middleware de auditoría en una pasada (audit/middleware.py)
+"""
+
+from unittest.mock import patch
+
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from ipware import get_client_ip
+
+from audit.middleware import RouteTrie
+from notes.models import Note
+
+User = get_user_model()
+
+
+def audit_settings(routes=None, **overrides):
+    conf = {**settings.AUDIT_SETTINGS, **overrides}
+    if routes is not None:
+        conf['ROUTES'] = {**conf['ROUTES'], **routes}
+    return override_settings(AUDIT_SETTINGS=conf)
+
+
+def events(mock_logger):
+    calls = mock_logger.info.call_args_list + mock_logger.warning.call_args_list + mock_logger.log.call_args_list
+    return [c.kwargs['extra']['event'] for c in calls if 'extra' in c.kwargs]
+
+
+class RouteTrieTests(SimpleTestCase):
+    def setUp(self):
+        self.trie = RouteTrie({
+            '/api/': {'category': 'api'},
+            '/api/auth/': {'category': 'auth'},
+            '/api/auth/login/': {'category': 'auth', 'event': 'login'},
+        })
+
+    def test_longest_prefix_wins(self):
+        self.assertEqual(self.trie.match('/api/auth/login/')['event'], 'login')
+        self.assertEqual(self.trie.match('/api/auth/me/')['category'], 'auth')
+        self.assertIsNone(self.trie.match('/api/auth/me/')['event'])
+        self.assertEqual(self.trie.match('/api/notes/3/')['category'], 'api')
+
+    def test_segments_not_substrings(self):
+        self.assertIsNone(self.trie.match('/apiv2/')['category'])
+        self.assertIsNone(self.trie.match('/static/api/auth/')['category'])
+
+    def test_defaults_filled(self):
+        route = self.trie.match('/api/')
+        self.assertEqual(route['sample_rate'], 1.0)
+        self.assertFalse(route['sensitive'])
+
+
+@patch('audit.middleware.logger')
+class AuditMiddlewareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='mw', email='mw@example.com', password='pass12345')
+        self.client.force_login(self.user)
+
+    def test_client_ip_resolved_once(self, mock_logger):
+        with patch('audit.middleware.get_client_ip', wraps=get_client_ip) as resolver:
+            self.client.post('/api/notes/', {'title': 'n', 'content': 'c'}, content_type='application/json')
+        self.assertEqual(resolver.call_count, 1)
+        self.assertEqual(events(mock_logger), ['sensitive_access', 'data_access', 'api_response'])
+
+    def test_logentry_context(self, mock_logger):
+        self.client.post('/api/notes/', {'title': 'n', 'content': 'c'},
+                         content_type='application/json', REMOTE_ADDR='203.0.113.7')
+        entry = LogEntry.objects.get_for_model(Note).get()
+        self.assertEqual(entry.actor, self.user)
+        self.assertEqual(entry.remote_addr, '203.0.113.7')
+
+    def test_api_flag_disables_api_logging(self, mock_logger):
+        with audit_settings(ENABLE_API_AUDIT=False):
+            self.client.get('/api/notes/')
+            self.client.get('/api/nonexistent/')
+        self.assertEqual(events(mock_logger), [])
+
+    def test_auth_flag_disables_login_logging(self, mock_logger):
+        with audit_settings(ENABLE_AUTH_AUDIT=False):
+            self.client.post('/api/auth/login/', {'username': 'mw', 'password': 'mala'},
+                             content_type='application/json')
+        self.assertNotIn('login_attempt', events(mock_logger))
+        self.assertNotIn('login_failed', events(mock_logger))
+
+    def test_login_attempt_logged(self, mock_logger):
+        self.client.post('/api/auth/login/', {'username': 'mw', 'password': 'mala'},
+                         content_type='application/json')
+        self.assertIn('login_attempt', events(mock_logger))
+
+    def test_sampled_out_route_still_logs_errors(self, mock_logger):
+        with audit_settings(routes={'/api/notes/': {'category': 'api', 'sensitive': True, 'sample_rate': 0}}):
+            self.client.get('/api/notes/')
+            self.assertEqual(events(mock_logger), [])
+            self.client.get('/api/notes/999999/')
+        self.assertEqual(events(mock_logger), ['api_response'])
+
+    def test_sampling_rate(self, mock_logger):
+        with audit_settings(routes={'/api/notes/': {'category': 'api', 'sensitive': True, 'sample_rate': 0.5}}), \
+                patch('audit.middleware.random.random', side_effect=[0.2, 0.7]):
+            self.client.get('/api/notes/')
+            self.client.get('/api/notes/')
+        self.assertEqual(events(mock_logger).count('sensitive_access'), 1)
@@ -0,0 +1,103 @@
+"""
+Tests de la paginación por cursor del listado de auditoría (audit/pagination.py)
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from notes.models import Tag
+
+User = get_user_model()
+
+BASE = datetime(2026, 5, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+        tag_type = ContentType.objects.get_for_model(Tag)
+        # 25 entradas; de tres en tres comparten timestamp (desempate por id)
+        LogEntry.objects.bulk_create([
+            LogEntry(content_type=tag_type, object_pk=str(i), object_repr=f'tag {i}',
+                     action=LogEntry.Action.CREATE if i % 2 else LogEntry.Action.UPDATE,
+                     actor=cls.admin if i % 5 == 0 else None, timestamp=BASE + timedelta(minutes=i // 3))
+            for i in range(25)
+        ])
+        cls.expected = list(LogEntry.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def walk(self, url, direction='next'):
+        ids, pages = [], 0
+        while url:
+            data = self.client.get(url).json()
+            ids.extend(row['id'] for row in data['results'])
+            url = data[direction]
+            pages += 1
+        return ids, pages, data
+
+    def test_walks_every_entry_once(self):
+        ids, pages, last = self.walk('/audit/api/logs/?page_size=7')
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(pages, 4)
+        self.assertIsNone(last['next'])
+        self.assertNotIn('count', last)
+
+    def test_previous_links(self):
+        url = '/audit/api/logs/?page_size=7'
+        first = self.client.get(url).json()
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+        self.assertEqual([r['id'] for r in back['results']], self.expected[:7])
+        self.assertIsNotNone(back['next'])
+
+    def test_ascending_and_filters(self):
+        ids, _, _ = self.walk('/audit/api/logs/?ordering=timestamp&page_size=10')
+        self.assertEqual(ids, self.expected[::-1])
+        ids, _, _ = self.walk(f'/audit/api/logs/?user_id={self.admin.pk}&page_size=2')
+        self.assertEqual(ids, list(LogEntry.objects.filter(actor=self.admin)
+                                   .order_by('-timestamp', '-id').values_list('id', flat=True)))
+
+    def test_page_number_still_supported(self):
+        data = self.client.get('/audit/api/logs/?page=2').json()
+        self.assertEqual(data['count'], 25)
+        self.assertEqual([r['id'] for r in data['results']], self.expected[10:20])
+        data = self.client.get('/audit/api/logs/?ordering=action').json()
+        self.assertEqual(data['count'], 25)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/audit/api/logs/?cursor=nope').status_code, 404)
+
+    def test_no_count_or_offset(self):
+        first = self.client.get('/audit/api/logs/').json()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first['next'])
+        sql = ' '.join(q['sql'] for q in queries.captured_queries if 'auditlog_logentry' in q['sql'])
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_composite_indexes_used(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plan de consulta de SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM auditlog_logentry WHERE actor_id = %s "
+                "AND timestamp >= %s ORDER BY timestamp DESC, id DESC LIMIT 11",
+                [self.admin.pk, BASE.isoformat()],
+            )
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('audit_logentry_actor_ts', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
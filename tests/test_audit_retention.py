@@ -0,0 +1,154 @@
+"""
+Tests de la purga por lotes de logs de auditoría (audit/retention.py)
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest.mock import patch
+
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from audit import retention, rollups
+from audit.models import AuditHourlyRollup, AuditRetentionJob
+from notes.models import Tag
+
+User = get_user_model()
+
+NOW = datetime(2026, 6, 1, 12, 30, tzinfo=dt_timezone.utc)
+
+
+def run_inline(target):
+    target()
+
+
+class RetentionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+        cls.tag_type = ContentType.objects.get_for_model(Tag)
+
+    def setUp(self):
+        logger = patch('audit.retention.logger')
+        self.mock_logger = logger.start()
+        self.addCleanup(logger.stop)
+
+    def seed(self):
+        """10 entradas, 7 fuera de la retención, intercaladas por id con las recientes"""
+        ages = [400, 1, 401, 402, 1, 403, 404, 1, 405, 406]
+        LogEntry.objects.bulk_create([
+            LogEntry(content_type=self.tag_type, object_pk=str(i), object_repr='t',
+                     action=LogEntry.Action.CREATE, timestamp=NOW - timedelta(days=days))
+            for i, days in enumerate(ages)
+        ])
+        return sum(1 for days in ages if days > 365)
+
+    def test_cutoff_is_whole_hour(self):
+        cutoff = retention.retention_cutoff(365, now=NOW)
+        self.assertEqual(cutoff, datetime(2025, 6, 1, 12, 0, tzinfo=dt_timezone.utc))
+
+    def test_purge_in_batches(self):
+        old = self.seed()
+        cutoff = retention.retention_cutoff(365, now=NOW)
+        calls = []
+        deleted = retention.purge(cutoff, batch_size=2, sleep=0,
+                                  progress=lambda done, total: calls.append((done, total)))
+        self.assertEqual(deleted, old)
+        self.assertFalse(LogEntry.objects.filter(timestamp__lt=cutoff).exists())
+        self.assertEqual(LogEntry.objects.count(), 10 - old)
+        self.assertEqual(len(calls), (old + 1) // 2)
+        self.assertEqual(calls[-1], (old, old))
+
+    def test_batch_is_single_delete(self):
+        self.seed()
+        cutoff = retention.retention_cutoff(365, now=NOW)
+        with CaptureQueriesContext(connection) as queries:
+            retention.purge(cutoff, batch_size=2, sleep=0)
+        statements = [q['sql'] for q in queries.captured_queries if 'auditlog_logentry' in q['sql']]
+        # Un DELETE directo por lote, sin cargar las filas (Collector)
+        self.assertEqual(sum(sql.startswith('DELETE') for sql in statements), 4)
+        self.assertFalse([sql for sql in statements if 'changes' in sql])
+
+    def test_purge_forgets_rollups(self):
+        self.seed()
+        rollups.compact(lag=0)
+        cutoff = retention.retention_cutoff(365, now=NOW)
+        retention.purge(cutoff, sleep=0)
+        self.assertFalse(AuditHourlyRollup.objects.filter(bucket__lt=cutoff).exists())
+        self.assertEqual(rollups.count(), LogEntry.objects.count())
+
+    def test_command(self):
+        old = self.seed()
+        out = StringIO()
+        with patch('audit.retention.timezone.now', return_value=NOW):
+            call_command('purge_audit_logs', '--dry-run', stdout=out)
+            self.assertIn(f'{old} entradas', out.getvalue())
+            self.assertEqual(LogEntry.objects.count(), 10)
+            call_command('purge_audit_logs', '--batch-size=3', '--sleep=0', stdout=out)
+        self.assertIn(f'{old} entradas anteriores', out.getvalue())
+        self.assertEqual(LogEntry.objects.count(), 10 - old)
+
+    def test_endpoint_runs_job(self):
+        old = self.seed()
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with patch('audit.retention._spawn', side_effect=run_inline), \
+                patch('audit.retention.timezone.now', return_value=NOW):
+            response = client.post('/audit/api/cleanup/', {'confirm': True}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job = response.json()['job']
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['deleted_count'], old)
+        status = client.get(response.json()['status_url']).json()
+        self.assertEqual(status['deleted_count'], old)
+        self.assertIsNone(retention.running_job())
+        self.assertEqual(client.get('/audit/api/cleanup/nope/').status_code, 404)
+
+    def test_single_job_at_a_time(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with patch('audit.retention._spawn'):
+            first = client.post('/audit/api/cleanup/', {'confirm': True}, format='json')
+            second = client.post('/audit/api/cleanup/', {'confirm': True}, format='json')
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.status_code, 409)
+        self.assertEqual(second.json()['job']['id'], first.json()['job']['id'])
+
+    def test_failed_job_releases_lock(self):
+        with patch('audit.retention._spawn', side_effect=run_inline), \
+                patch('audit.retention.purge', side_effect=RuntimeError('boom')):
+            job, created = retention.start_job(NOW)
+        self.mock_logger.exception.assert_called_once()
+        self.assertTrue(created)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(retention.get_job(job['id'])['error'], 'boom')
+        self.assertIsNone(retention.running_job())
+
+    def test_single_active_job_in_database(self):
+        """El cerrojo es una restricción única: vale para todos los workers"""
+        with patch('audit.retention._spawn'):
+            job, created = retention.start_job(NOW)
+        self.assertTrue(created)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AuditRetentionJob.objects.create(id='otro', cutoff=NOW, started_at=NOW)
+        self.assertEqual(retention.get_job(job['id'])['status'], 'pending')
+
+    def test_abandoned_job_is_replaced(self):
+        with patch('audit.retention._spawn'):
+            stale, _ = retention.start_job(NOW)
+        AuditRetentionJob.objects.filter(pk=stale['id']).update(
+            updated_at=NOW - retention.STALE_AFTER - timedelta(minutes=1),
+        )
+        with patch('audit.retention._spawn'), patch('audit.retention.timezone.now', return_value=NOW):
+            job, created = retention.start_job(NOW)
+        self.assertTrue(created)
+        self.assertEqual(retention.get_job(stale['id'])['status'], 'failed')
+        self.assertEqual(retention.running_job()['id'], job['id'])
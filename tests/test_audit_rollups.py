@@ -0,0 +1,206 @@
+"""
+Tests de los rollups de auditoría (audit/rollups.py)
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from unittest.mock import patch
+
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from audit import rollups, stats_cache
+from audit.models import AuditActorRollup, AuditHourlyRollup
+from notes.models import Note, Tag
+
+User = get_user_model()
+
+BASE = datetime(2026, 3, 10, 12, 0, tzinfo=dt_timezone.utc)
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+            cls.other = User.objects.create_user(username='other', email='other@example.com', password='x')
+        cls.tag_type = ContentType.objects.get_for_model(Tag)
+        cls.note_type = ContentType.objects.get_for_model(Note)
+
+    def setUp(self):
+        stats_cache.invalidate()
+
+    def log(self, minutes, action=LogEntry.Action.CREATE, actor=None, content_type=None):
+        return LogEntry.objects.create(
+            content_type=content_type or self.tag_type, object_pk='1', object_repr='t',
+            action=action, actor=actor, timestamp=BASE + timedelta(minutes=minutes),
+        )
+
+    def seed(self):
+        self.log(-30, actor=self.admin)                                # 11:30
+        self.log(5, LogEntry.Action.UPDATE, self.admin)                # 12:05
+        self.log(20, LogEntry.Action.DELETE, self.other, self.note_type)
+        self.log(70)                                                   # 13:10 sin actor
+        self.log(130, actor=self.other)                                # 14:10
+
+    def exact(self, start=None, end=None, **filters):
+        queryset = LogEntry.objects.all()
+        if start:
+            queryset = queryset.filter(timestamp__gte=start)
+        if end:
+            queryset = queryset.filter(timestamp__lt=end)
+        return queryset.filter(**rollups._raw_filters(filters)).count()
+
+    def test_compact_is_incremental(self):
+        self.seed()
+        self.assertEqual(rollups.compact(batch_size=2, lag=0), 5)
+        self.assertEqual(rollups.compact(lag=0), 0)
+        self.log(10, actor=self.admin)
+        self.assertEqual(rollups.compact(lag=0), 1)
+        row = AuditHourlyRollup.objects.get(bucket=BASE, action=LogEntry.Action.CREATE)
+        self.assertEqual(row.count, 1)
+        self.assertEqual(
+            AuditActorRollup.objects.get(bucket=BASE, action=LogEntry.Action.UPDATE).actor_id, self.admin.pk
+        )
+        self.assertEqual(AuditActorRollup.objects.get(bucket=BASE + timedelta(hours=1)).actor_id, 0)
+        self.assertEqual(sum(AuditHourlyRollup.objects.values_list('count', flat=True)), 6)
+
+    def test_lag_skips_recent_entries(self):
+        entry = LogEntry.objects.create(content_type=self.tag_type, object_pk='1', object_repr='t',
+                                        action=LogEntry.Action.CREATE)
+        self.assertEqual(rollups.compact(lag=3600), 0)
+        self.assertEqual(rollups.watermark(), 0)
+        self.assertEqual(rollups.compact(lag=0), 1)
+        self.assertEqual(rollups.watermark(), entry.pk)
+
+    def test_grouped_matches_log_entries(self):
+        self.seed()
+        rollups.compact(lag=0)
+        self.log(40, actor=self.admin)  # sin compactar
+        ranges = [
+            (None, None),
+            (BASE - timedelta(minutes=10), None),
+            (BASE + timedelta(minutes=10), BASE + timedelta(minutes=100)),
+            (BASE + timedelta(minutes=1), BASE + timedelta(minutes=30)),
+            (BASE, BASE + timedelta(hours=2)),
+        ]
+        for start, end in ranges:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(rollups.count(start, end), self.exact(start, end))
+                self.assertEqual(rollups.count(start, end, actor_id=self.admin.pk),
+                                 self.exact(start, end, actor_id=self.admin.pk))
+                self.assertEqual(rollups.count(start, end, actor_id=0), self.exact(start, end, actor_id=0))
+                by_action = rollups.grouped(('action',), start, end)
+                self.assertEqual(by_action[(LogEntry.Action.CREATE,)],
+                                 self.exact(start, end, action=LogEntry.Action.CREATE))
+
+    def test_grouped_buckets(self):
+        self.seed()
+        rollups.compact(lag=0)
+        self.log(15)  # sin compactar
+        buckets = rollups.grouped(('bucket',), BASE + timedelta(minutes=10))
+        self.assertEqual(buckets, {
+            (BASE,): 2, (BASE + timedelta(hours=1),): 1, (BASE + timedelta(hours=2),): 1,
+        })
+
+    def test_unknown_dimension(self):
+        with self.assertRaises(ValueError):
+            rollups.grouped(('object_pk',))
+
+    def test_rebuild_command(self):
+        self.seed()
+        rollups.compact(lag=0)
+        AuditHourlyRollup.objects.update(count=99)
+        out = StringIO()
+        call_command('compact_audit_rollups', '--rebuild', '--lag=0', stdout=out)
+        self.assertIn('5 entradas', out.getvalue())
+        self.assertEqual(sum(AuditHourlyRollup.objects.values_list('count', flat=True)), 5)
+
+    def test_endpoints_read_rollups(self):
+        self.seed()
+        rollups.compact(lag=0)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with patch('django.utils.timezone.now', return_value=BASE + timedelta(hours=3)):
+            dashboard = client.get('/audit/api/dashboard/?days=1').json()
+            statistics = client.get('/audit/api/logs/statistics/').json()
+            activity = client.get(f'/audit/api/logs/user_activity/?user_id={self.other.pk}').json()
+        self.assertEqual(dashboard['metrics'], {
+            'total_actions': 5, 'unique_users': 2, 'critical_actions': 5, 'security_events': 0,
+        })
+        self.assertEqual(dashboard['charts']['top_users'], [
+            {'actor__username': 'boss', 'count': 2}, {'actor__username': 'other', 'count': 2},
+        ])
+        self.assertEqual(statistics['total_logs'], 5)
+        self.assertEqual(statistics['actions'][0], {'action': LogEntry.Action.CREATE, 'count': 3})
+        self.assertEqual(statistics['models'][0]['content_type__model'], 'tag')
+        # 11:30-14:10 UTC son el 10 de marzo en America/Mexico_City
+        self.assertEqual(statistics['daily_activity'], [{'day': '2026-03-10', 'count': 5}])
+        self.assertEqual(activity['statistics']['total_actions'], 2)
+
+    def test_statistics_filters(self):
+        self.seed()
+        rollups.compact(lag=0)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/audit/api/logs/statistics/', {
+            'model': 'notes.tag', 'date_from': (BASE - timedelta(minutes=30)).isoformat(),
+            'date_to': (BASE + timedelta(minutes=70)).isoformat(),
+        })
+        self.assertEqual(response.json()['total_logs'], 3)
+        response = client.get('/audit/api/logs/statistics/', {'user_id': self.other.pk, 'action': 'delete'})
+        self.assertEqual(response.json()['total_logs'], 1)
+
+    def test_statistics_date_only_range(self):
+        self.seed()
+        rollups.compact(lag=0)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with patch('django.utils.timezone.now', return_value=BASE + timedelta(hours=3)):
+            response = client.get('/audit/api/logs/statistics/', {'date_from': '2026-03-10', 'date_to': '2026-03-11'})
+        self.assertEqual(response.status_code, 200)
+        # Fechas sin zona en la zona horaria actual: todo el 10 de marzo en Ciudad de México
+        self.assertEqual(response.json()['total_logs'], 5)
+
+    def test_deleted_actor_left_out_of_top_users(self):
+        self.seed()
+        rollups.compact(lag=0)
+        with disable_auditlog():
+            User.objects.filter(pk=self.other.pk).delete()
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with patch('django.utils.timezone.now', return_value=BASE + timedelta(hours=3)):
+            dashboard = client.get('/audit/api/dashboard/?days=1').json()
+            statistics = client.get('/audit/api/logs/statistics/').json()
+        self.assertEqual(statistics['top_users'], [{'actor__username': 'boss', 'count': 2}])
+        self.assertEqual(dashboard['charts']['top_users'], [{'actor__username': 'boss', 'count': 2}])
+        self.assertEqual(dashboard['metrics']['unique_users'], 1)
+        self.assertEqual(statistics['total_logs'], 5)
+
+    def test_local_hours_with_half_hour_offset(self):
+        """En Asia/Kolkata (UTC+5:30) una hora UTC cae en dos horas locales"""
+        self.seed()
+        rollups.compact(lag=0)
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with override_settings(TIME_ZONE='Asia/Kolkata'), \
+                patch('django.utils.timezone.now', return_value=BASE + timedelta(hours=3)):
+            dashboard = client.get('/audit/api/dashboard/?days=1').json()
+            statistics = client.get('/audit/api/logs/statistics/').json()
+        hours = {bucket['hour']: bucket['count'] for bucket in dashboard['charts']['hourly_activity'] if bucket['count']}
+        # 11:30, 12:05 y 12:20 UTC son las 17 h; 13:10 las 18 h; 14:10 las 19 h
+        self.assertEqual(hours, {17: 3, 18: 1, 19: 1})
+        self.assertEqual(statistics['daily_activity'], [{'day': '2026-03-10', 'count': 5}])
+
+    def test_forget_before(self):
+        self.seed()
+        rollups.compact(lag=0)
+        rollups.forget_before(BASE + timedelta(hours=1))
+        self.assertFalse(AuditHourlyRollup.objects.filter(bucket__lt=BASE + timedelta(hours=1)).exists())
+        self.assertEqual(AuditActorRollup.objects.count(), 2)
@@ -0,0 +1,124 @@
+"""
+Tests de la búsqueda indexada del log de auditoría (audit/search.py)
+"""
+
+import operator
+import unittest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import reduce
+from io import StringIO
+from unittest.mock import patch
+
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from audit import search
+from notes.models import Note, Tag
+
+User = get_user_model()
+
+BASE = datetime(2026, 5, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+REPRS = ['Nota de Ana', 'Factura 2026-05', 'etiqueta "urgente"', 'Café con leche', 'ana@example.com', 'x']
+
+
+class AuditSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+            cls.mariana = User.objects.create_user(username='mariana', email='m@example.com', password='x')
+        note_type = ContentType.objects.get_for_model(Note)
+        tag_type = ContentType.objects.get_for_model(Tag)
+        LogEntry.objects.bulk_create([
+            LogEntry(content_type=note_type if i % 2 else tag_type, object_pk=str(i), object_repr=text,
+                     action=LogEntry.Action.UPDATE, actor=cls.mariana if i % 3 == 0 else None,
+                     timestamp=BASE + timedelta(minutes=i))
+            for i, text in enumerate(REPRS)
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def search(self, value):
+        response = self.client.get('/audit/api/logs/', {'search': value, 'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['id'] for row in response.json()['results'])
+
+    def expected(self, *terms):
+        """Lo que devolvía SearchFilter con icontains sobre los tres campos"""
+        conditions = [
+            Q(actor__username__icontains=term) | Q(object_repr__icontains=term)
+            | Q(content_type__model__icontains=term)
+            for term in terms
+        ]
+        return sorted(LogEntry.objects.filter(reduce(operator.and_, conditions)).values_list('id', flat=True))
+
+    def test_same_results_as_icontains(self):
+        cases = [
+            ('ana', ['ana']), ('ANA', ['ANA']), ('2026-05', ['2026-05']), ('café', ['café']),
+            ('"urgente"', ['urgente']), ('note', ['note']), ('mariana nota', ['mariana', 'nota']),
+            ('x', ['x']), ('leche tag', ['leche', 'tag']), ('inexistente', ['inexistente']),
+        ]
+        for value, terms in cases:
+            with self.subTest(search=value):
+                self.assertEqual(self.search(value), self.expected(*terms))
+        self.assertTrue(self.search('ana'))
+
+    def test_index_follows_inserts_updates_and_deletes(self):
+        entry = LogEntry.objects.create(content_type=ContentType.objects.get_for_model(Tag), object_pk='9',
+                                        object_repr='Presupuesto trimestral', action=LogEntry.Action.CREATE)
+        self.assertEqual(self.search('trimestral'), [entry.id])
+        LogEntry.objects.filter(pk=entry.pk).update(object_repr='Presupuesto anual')
+        self.assertEqual(self.search('trimestral'), [])
+        self.assertEqual(self.search('anual'), [entry.id])
+        entry.delete()
+        self.assertEqual(self.search('anual'), [])
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 solo en SQLite')
+    def test_sqlite_uses_fts_table(self):
+        self.assertTrue(search.fts_available())
+        with CaptureQueriesContext(connection) as queries:
+            self.search('factura')
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertIn(search.FTS_TABLE, sql)
+        self.assertNotIn('LIKE', sql.split('FROM "auditlog_logentry"')[-1])
+        # Menos de 3 caracteres: el trigrama no sirve y se usa icontains
+        with CaptureQueriesContext(connection) as queries:
+            self.search('ca')
+        self.assertNotIn(search.FTS_TABLE, ' '.join(query['sql'] for query in queries.captured_queries))
+        # Término con muchas coincidencias: icontains en orden de timestamp
+        with patch('audit.search.DENSE_MATCHES', 2):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.search('ana'), self.expected('ana'))
+        self.assertNotIn(search.FTS_TABLE, queries.captured_queries[-1]['sql'])
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'FTS5 solo en SQLite')
+    def test_rebuild_command_restores_triggers(self):
+        with connection.cursor() as cursor:
+            for trigger in search.TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {trigger}')
+        search._available.clear()
+        self.addCleanup(search._available.clear)
+        self.assertFalse(search.fts_available())
+        entry = LogEntry.objects.create(content_type=ContentType.objects.get_for_model(Tag), object_pk='9',
+                                        object_repr='Inventario', action=LogEntry.Action.CREATE)
+        call_command('rebuild_audit_search', stdout=StringIO())
+        self.assertTrue(search.fts_available())
+        self.assertEqual(self.search('inventario'), [entry.id])
+
+    @patch('audit.views.logger')
+    def test_export_uses_search(self, mock_logger):
+        response = self.client.get('/audit/api/logs/export/', {'export_format': 'ndjson', 'search': 'factura'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertIn('Factura 2026-05', lines[0])
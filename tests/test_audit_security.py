@@ -0,0 +1,199 @@
+"""
+Tests del detector de fuerza bruta y anomalías de autenticación (audit/security.py)
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from auditlog.context import disable_auditlog
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from audit import security, stats_cache
+from audit.models import AuditSecuritySummary
+
+User = get_user_model()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def detector(clock, **kwargs):
+    options = {'window': 60, 'bucket_seconds': 10, 'ip_failures': 3, 'username_failures': 2,
+               'global_failures': 5, 'max_keys': 100, **kwargs}
+    return security.AuthEventDetector(clock=clock, **options)
+
+
+def kinds(alerts):
+    return [alert['kind'] for alert in alerts]
+
+
+class SlidingCounterTests(SimpleTestCase):
+    def test_window_slides(self):
+        counter = security.SlidingCounter(6, bucket=0)
+        for bucket in (0, 0, 2, 5):
+            counter.add(bucket)
+        self.assertEqual(counter.value(5), 4)
+        # Salen las casillas 0 (dos eventos) y luego la 2
+        self.assertEqual(counter.value(6), 2)
+        self.assertEqual(counter.value(8), 1)
+        self.assertEqual(counter.value(100), 0)
+        self.assertEqual(counter.add(100), 1)
+        self.assertEqual(len(counter.counts), 6)
+
+
+class AuthEventDetectorTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = Clock()
+
+    def test_ip_alert_fires_once_when_crossing(self):
+        events = detector(self.clock)
+        results = [kinds(events.login_failed('10.0.0.1', f'user{i}')) for i in range(5)]
+        self.assertEqual(results, [[], [], [security.IP_BRUTE_FORCE], [], [security.FAILURE_SPIKE]])
+        # Cuando la ventana vence, un nuevo ataque vuelve a alertar
+        self.clock.now += 61
+        results = [kinds(events.login_failed('10.0.0.1', f'user{i}')) for i in range(3)]
+        self.assertEqual(results, [[], [], [security.IP_BRUTE_FORCE]])
+
+    def test_username_alert_across_ips_and_success_after_failures(self):
+        events = detector(self.clock)
+        self.assertEqual(kinds(events.login_failed('10.0.0.1', 'ana')), [])
+        alerts = events.login_failed('10.0.0.2', 'ana')
+        self.assertEqual(kinds(alerts), [security.USERNAME_BRUTE_FORCE])
+        self.assertEqual((alerts[0]['key'], alerts[0]['count'], alerts[0]['window_seconds']), ('ana', 2, 60))
+        self.assertEqual(kinds(events.login_succeeded('10.0.0.3', 'bob')), [])
+        self.assertEqual(kinds(events.login_succeeded('10.0.0.3', 'ana')), [security.SUCCESS_AFTER_FAILURES])
+        self.clock.now += 61
+        self.assertEqual(events.login_succeeded('10.0.0.3', 'ana'), [])
+
+    def test_tracked_keys_are_bounded(self):
+        events = detector(self.clock, max_keys=3, global_failures=1000)
+        for i in range(10):
+            events.login_failed(f'10.0.0.{i}', None)
+        self.assertEqual(len(events.by_ip), 3)
+        self.assertEqual(events.by_ip.evicted, 7)
+        self.assertEqual(events.failures.value(events._bucket()), 10)
+
+    def test_take_period(self):
+        events = detector(self.clock)
+        self.assertIsNone(events.take_period())
+        for ip in ('10.0.0.1', '10.0.0.1', '10.0.0.1', '10.0.0.2'):
+            events.login_failed(ip, 'ana')
+        events.login_succeeded('10.0.0.9', 'bob')
+        self.assertFalse(events.due(30))
+        self.clock.now += 30
+        self.assertTrue(events.due(30))
+        summary = events.take_period()
+        self.assertEqual((summary['failed_logins'], summary['successful_logins'], summary['alerts']), (4, 1, 2))
+        self.assertEqual(kinds(summary['details']['alerts']),
+                         [security.USERNAME_BRUTE_FORCE, security.IP_BRUTE_FORCE])
+        self.assertEqual(summary['details']['top_ips'], [('10.0.0.1', 3), ('10.0.0.2', 1)])
+        self.assertEqual(summary['details']['top_usernames'], [('ana', 4)])
+        self.assertIsNone(events.take_period())
+        self.assertFalse(events.due(0))
+        # La ventana sigue contando después del volcado; lo vencido se olvida
+        self.assertEqual(events.by_ip.value('10.0.0.1', events._bucket()), 3)
+        self.clock.now += 61
+        events.login_failed(None, None)
+        events.take_period()
+        self.assertEqual((len(events.by_ip), len(events.by_username)), (0, 0))
+
+
+@override_settings(AUDIT_SETTINGS={**settings.AUDIT_SETTINGS, 'SECURITY_FLUSH_INTERVAL': 30})
+class SecuritySignalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+            cls.user = User.objects.create_user(username='ana', email='ana@example.com', password='Secreta123')
+
+    def setUp(self):
+        stats_cache.invalidate()
+        self.clock = Clock()
+        self.events = detector(self.clock)
+        patcher = patch('audit.security._detector', self.events)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def failed_login(self):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.post('/api/auth/login/', {'username': 'Ana', 'password': 'mala'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @patch('audit.middleware.logger')
+    @patch('audit.security.logger')
+    def test_failed_logins_feed_detector_with_ip(self, mock_logger, mock_middleware_logger):
+        self.failed_login()
+        self.failed_login()
+        self.assertEqual(self.events.by_ip.value('127.0.0.1', self.events._bucket()), 2)
+        self.assertEqual(self.events.by_username.value('ana', self.events._bucket()), 2)
+        mock_logger.warning.assert_called_once()
+        self.assertEqual(mock_logger.warning.call_args.kwargs['extra']['kind'], security.USERNAME_BRUTE_FORCE)
+        self.client.post('/api/auth/login/', {'username': 'ana', 'password': 'Secreta123'}, format='json')
+        self.assertEqual(mock_logger.warning.call_args.kwargs['extra']['kind'], security.SUCCESS_AFTER_FAILURES)
+
+    @patch('audit.middleware.logger')
+    @patch('audit.security.logger')
+    def test_failed_email_login_counts_once(self, mock_logger, mock_middleware_logger):
+        with self.assertLogs('django.request', 'WARNING'):
+            response = self.client.post('/api/auth/login/', {'username': 'ana@example.com', 'password': 'mala'},
+                                        format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.events.failures.value(self.events._bucket()), 1)
+        self.assertEqual(self.events.by_username.value('ana', self.events._bucket()), 1)
+
+    @patch('audit.middleware.logger')
+    @patch('audit.security.logger')
+    def test_spoofed_forwarded_for_is_ignored(self, mock_logger, mock_middleware_logger):
+        with self.assertLogs('django.request', 'WARNING'):
+            self.client.post('/api/auth/login/', {'username': 'ana', 'password': 'mala'}, format='json',
+                             HTTP_X_FORWARDED_FOR='203.0.113.9')
+        self.assertEqual(self.events.by_ip.value('127.0.0.1', self.events._bucket()), 1)
+        self.assertEqual(self.events.by_ip.value('203.0.113.9', self.events._bucket()), 0)
+
+    @patch('audit.middleware.logger')
+    @patch('audit.security.logger')
+    def test_summaries_flushed_and_shown_on_dashboard(self, mock_logger, mock_middleware_logger):
+        self.failed_login()
+        self.failed_login()
+        # El periodo aún no venció: nada en la tabla
+        self.assertFalse(AuditSecuritySummary.objects.exists())
+        self.clock.now += 31
+        # El siguiente evento vuelca el periodo vencido antes de contarse
+        self.client.post('/api/auth/login/', {'username': 'ana', 'password': 'Secreta123'}, format='json')
+        summary = AuditSecuritySummary.objects.get()
+        self.assertEqual((summary.failed_logins, summary.successful_logins, summary.alerts), (2, 0, 1))
+
+        self.client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/audit/api/dashboard/').json()
+        self.assertEqual(data['metrics']['security_events'], 1)
+        self.assertEqual(data['security']['failed_logins'], 2)
+        self.assertEqual([(alert['kind'], alert['key']) for alert in data['security']['recent_alerts']],
+                         [(security.USERNAME_BRUTE_FORCE, 'ana')])
+        security_sql = [q['sql'] for q in queries.captured_queries if AuditSecuritySummary._meta.db_table in q['sql']]
+        self.assertEqual(len(security_sql), 2)
+        self.assertFalse(any('auditlog_logentry' in sql for sql in security_sql))
+
+    def test_dashboard_summary_range(self):
+        now = timezone.now()
+        AuditSecuritySummary.objects.create(period_start=now - timedelta(days=10, minutes=1),
+                                            period_end=now - timedelta(days=10), failed_logins=7, alerts=1,
+                                            details={'alerts': [{'kind': 'x', 'at': '2026-01-01'}]})
+        AuditSecuritySummary.objects.create(period_start=now - timedelta(minutes=1), period_end=now,
+                                            failed_logins=3, successful_logins=1)
+        self.assertEqual(security.dashboard_summary(now - timedelta(days=1)), {
+            'security_events': 0, 'failed_logins': 3, 'successful_logins': 1, 'recent_alerts': [],
+        })
+        self.assertEqual(security.dashboard_summary(now - timedelta(days=30))['security_events'], 1)
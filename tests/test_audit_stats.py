@@ -0,0 +1,82 @@
+"""
+Tests de las agregaciones del dashboard de auditoría (audit/stats.py)
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from audit import stats, stats_cache
+from notes.models import Tag
+
+User = get_user_model()
+
+
+class DashboardStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+            cls.other = User.objects.create_user(username='other', email='other@example.com', password='x')
+        cls.tag_type = ContentType.objects.get_for_model(Tag)
+        now = timezone.now()
+        entries = [
+            (cls.admin, LogEntry.Action.CREATE, now),
+            (cls.admin, LogEntry.Action.UPDATE, now),
+            (cls.other, LogEntry.Action.DELETE, now),
+            (None, LogEntry.Action.ACCESS, now),
+        ]
+        LogEntry.objects.bulk_create([
+            LogEntry(content_type=cls.tag_type, object_pk='1', object_repr='t',
+                     action=action, actor=actor, timestamp=timestamp)
+            for actor, action, timestamp in entries
+        ])
+
+    def test_summary_metrics(self):
+        metrics = stats.summary_metrics(LogEntry.objects.all())
+        self.assertEqual(metrics, {'total_actions': 4, 'unique_users': 2, 'critical_actions': 3})
+
+    def test_hourly_buckets_use_time_zone(self):
+        LogEntry.objects.all().delete()
+        # 03:30 UTC son las 21:30 del día anterior en America/Mexico_City (UTC-6)
+        LogEntry.objects.create(
+            content_type=self.tag_type, object_pk='1', object_repr='t', action=LogEntry.Action.CREATE,
+            timestamp=datetime(2026, 1, 15, 3, 30, tzinfo=dt_timezone.utc),
+        )
+        with override_settings(TIME_ZONE='America/Mexico_City'):
+            buckets = stats.hourly_activity(LogEntry.objects.all())
+        self.assertEqual(len(buckets), 24)
+        self.assertEqual([b['hour'] for b in buckets if b['count']], [21])
+        with timezone.override(dt_timezone.utc):
+            buckets = stats.hourly_activity(LogEntry.objects.all())
+        self.assertEqual([b['hour'] for b in buckets if b['count']], [3])
+
+    def test_top_lists(self):
+        queryset = LogEntry.objects.all()
+        self.assertEqual(stats.top_users(queryset), [
+            {'actor__username': 'boss', 'count': 2},
+            {'actor__username': 'other', 'count': 1},
+        ])
+        self.assertEqual(stats.top_models(queryset), [
+            {'content_type__app_label': 'notes', 'content_type__model': 'tag', 'count': 4},
+        ])
+
+    def test_dashboard_query_count(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        ContentType.objects.get_for_id(self.tag_type.pk)  # caché de ContentType
+        stats_cache.invalidate()
+        # marca, rollup + LogEntry por hora, rollup + LogEntry por actor, nombres
+        # y los totales de los resúmenes de seguridad
+        with self.assertNumQueries(7):
+            response = client.get('/audit/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['metrics']['total_actions'], 4)
+        self.assertEqual(sum(b['count'] for b in data['charts']['hourly_activity']), 4)
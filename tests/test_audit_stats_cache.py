@@ -0,0 +1,145 @@
+"""
+Tests de la caché de estadísticas de auditoría (audit/stats_cache.py)
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+from auditlog.context import disable_auditlog
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from audit import stats_cache
+from notes.models import Tag
+
+User = get_user_model()
+
+
+def run_inline(target):
+    target()
+
+
+class StatsCacheTests(SimpleTestCase):
+    def setUp(self):
+        stats_cache.invalidate()
+        spawn = patch('audit.stats_cache._spawn', side_effect=run_inline)
+        spawn.start()
+        self.addCleanup(spawn.stop)
+
+    def test_hit_after_miss_and_keyed_by_params(self):
+        self.assertEqual(stats_cache.cached('x', {'days': 1}, lambda: 1), (1, stats_cache.MISS))
+        self.assertEqual(stats_cache.cached('x', {'days': 1}, lambda: 2), (1, stats_cache.HIT))
+        self.assertEqual(stats_cache.cached('x', {'days': 7}, lambda: 3), (3, stats_cache.MISS))
+        with timezone.override('UTC'):
+            self.assertEqual(stats_cache.cached('x', {'days': 1}, lambda: 4), (4, stats_cache.MISS))
+
+    def test_invalidate(self):
+        stats_cache.cached('x', {}, lambda: 1)
+        stats_cache.invalidate()
+        self.assertEqual(stats_cache.cached('x', {}, lambda: 2), (2, stats_cache.MISS))
+        cache.delete(stats_cache.GENERATION_KEY)
+        stats_cache.invalidate()
+        self.assertEqual(stats_cache.cached('x', {}, lambda: 3), (3, stats_cache.MISS))
+
+    def test_stale_while_revalidate(self):
+        stats_cache.cached('x', {}, lambda: 1)
+        later = time.time() + stats_cache.cache_settings()['ttl'] + 1
+        with patch('audit.stats_cache.time.time', return_value=later):
+            # Se sirve el valor vencido; el recálculo (aquí en línea) guarda el nuevo
+            self.assertEqual(stats_cache.cached('x', {}, lambda: 2), (1, stats_cache.STALE))
+            self.assertEqual(stats_cache.cached('x', {}, lambda: 3), (2, stats_cache.HIT))
+
+    def test_revalidation_in_progress_is_not_repeated(self):
+        stats_cache.cached('x', {}, lambda: 1)
+        cache.add(stats_cache.LOCK_KEY % stats_cache.cache_key('x', {}), 1)
+        later = time.time() + stats_cache.cache_settings()['ttl'] + 1
+        with patch('audit.stats_cache.time.time', return_value=later):
+            calls = []
+            self.assertEqual(stats_cache.cached('x', {}, lambda: calls.append(1)), (1, stats_cache.STALE))
+        self.assertEqual(calls, [])
+
+    def test_failed_revalidation_releases_lock(self):
+        stats_cache.cached('x', {}, lambda: 1)
+
+        def fail():
+            raise RuntimeError('boom')
+
+        later = time.time() + stats_cache.cache_settings()['ttl'] + 1
+        with patch('audit.stats_cache.time.time', return_value=later), \
+                patch('audit.stats_cache.logger') as mock_logger:
+            self.assertEqual(stats_cache.cached('x', {}, fail), (1, stats_cache.STALE))
+        mock_logger.exception.assert_called_once()
+        self.assertIsNone(cache.get(stats_cache.LOCK_KEY % stats_cache.cache_key('x', {})))
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        threads = [
+            threading.Thread(target=lambda: results.append(stats_cache.cached('x', {}, compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(state for _, state in results), [stats_cache.HIT] * 4 + [stats_cache.MISS])
+        self.assertEqual({value for value, _ in results}, {'value'})
+
+    def test_ttl_zero_disables_cache(self):
+        with override_settings(AUDIT_SETTINGS={**settings.AUDIT_SETTINGS, 'STATS_CACHE_TTL': 0}):
+            stats_cache.cached('x', {}, lambda: 1)
+            self.assertEqual(stats_cache.cached('x', {}, lambda: 2), (2, stats_cache.MISS))
+
+
+class StatsEndpointCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with disable_auditlog():
+            cls.admin = User.objects.create_superuser(username='boss', email='boss@example.com', password='x')
+        cls.tag_type = ContentType.objects.get_for_model(Tag)
+
+    def setUp(self):
+        stats_cache.invalidate()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def log(self):
+        LogEntry.objects.create(content_type=self.tag_type, object_pk='1', object_repr='t',
+                                action=LogEntry.Action.CREATE, actor=self.admin)
+
+    def test_dashboard_cached(self):
+        self.log()
+        first = self.client.get('/audit/api/dashboard/')
+        self.assertEqual(first['X-Cache'], 'miss')
+        self.log()
+        with self.assertNumQueries(0):
+            second = self.client.get('/audit/api/dashboard/')
+        self.assertEqual(second['X-Cache'], 'hit')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.json()['metrics']['total_actions'], 1)
+        third = self.client.get('/audit/api/dashboard/', {'days': 7})
+        self.assertEqual(third['X-Cache'], 'miss')
+        self.assertEqual(third.json()['metrics']['total_actions'], 2)
+
+    def test_statistics_keyed_by_filters(self):
+        self.log()
+        self.assertEqual(self.client.get('/audit/api/logs/statistics/').json()['total_logs'], 1)
+        self.log()
+        response = self.client.get('/audit/api/logs/statistics/')
+        self.assertEqual((response['X-Cache'], response.json()['total_logs']), ('hit', 1))
+        response = self.client.get('/audit/api/logs/statistics/', {'user_id': self.admin.pk})
+        self.assertEqual((response['X-Cache'], response.json()['total_logs']), ('miss', 2))
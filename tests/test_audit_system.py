@@ -5,6 +5,7 @@ Verifica que todos los eventos se registran correctamente
 
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
@@ -14,6 +15,7 @@ from rest_framework.test import APITestCase
 from rest_framework import status
 
 from auditlog.models import LogEntry
+from audit import stats_cache
 from notes.models import Note, Tag
 from users.models import UserPreference
 
@@ -246,6 +248,8 @@ class AuditAPITestCase(APITestCase):
     """Pruebas para las API de auditoría"""
     
     def setUp(self):
+        stats_cache.invalidate()
+        
         # Crear usuario administrador
         self.admin_user = User.objects.create_superuser(
             username='admin',
@@ -359,8 +363,10 @@ class AuditAPITestCase(APITestCase):
         # Crear log antiguo
         old_date = timezone.now() - timedelta(days=400)
         LogEntry.objects.create(
+            content_type=ContentType.objects.get_for_model(Note),
             action=LogEntry.Action.CREATE,
-            object_id='old',
+            object_pk='1',
+            object_id=1,
             object_repr='Old Object',
             timestamp=old_date,
             actor=self.regular_user
@@ -368,12 +374,14 @@ class AuditAPITestCase(APITestCase):
         
         initial_count = LogEntry.objects.count()
         
-        response = self.client.post('/audit/api/cleanup/', {'confirm': True})
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with patch('audit.retention._spawn', side_effect=lambda target: target()):
+            response = self.client.post('/audit/api/cleanup/', {'confirm': True})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
         
-        # Verificar que se ejecutó la limpieza
+        # La limpieza corre como trabajo en segundo plano
         self.assertTrue(response.data.get('success', False))
-        self.assertIn('deleted_count', response.data)
+        self.assertIn('deleted_count', response.data['job'])
+        self.assertFalse(LogEntry.objects.filter(object_repr='Old Object').exists())
 
 
 class AuditIntegrationTestCase(TestCase):
@@ -0,0 +1,153 @@
+"""
+Tests del writer de auditoría por lotes (audit/writer.py)
+"""
+
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from auditlog.context import set_actor
+from auditlog.models import LogEntry
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from audit import writer
+from notes.models import Note, Tag
+
+User = get_user_model()
+
+
+def audit_settings(**overrides):
+    return override_settings(AUDIT_SETTINGS={**settings.AUDIT_SETTINGS, **overrides})
+
+
+def logentry_inserts(queries):
+    table = LogEntry._meta.db_table
+    return [q for q in queries if q['sql'].startswith('INSERT') and table in q['sql']]
+
+
+class BatchedWriterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer', email='w@example.com', password='x')
+
+    @audit_settings(WRITER_MODE='batched')
+    def test_entries_flushed_with_one_insert(self):
+        before = LogEntry.objects.count()
+        with CaptureQueriesContext(connection) as ctx:
+            with writer.buffer_audit_entries():
+                with self.captureOnCommitCallbacks(execute=True):
+                    note = Note.objects.create(user=self.user, title='t', content='c')
+                    note.tags.set([Tag.objects.create(name='a'), Tag.objects.create(name='b')])
+                self.assertEqual(LogEntry.objects.count(), before)
+        self.assertEqual(len(logentry_inserts(ctx.captured_queries)), 1)
+        # Nota y 2 tags (Note no audita sus cambios m2m)
+        self.assertEqual(LogEntry.objects.count(), before + 3)
+
+    @audit_settings(WRITER_MODE='batched')
+    def test_actor_applied_at_capture(self):
+        with writer.buffer_audit_entries():
+            with self.captureOnCommitCallbacks(execute=True):
+                with set_actor(self.user, remote_addr='10.0.0.1'):
+                    Tag.objects.create(name='con-actor')
+        entry = LogEntry.objects.get_for_model(Tag).latest('timestamp')
+        self.assertEqual(entry.actor, self.user)
+        self.assertEqual(entry.remote_addr, '10.0.0.1')
+
+    @audit_settings(WRITER_MODE='batched')
+    def test_rolled_back_changes_not_logged(self):
+        before = LogEntry.objects.count()
+        with writer.buffer_audit_entries():
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        Tag.objects.create(name='revertido')
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                Tag.objects.create(name='confirmado')
+        self.assertEqual(LogEntry.objects.count(), before + 1)
+        self.assertEqual(LogEntry.objects.latest('timestamp').object_repr, 'confirmado')
+
+    @audit_settings(WRITER_MODE='batched')
+    def test_without_buffer_writes_immediately(self):
+        before = LogEntry.objects.count()
+        Tag.objects.create(name='shell')
+        self.assertEqual(LogEntry.objects.count(), before + 1)
+
+    @audit_settings(WRITER_MODE='batched')
+    def test_direct_create_not_intercepted(self):
+        with writer.buffer_audit_entries():
+            entry = LogEntry.objects.create(
+                content_type=ContentType.objects.get_for_model(Tag),
+                object_pk='1', object_repr='manual', action=LogEntry.Action.ACCESS,
+            )
+            self.assertIsNotNone(entry.pk)
+
+    @audit_settings(WRITER_MODE='batched')
+    def test_failed_flush_saved_as_fixture(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with audit_settings(WRITER_MODE='batched', WRITER_FALLBACK_DIR=directory):
+                with patch.object(LogEntry.objects, 'bulk_create', side_effect=RuntimeError):
+                    with writer.buffer_audit_entries():
+                        with self.captureOnCommitCallbacks(execute=True):
+                            Tag.objects.create(name='perdida')
+                files = os.listdir(directory)
+                self.assertEqual(len(files), 1)
+                with open(os.path.join(directory, files[0])) as fh:
+                    data = json.load(fh)
+        self.assertEqual(data[0]['model'], 'auditlog.logentry')
+        self.assertEqual(data[0]['fields']['object_repr'], 'perdida')
+
+
+class BackgroundWriterTests(TestCase):
+    def test_stop_drains_pending_entries(self):
+        user = User.objects.create_user(username='bg', email='bg@example.com', password='x')
+        background = writer.BackgroundAuditWriter(batch_size=2)
+        with audit_settings(WRITER_MODE='background'), \
+                patch.object(writer, 'get_background_writer', return_value=background):
+            with self.captureOnCommitCallbacks(execute=True):
+                Tag.objects.create(name='uno')
+                Tag.objects.create(name='dos')
+                user.first_name = 'Cambio'
+                user.save()
+        before = LogEntry.objects.count()
+        with CaptureQueriesContext(connection) as ctx:
+            background.stop()
+        self.assertEqual(LogEntry.objects.count(), before + 3)
+        self.assertEqual(len(logentry_inserts(ctx.captured_queries)), 2)
+
+
+class WriterThreadTests(TransactionTestCase):
+    def test_thread_writes_batches(self):
+        background = writer.BackgroundAuditWriter(batch_size=100, flush_interval=0.05)
+        background.start()
+        with audit_settings(WRITER_MODE='background'), \
+                patch.object(writer, 'get_background_writer', return_value=background):
+            for i in range(5):
+                Tag.objects.create(name=f'tag-{i}')
+        background.stop()
+        self.assertFalse(background._thread.is_alive())
+        self.assertEqual(LogEntry.objects.get_for_model(Tag).count(), 5)
+
+
+class WriterMiddlewareTests(TransactionTestCase):
+    def test_one_insert_per_request(self):
+        user = User.objects.create_user(username='api', email='api@example.com', password='x')
+        client = APIClient()
+        client.force_login(user)
+        with audit_settings(WRITER_MODE='batched'):
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.post('/api/notes/', {
+                    'title': 'Nota', 'content': 'texto', 'tags': ['uno', 'dos', 'tres'],
+                }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(logentry_inserts(ctx.captured_queries)), 1)
+        entries = LogEntry.objects.filter(action=LogEntry.Action.CREATE).exclude(object_repr='api')
+        self.assertEqual(entries.count(), 4)  # nota y 3 tags
+        self.assertTrue(all(e.actor_id == user.pk for e in entries))
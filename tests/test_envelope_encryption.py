@@ -0,0 +1,191 @@
+"""
+Pruebas para la encriptación de sobre por usuario
+"""
+from importlib import import_module
+from io import StringIO
+from unittest.mock import patch
+
+from auditlog.models import LogEntry
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from encrypted_model_fields.fields import decrypt_str, encrypt_str
+from notes.models import Note
+from users import envelope
+from users.envelope import (
+    AEAD_MAGIC, AEAD_VERSION, DataKey, DataKeyCache, encrypt_for_owner, get_key_cache,
+    shred_data_key,
+)
+from users.models import UserDataKey
+
+User = get_user_model()
+
+
+class EnvelopeEncryptionTestCase(TestCase):
+    """Verifica claves por usuario, compatibilidad y crypto-shredding"""
+
+    def setUp(self):
+        get_key_cache().clear()
+        self.alice = User.objects.create_user(
+            username='alice', email='alice@example.com', password='testpass123'
+        )
+        self.bob = User.objects.create_user(
+            username='bob', email='bob@example.com', password='testpass123'
+        )
+
+    def _raw_content(self, note_id):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT content FROM notes_note WHERE id = %s", [note_id])
+            return cursor.fetchone()[0]
+
+    def test_content_encrypted_with_owner_key(self):
+        """El contenido se guarda en formato AEAD con la clave del propietario"""
+        note = Note.objects.create(user=self.alice, title='A', content='Secreto de Alice')
+        raw = bytes(self._raw_content(note.id))
+        header, nonce, ciphertext = raw[:3], raw[3:15], raw[15:]
+        self.assertEqual(header, AEAD_MAGIC + bytes((AEAD_VERSION, 1)))
+        # Overhead fijo: cabecera + nonce + tag
+        self.assertEqual(len(raw), 3 + 12 + len('Secreto de Alice'.encode()) + 16)
+
+        data_key = DataKey(UserDataKey.objects.get(user=self.alice).key)
+        plain = data_key.aead(1).decrypt(nonce, ciphertext, header).decode()
+        self.assertEqual(plain, 'Secreto de Alice')
+        self.assertEqual(Note.objects.get(id=note.id).content, 'Secreto de Alice')
+
+    def test_chacha20_algorithm(self):
+        """ENVELOPE_AEAD_ALGORITHM selecciona el cifrado; ambos se leen"""
+        conf = {**settings.ENVELOPE_ENCRYPTION, 'AEAD_ALGORITHM': 'chacha20-poly1305'}
+        with self.settings(ENVELOPE_ENCRYPTION=conf):
+            note = Note.objects.create(user=self.alice, title='C', content='con ChaCha20')
+        self.assertEqual(bytes(self._raw_content(note.id))[2], 2)
+        self.assertEqual(Note.objects.get(id=note.id).content, 'con ChaCha20')
+
+    def test_tampered_ciphertext_rejected(self):
+        """Modificar un byte invalida el tag y el valor no se descifra"""
+        note = Note.objects.create(user=self.alice, title='T', content='Integridad')
+        raw = bytearray(self._raw_content(note.id))
+        raw[-1] ^= 0x01
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE notes_note SET content = %s WHERE id = %s", [bytes(raw), note.id])
+        self.assertNotEqual(Note.objects.get(id=note.id).content, 'Integridad')
+
+    def test_each_user_has_own_key(self):
+        """Cada usuario obtiene una clave distinta, envuelta con la maestra"""
+        Note.objects.create(user=self.alice, title='A', content='uno')
+        Note.objects.create(user=self.alice, title='B', content='dos')
+        Note.objects.create(user=self.bob, title='C', content='tres')
+        self.assertEqual(UserDataKey.objects.count(), 2)
+        keys = {str(k.key) for k in UserDataKey.objects.all()}
+        self.assertEqual(len(keys), 2)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT key FROM users_userdatakey")
+            for (wrapped,) in cursor.fetchall():
+                # Guardada cifrada con la clave maestra, no en claro
+                self.assertNotIn(wrapped, keys)
+                self.assertIn(decrypt_str(wrapped), keys)
+
+    def test_shredding_makes_data_unreadable(self):
+        """Destruir la clave deja el contenido ilegible sin tocar las filas"""
+        note = Note.objects.create(user=self.alice, title='A', content='Borrable')
+        raw = self._raw_content(note.id)
+        self.assertTrue(shred_data_key(self.alice.id))
+
+        reloaded = Note.objects.get(id=note.id)
+        self.assertEqual(bytes(self._raw_content(note.id)), bytes(raw))
+        self.assertNotIn('Borrable', reloaded.content)
+
+    def test_audit_log_keeps_no_plaintext_after_shredding(self):
+        """El LogEntry de una nota no guarda el contenido: nada sobrevive al shredding"""
+        note = Note.objects.create(user=self.alice, title='A', content='Diario privado')
+        note.content = 'Diario privado, editado'
+        note.save()
+        self.assertTrue(shred_data_key(self.alice.id))
+
+        entries = LogEntry.objects.get_for_object(note)
+        self.assertEqual(entries.count(), 2)
+        for entry in entries:
+            self.assertNotIn('Diario', entry.changes_text)
+            self.assertNotIn('Diario', str(entry.changes))
+            self.assertTrue(all(value == envelope.REDACTED for value in entry.changes['content']))
+
+    def test_migration_redacts_existing_log_entries(self):
+        """La migración 0008 borra el contenido de los LogEntry anteriores"""
+        note = Note.objects.create(user=self.alice, title='A', content='x')
+        entry = LogEntry.objects.get_for_object(note).get()
+        entry.changes = {'title': ['None', 'A'], 'content': ['None', 'Antes en claro']}
+        entry.save()
+
+        migration = import_module('notes.migrations.0008_redact_content_in_auditlog')
+        migration.redact_content(global_apps, None)
+        entry.refresh_from_db()
+        self.assertEqual(entry.changes, {'title': ['None', 'A'], 'content': ['[cifrado]', '[cifrado]']})
+
+    def test_user_deletion_destroys_key(self):
+        """Borrar la cuenta elimina la clave de datos en cascada"""
+        Note.objects.create(user=self.alice, title='A', content='x')
+        with self.captureOnCommitCallbacks(execute=True):
+            envelope.get_data_key(self.alice.id)
+        self.assertIsNotNone(get_key_cache().get(self.alice.id))
+
+        self.alice.delete()
+        self.assertFalse(UserDataKey.objects.filter(user_id=self.alice.id).exists())
+        self.assertIsNone(get_key_cache().get(self.alice.id))
+
+    def test_key_cached_only_after_commit(self):
+        """Una clave creada en una transacción revertida no queda en caché"""
+        try:
+            with transaction.atomic():
+                envelope.get_data_key(self.bob.id, create=True)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertIsNone(get_key_cache().get(self.bob.id))
+        self.assertFalse(UserDataKey.objects.filter(user=self.bob).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            data_key = envelope.get_data_key(self.bob.id, create=True)
+        self.assertIs(get_key_cache().get(self.bob.id), data_key)
+
+    def test_legacy_rows_readable_and_migrated(self):
+        """Los formatos anteriores se leen y el comando los convierte a AEAD"""
+        legacy = Note.objects.create(user=self.bob, title='Maestra', content='temporal')
+        fernet_env = Note.objects.create(user=self.bob, title='Env1', content='temporal')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE notes_note SET content = %s WHERE id = %s",
+                [encrypt_str('Contenido antiguo').decode(), legacy.id]
+            )
+            cursor.execute(
+                "UPDATE notes_note SET content = %s WHERE id = %s",
+                [encrypt_for_owner('Contenido env1', self.bob.id), fernet_env.id]
+            )
+        self.assertEqual(Note.objects.get(id=legacy.id).content, 'Contenido antiguo')
+        self.assertEqual(Note.objects.get(id=fernet_env.id).content, 'Contenido env1')
+
+        out = StringIO()
+        call_command('migrate_envelope_encryption', workers=1, stdout=out)
+        self.assertIn('2 convertidas', out.getvalue())
+        for note_id, text in ((legacy.id, 'Contenido antiguo'), (fernet_env.id, 'Contenido env1')):
+            self.assertTrue(bytes(self._raw_content(note_id)).startswith(AEAD_MAGIC))
+            self.assertEqual(Note.objects.get(id=note_id).content, text)
+
+        out = StringIO()
+        call_command('migrate_envelope_encryption', workers=1, stdout=out)
+        self.assertIn('0 convertidas, 2 al día', out.getvalue())
+
+    def test_cache_lru_and_ttl(self):
+        """La caché expulsa la entrada menos usada y respeta el TTL"""
+        cache = DataKeyCache(maxsize=2, ttl=60)
+        cache.set(1, 'k1')
+        cache.set(2, 'k2')
+        cache.get(1)
+        cache.set(3, 'k3')
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), 'k1')
+
+        with patch('users.envelope.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(cache.get(1))
@@ -0,0 +1,168 @@
+"""
+Pruebas para el comando rotate_encryption_key
+"""
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from auditlog.models import LogEntry
+from notes.models import Note
+from users.encryption import fetch_raw, key_fingerprint
+from users.models import UserDataKey
+
+User = get_user_model()
+
+
+class KeyRotationTestCase(TestCase):
+    """Verifica re-cifrado, ausencia de auditoría por fila y reanudación"""
+
+    def setUp(self):
+        self.old_key = settings.FIELD_ENCRYPTION_KEY
+        self.new_key = Fernet.generate_key().decode()
+        self.tmpdir = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.tmpdir, 'checkpoint.json')
+
+        self.users = [
+            User.objects.create_user(
+                username=f'rotuser{i}', email=f'rot{i}@example.com',
+                first_name=f'Rosa {i}', password='testpass123'
+            )
+            for i in range(5)
+        ]
+        for i in range(5):
+            Note.objects.create(user=self.users[0], title=f'Nota {i}', content=f'Secreto {i}')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def _rotate(self, **options):
+        """Simula el despliegue de FIELD_ENCRYPTION_KEY='nueva,antigua'"""
+        out = StringIO()
+        with override_settings(FIELD_ENCRYPTION_KEY=[self.new_key, self.old_key]):
+            call_command(
+                'rotate_encryption_key', workers=1, batch_size=2,
+                checkpoint=self.checkpoint, stdout=out, **options
+            )
+        return out.getvalue()
+
+    def _raw(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return [row[0] for row in cursor.fetchall()]
+
+    def _raw_emails(self):
+        return self._raw("SELECT email FROM users_customuser ORDER BY id")
+
+    def test_rotation_reencrypts_with_new_key(self):
+        """Tras rotar, los campos con clave maestra se descifran solo con la nueva"""
+        logs_before = LogEntry.objects.count()
+        self._rotate()
+
+        new = Fernet(self.new_key)
+        for i, raw in enumerate(self._raw_emails()):
+            self.assertEqual(new.decrypt(raw.encode()).decode(), f'rot{i}@example.com')
+        first_name = self._raw(f"SELECT first_name FROM users_customuser WHERE id = {self.users[0].id}")[0]
+        self.assertEqual(new.decrypt(first_name.encode()).decode(), 'Rosa 0')
+        with self.assertRaises(InvalidToken):
+            Fernet(self.old_key).decrypt(self._raw_emails()[0].encode())
+
+        # La clave de datos del usuario queda envuelta con la clave nueva
+        wrapped = self._raw("SELECT key FROM users_userdatakey")[0]
+        new.decrypt(wrapped.encode())
+
+        # El ORM sigue leyendo los valores (la clave nueva está en el cifrador)
+        crypter = MultiFernet([Fernet(self.new_key), Fernet(self.old_key)])
+        with patch('encrypted_model_fields.fields.CRYPTER', crypter):
+            self.assertEqual(User.objects.get(username='rotuser1').email, 'rot1@example.com')
+            self.assertEqual(Note.objects.get(title='Nota 0').content, 'Secreto 0')
+
+        # Sin una entrada de auditoría por fila
+        self.assertEqual(LogEntry.objects.count(), logs_before)
+
+    def test_envelope_rows_are_not_rewritten(self):
+        """Las notas (envelope) no se reescriben: solo se re-envuelve la clave"""
+        before = self._raw("SELECT content FROM notes_note ORDER BY id")
+        out = self._rotate()
+        self.assertEqual(self._raw("SELECT content FROM notes_note ORDER BY id"), before)
+        self.assertIn('notes.note: 0 re-cifradas, 5 al día', out)
+        self.assertIn('users.userdatakey: 1 re-cifradas', out)
+
+    def test_dry_run_does_not_write(self):
+        """--dry-run cuenta sin modificar filas ni checkpoint"""
+        before = self._raw_emails()
+        out = self._rotate(dry_run=True, models=['users.CustomUser'])
+        self.assertEqual(self._raw_emails(), before)
+        self.assertIn('5 necesitan rotación', out)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resume_from_checkpoint(self):
+        """Una ejecución reanudada continúa tras el último lote completado"""
+        ids = [user.id for user in self.users]
+        state = {
+            'primary': key_fingerprint(self.new_key),
+            'models': {'users.customuser': {
+                'after': ids[2], 'done': False, 'rotated': 3, 'unchanged': 0, 'failed': 0,
+            }},
+        }
+        with open(self.checkpoint, 'w') as fh:
+            json.dump(state, fh)
+
+        self._rotate(models=['users.CustomUser'])
+
+        new = Fernet(self.new_key)
+        raw = self._raw_emails()
+        # Las filas anteriores al checkpoint no se tocaron
+        for value in raw[:3]:
+            with self.assertRaises(InvalidToken):
+                new.decrypt(value.encode())
+        for value in raw[3:]:
+            new.decrypt(value.encode())
+
+        with open(self.checkpoint) as fh:
+            progress = json.load(fh)['models']['users.customuser']
+        self.assertTrue(progress['done'])
+        self.assertEqual(progress['rotated'], 5)
+
+    def test_second_run_is_noop(self):
+        """Re-ejecutar sobre datos ya rotados no reescribe nada"""
+        self._rotate()
+        rotated = self._raw_emails()
+        out = self._rotate(restart=True)
+        self.assertEqual(self._raw_emails(), rotated)
+        self.assertIn('users.customuser: 0 re-cifradas, 5 al día', out)
+        self.assertTrue(UserDataKey.objects.filter(user=self.users[0]).exists())
+
+    def test_concurrent_edit_is_not_overwritten(self):
+        """Una fila editada entre la lectura y el UPDATE conserva la edición"""
+        edited = self.users[0]
+        new = Fernet(self.new_key)
+        state = {'edited': False}
+
+        def fetch_then_edit(model, fields, *args, **kwargs):
+            rows = fetch_raw(model, fields, *args, **kwargs)
+            if model is User and not state['edited']:
+                state['edited'] = True
+                # Otro proceso (ya con la clave nueva) guarda un email nuevo
+                token = new.encrypt(b'editado@example.com').decode()
+                with connection.cursor() as cursor:
+                    cursor.execute("UPDATE users_customuser SET email = %s WHERE id = %s", [token, edited.id])
+            return rows
+
+        with patch('users.management.commands.rotate_encryption_key.fetch_raw', side_effect=fetch_then_edit):
+            out = self._rotate(models=['users.CustomUser'])
+
+        raw = self._raw(f"SELECT email FROM users_customuser WHERE id = {edited.id}")[0]
+        self.assertEqual(new.decrypt(raw.encode()).decode(), 'editado@example.com')
+        # Al releerla, el resto de columnas de la fila se re-cifró igualmente
+        self.assertIn('users.customuser: 5 re-cifradas, 0 al día', out)
+        first_name = self._raw(f"SELECT first_name FROM users_customuser WHERE id = {edited.id}")[0]
+        self.assertEqual(new.decrypt(first_name.encode()).decode(), 'Rosa 0')
@@ -0,0 +1,145 @@
+"""
+Pruebas para el desencriptado perezoso de Note.content
+"""
+import json
+from unittest.mock import patch
+
+from auditlog.context import disable_auditlog
+from django.db import connection
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from encrypted_model_fields import fields as encrypted_fields
+from rest_framework.test import APIClient
+from notes.models import Note
+from users.fields import LazyDecryptedValue
+
+User = get_user_model()
+
+
+class DecryptCounter:
+    """Cuenta las llamadas a decrypt_str del paquete de encriptación"""
+
+    def __init__(self):
+        self.calls = 0
+        self._original = encrypted_fields.decrypt_str
+
+    def __call__(self, token):
+        self.calls += 1
+        return self._original(token)
+
+    def __enter__(self):
+        self._patch = patch.object(encrypted_fields, 'decrypt_str', self)
+        self._patch.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._patch.stop()
+
+
+class LazyDecryptionTestCase(TestCase):
+    """Verifica que content solo se desencripta al leerse"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='lazyuser', email='lazy@example.com', password='testpass123'
+        )
+        for i in range(5):
+            Note.objects.create(user=self.user, title=f'Nota {i}', content=f'Contenido {i}')
+
+    def test_loading_rows_does_not_decrypt(self):
+        """Cargar notas sin leer content no desencripta nada"""
+        with DecryptCounter() as counter:
+            titles = [str(note) for note in Note.objects.select_related('user')]
+            emails = list(User.objects.values_list('email', flat=True))
+        self.assertEqual(len(titles), 5)
+        self.assertEqual(counter.calls, 0)
+
+    def test_decrypts_once_on_access(self):
+        """El primer acceso desencripta y el resultado queda memorizado"""
+        note = Note.objects.get(title='Nota 1')
+        with DecryptCounter() as counter:
+            self.assertEqual(note.content, 'Contenido 1')
+            self.assertIsInstance(note.content, str)
+            self.assertEqual(note.content.upper(), 'CONTENIDO 1')
+        self.assertEqual(counter.calls, 1)
+
+    def test_save_untouched_keeps_ciphertext(self):
+        """Guardar sin leer content reescribe el texto cifrado tal cual"""
+        note = Note.objects.get(title='Nota 2')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT content FROM notes_note WHERE id = %s", [note.id])
+            before = cursor.fetchone()[0]
+
+        # auditlog lee los campos para calcular el diff: sin él no hay desencriptado
+        with DecryptCounter() as counter, disable_auditlog():
+            note.title = 'Nota 2 editada'
+            note.save(update_fields=['title', 'content'])
+        self.assertEqual(counter.calls, 0)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT content FROM notes_note WHERE id = %s", [note.id])
+            self.assertEqual(cursor.fetchone()[0], before)
+        self.assertEqual(Note.objects.get(id=note.id).content, 'Contenido 2')
+
+    def test_assignment_is_encrypted(self):
+        """Asignar un valor nuevo lo cifra al guardar"""
+        note = Note.objects.get(title='Nota 3')
+        note.content = 'Nuevo secreto'
+        note.save()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT content FROM notes_note WHERE id = %s", [note.id])
+            raw = bytes(cursor.fetchone()[0])
+        self.assertNotIn(b'Nuevo secreto', raw)
+        self.assertEqual(Note.objects.get(id=note.id).content, 'Nuevo secreto')
+
+    def test_values_returns_str_like_proxy(self):
+        """values_list devuelve un proxy que se comporta como str"""
+        value = User.objects.filter(username='lazyuser').values_list('email', flat=True)[0]
+        self.assertIsInstance(value, LazyDecryptedValue)
+        self.assertFalse(value.is_resolved)
+        self.assertEqual(value, 'lazy@example.com')
+        self.assertIn('@example', value)
+        self.assertEqual(str(value), 'lazy@example.com')
+
+    def test_values_can_be_sorted(self):
+        """Los proxies se ordenan como str, entre sí y frente a str"""
+        User.objects.create_user(username='alfa', email='alfa@example.com', password='testpass123')
+        emails = list(User.objects.values_list('email', flat=True))
+        self.assertEqual([str(e) for e in sorted(emails)], ['alfa@example.com', 'lazy@example.com'])
+        self.assertEqual(max(emails), 'lazy@example.com')
+        value = User.objects.filter(username='lazyuser').values_list('email', flat=True)[0]
+        self.assertTrue(value < 'm' and value <= 'lazy@example.com' and value > 'k' and value >= 'lazy')
+        self.assertTrue('a' < value)
+
+    def test_authenticated_request_does_not_decrypt_user(self):
+        """Cargar request.user no desencripta email ni nombre"""
+        self.client.force_login(self.user)
+        with DecryptCounter() as counter:
+            resp = self.client.get('/api/health/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(counter.calls, 0)
+
+    def test_api_list_serializes_content(self):
+        """El listado de la API sigue devolviendo el contenido plano"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        resp = client.get('/api/notes/')
+        self.assertEqual(resp.status_code, 200)
+        body = json.loads(resp.content)
+        results = body['results'] if isinstance(body, dict) else body
+        self.assertEqual(
+            sorted(n['content'] for n in results),
+            [f'Contenido {i}' for i in range(5)]
+        )
+
+    def test_admin_changelist_does_not_decrypt(self):
+        """El listado del admin no muestra campos encriptados y no los desencripta"""
+        admin = User.objects.create_superuser(
+            username='lazyadmin', email='lazyadmin@example.com', password='adminpass123'
+        )
+        self.client.force_login(admin)
+        with DecryptCounter() as counter:
+            resp = self.client.get('/admin/notes/note/')
+        self.assertEqual(resp.status_code, 200)
+        # Solo el saludo de la cabecera lee first_name del admin
+        self.assertEqual(counter.calls, 1)
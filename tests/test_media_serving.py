@@ -0,0 +1,115 @@
+"""
+Pruebas para el servicio de archivos de media
+"""
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 4  # 1024 bytes
+HASHED_NAME = 'a' * 64 + '.jpg'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SERVE_MODE='python')
+class MediaServingTestCase(TestCase):
+    """Verifica rangos, validadores de caché y offload"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('profile_images/avatar.jpg', f'profile_images/{HASHED_NAME}', 'exports/logs.ndjson.gz'):
+            os.makedirs(os.path.dirname(os.path.join(MEDIA_ROOT, name)), exist_ok=True)
+            with open(os.path.join(MEDIA_ROOT, name), 'wb') as fh:
+                fh.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_full_response_headers(self):
+        """Respuesta completa con ETag, Last-Modified y Accept-Ranges"""
+        resp = self.client.get('/media/profile_images/avatar.jpg')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b''.join(resp.streaming_content), CONTENT)
+        self.assertEqual(resp['Content-Type'], 'image/jpeg')
+        self.assertEqual(resp['Accept-Ranges'], 'bytes')
+        self.assertTrue(resp['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', resp)
+        self.assertNotIn('immutable', resp['Cache-Control'])
+
+    def test_compressed_file_served_without_content_encoding(self):
+        """Un .gz se sirve tal cual: sin Content-Encoding, con su tipo y sus rangos"""
+        resp = self.client.get('/media/exports/logs.ndjson.gz')
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('Content-Encoding', resp)
+        self.assertEqual(resp['Content-Type'], 'application/gzip')
+        self.assertEqual(resp['Content-Length'], '1024')
+        resp = self.client.get('/media/exports/logs.ndjson.gz', HTTP_RANGE='bytes=0-9')
+        self.assertEqual(resp.status_code, 206)
+        self.assertNotIn('Content-Encoding', resp)
+        self.assertEqual(b''.join(resp.streaming_content), CONTENT[:10])
+
+    def test_content_addressed_is_immutable(self):
+        """Los nombres con hash de contenido se cachean como inmutables"""
+        resp = self.client.get(f'/media/profile_images/{HASHED_NAME}')
+        self.assertIn('immutable', resp['Cache-Control'])
+        self.assertEqual(resp['ETag'], f'"{HASHED_NAME}"')
+
+    def test_if_none_match_returns_304(self):
+        """Un ETag coincidente devuelve 304 sin cuerpo"""
+        etag = self.client.get('/media/profile_images/avatar.jpg')['ETag']
+        resp = self.client.get('/media/profile_images/avatar.jpg', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+    def test_range_requests(self):
+        """Rangos explícitos, abiertos y de sufijo devuelven 206"""
+        cases = {
+            'bytes=0-99': (0, 99),
+            'bytes=1000-': (1000, 1023),
+            'bytes=-24': (1000, 1023),
+            'bytes=1000-5000': (1000, 1023),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(range=header):
+                resp = self.client.get('/media/profile_images/avatar.jpg', HTTP_RANGE=header)
+                self.assertEqual(resp.status_code, 206)
+                self.assertEqual(resp['Content-Range'], f'bytes {start}-{end}/1024')
+                self.assertEqual(b''.join(resp.streaming_content), CONTENT[start:end + 1])
+
+    def test_unsatisfiable_range(self):
+        """Un rango fuera del archivo devuelve 416"""
+        resp = self.client.get('/media/profile_images/avatar.jpg', HTTP_RANGE='bytes=5000-')
+        self.assertEqual(resp.status_code, 416)
+        self.assertEqual(resp['Content-Range'], 'bytes */1024')
+
+    def test_if_range_mismatch_serves_full_file(self):
+        """Con If-Range obsoleto se ignora el rango"""
+        resp = self.client.get(
+            '/media/profile_images/avatar.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"viejo"'
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    def test_path_traversal_and_missing(self):
+        """Rutas fuera de MEDIA_ROOT o inexistentes devuelven 404"""
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/profile_images/nope.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/profile_images').status_code, 404)
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_offload(self):
+        """En modo x-accel la respuesta delega el archivo a nginx"""
+        resp = self.client.get('/media/profile_images/avatar.jpg')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['X-Accel-Redirect'], '/protected-media/profile_images/avatar.jpg')
+        self.assertEqual(resp.content, b'')
+        self.assertEqual(resp['Content-Type'], 'image/jpeg')
+
+    @override_settings(MEDIA_SERVE_MODE='x-sendfile')
+    def test_x_sendfile_offload(self):
+        """En modo x-sendfile se envía la ruta absoluta"""
+        resp = self.client.get('/media/profile_images/avatar.jpg')
+        self.assertEqual(resp['X-Sendfile'], os.path.join(MEDIA_ROOT, 'profile_images', 'avatar.jpg'))
@@ -0,0 +1,191 @@
+"""
+Pruebas para el procesamiento de imágenes de perfil
+"""
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from users.images import generate_variants, release_profile_image, restore_profile_image
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(size=(800, 600), image_format='PNG', mode='RGB'):
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 30, 30)).save(buffer, image_format)
+    ext = image_format.lower()
+    return SimpleUploadedFile(f'avatar.{ext}', buffer.getvalue(), content_type=f'image/{ext}')
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    PROFILE_IMAGE_SETTINGS={**settings.PROFILE_IMAGE_SETTINGS, 'ASYNC': False},
+)
+class ProfileImagePipelineTestCase(TestCase):
+    """Verifica validación y generación de variantes tras el commit"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='avataruser',
+            email='avatar@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _upload(self, upload, client=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = (client or self.client).patch(
+                '/api/profile/', {'profile_image': upload}, format='multipart'
+            )
+        return resp
+
+    def test_variants_generated_after_upload(self):
+        """Se generan miniaturas JPEG y WebP para cada tamaño configurado"""
+        resp = self._upload(make_image())
+        self.assertEqual(resp.status_code, 200)
+        # Durante el request las variantes aún no existen
+        self.assertEqual(resp.data['profile_image_variants'], {})
+
+        self.user.refresh_from_db()
+        variants = self.user.profile_image_variants
+        self.assertEqual(set(variants), set(settings.PROFILE_IMAGE_SETTINGS['VARIANT_SIZES']))
+        for label, size in settings.PROFILE_IMAGE_SETTINGS['VARIANT_SIZES'].items():
+            self.assertEqual(set(variants[label]), {'jpg', 'webp'})
+            with default_storage.open(variants[label]['webp']) as fh:
+                img = Image.open(fh)
+                self.assertEqual(img.format, 'WEBP')
+                self.assertEqual(max(img.size), size)
+
+        me = self.client.get('/api/profile/')
+        self.assertTrue(me.data['profile_image_variants']['thumb']['webp'].startswith('http'))
+
+    def test_regenerated_variants_replace_files_in_place(self):
+        """Regenerar no borra antes de escribir: las rutas siguen sirviéndose"""
+        self._upload(make_image())
+        self.user.refresh_from_db()
+        name, variants = self.user.profile_image.name, self.user.profile_image_variants
+        default_storage.delete(variants['thumb']['webp'])
+
+        with patch.object(default_storage, 'delete', side_effect=AssertionError('delete')), \
+                patch.object(default_storage, 'save', side_effect=AssertionError('save')):
+            regenerated = generate_variants(name)
+        self.assertEqual(regenerated, variants)
+        for formats in regenerated.values():
+            for path in formats.values():
+                self.assertTrue(default_storage.exists(path))
+
+    def test_invalid_image_rejected(self):
+        """Un archivo que no es imagen se rechaza en la validación"""
+        fake = SimpleUploadedFile('avatar.png', b'no soy una imagen', content_type='image/png')
+        resp = self._upload(fake)
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('profile_image', resp.data)
+
+    def test_too_many_pixels_rejected(self):
+        """Las imágenes por encima de MAX_PIXELS se rechazan antes de decodificar"""
+        conf = {**settings.PROFILE_IMAGE_SETTINGS, 'ASYNC': False, 'MAX_PIXELS': 1000}
+        with self.settings(PROFILE_IMAGE_SETTINGS=conf):
+            resp = self._upload(make_image(size=(100, 100)))
+        self.assertEqual(resp.status_code, 400)
+
+    def test_remove_image_deletes_variants(self):
+        """remove_image=1 elimina la imagen y sus variantes"""
+        self._upload(make_image(image_format='JPEG'))
+        self.user.refresh_from_db()
+        paths = [p for formats in self.user.profile_image_variants.values() for p in formats.values()]
+        self.assertTrue(all(default_storage.exists(p) for p in paths))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.patch('/api/profile/', {'remove_image': '1'}, format='multipart')
+        self.assertEqual(resp.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.profile_image_variants, {})
+        self.assertFalse(any(default_storage.exists(p) for p in paths))
+
+    def test_identical_uploads_are_deduplicated(self):
+        """Dos usuarios con la misma imagen comparten un único archivo"""
+        other = User.objects.create_user(
+            username='otheravatar', email='other@example.com', password='testpass123'
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+
+        upload = make_image(image_format='JPEG')
+        digest = hashlib.sha256(upload.read()).hexdigest()
+        upload.seek(0)
+        self._upload(upload)
+        self._upload(make_image(image_format='JPEG'), client=other_client)
+
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.user.profile_image.name, f'profile_images/{digest}.jpeg')
+        self.assertEqual(other.profile_image.name, self.user.profile_image.name)
+        self.assertEqual(other.profile_image_variants, self.user.profile_image_variants)
+
+        resp = self.client.get('/media/' + self.user.profile_image.name)
+        self.assertIn('immutable', resp['Cache-Control'])
+
+    def test_shared_file_deleted_only_when_unreferenced(self):
+        """remove_image solo borra el archivo cuando ya nadie lo usa"""
+        other = User.objects.create_user(
+            username='otheravatar', email='other@example.com', password='testpass123'
+        )
+        other_client = APIClient()
+        other_client.force_authenticate(other)
+        self._upload(make_image(image_format='PNG'))
+        self._upload(make_image(image_format='PNG'), client=other_client)
+        self.user.refresh_from_db()
+        name = self.user.profile_image.name
+        variant = self.user.profile_image_variants['thumb']['webp']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch('/api/profile/', {'remove_image': '1'}, format='multipart')
+        self.assertTrue(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(variant))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other_client.patch('/api/profile/', {'remove_image': '1'}, format='multipart')
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(default_storage.exists(variant))
+
+    def test_release_restores_file_referenced_meanwhile(self):
+        """Si una subida idéntica se confirma durante la liberación, el archivo se conserva"""
+        self._upload(make_image(image_format='PNG'))
+        self.user.refresh_from_db()
+        name = self.user.profile_image.name
+
+        # 0 referencias al decidir, 1 al volver a comprobar con el archivo apartado
+        with patch('users.images.reference_count', side_effect=[0, 1]):
+            self.assertFalse(release_profile_image(name))
+        self.assertTrue(default_storage.exists(name))
+        self.assertFalse(any(f.startswith('.release-') for f in default_storage.listdir('profile_images')[1]))
+
+    def test_upload_stores_again_file_released_before_commit(self):
+        """Una subida que deduplicó contra un archivo liberado antes de su commit lo reescribe"""
+        self._upload(make_image(image_format='PNG'))
+        self.user.refresh_from_db()
+        name = self.user.profile_image.name
+        self.assertFalse(restore_profile_image(name, make_image(image_format='PNG')))
+
+        default_storage.delete(name)
+        with self.assertLogs('myinner_backend', 'WARNING'):
+            self.assertTrue(restore_profile_image(name, make_image(image_format='PNG')))
+        self.assertTrue(default_storage.exists(name))
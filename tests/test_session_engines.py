@@ -0,0 +1,59 @@
+"""
+Pruebas para los motores de sesión configurables
+"""
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+
+class SessionEngineTestCase(TestCase):
+    """Verifica login y lectura de sesión con cada motor soportado"""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(
+            username='sessionuser',
+            email='session@example.com',
+            password='testpass123'
+        )
+
+    def _login_and_fetch_me(self):
+        client = APIClient()
+        resp = client.post(
+            '/api/auth/login/',
+            {'username': 'sessionuser', 'password': 'testpass123'},
+            format='json'
+        )
+        self.assertEqual(resp.status_code, 200)
+        return client, client.get('/api/auth/me/')
+
+    def test_all_engines_keep_session(self):
+        """Todos los motores soportados mantienen la sesión entre requests"""
+        for name, engine in settings.SESSION_ENGINES.items():
+            with self.subTest(engine=name), override_settings(SESSION_ENGINE=engine):
+                _, me = self._login_and_fetch_me()
+                self.assertEqual(me.status_code, 200)
+                self.assertEqual(me.data['username'], 'sessionuser')
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_db_skips_session_query(self):
+        """Con cached_db la lectura de sesión no consulta django_session"""
+        client, _ = self._login_and_fetch_me()
+        with CaptureQueriesContext(connection) as ctx:
+            client.get('/api/auth/me/')
+        session_queries = [q for q in ctx.captured_queries if 'django_session' in q['sql']]
+        self.assertEqual(session_queries, [])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookies_logout(self):
+        """El logout con signed_cookies elimina la sesión del cliente"""
+        client, _ = self._login_and_fetch_me()
+        client.post('/api/auth/logout/', format='json')
+        me = client.get('/api/auth/me/')
+        self.assertIn(me.status_code, (401, 403))
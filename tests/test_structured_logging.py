@@ -0,0 +1,144 @@
+"""
+Tests del pipeline de logging sin bloqueo (myinner_backend/log.py)
+"""
+
+import gzip
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+
+from myinner_backend.log import (
+    CompressingRotatingFileHandler, CompressingTimedRotatingFileHandler,
+    JSONFormatter, QueuedHandler,
+)
+
+
+def make_record(msg='hola %s', args=('mundo',), **extra):
+    record = logging.LogRecord('auditlog', logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class JSONFormatterTests(SimpleTestCase):
+    def test_extra_fields_at_top_level(self):
+        line = JSONFormatter().format(make_record(event='login_failed', ip='10.0.0.1'))
+        data = json.loads(line)
+        self.assertEqual(data['message'], 'hola mundo')
+        self.assertEqual(data['level'], 'INFO')
+        self.assertEqual(data['logger'], 'auditlog')
+        self.assertEqual(data['event'], 'login_failed')
+        self.assertEqual(data['ip'], '10.0.0.1')
+        self.assertNotIn('args', data)
+
+    def test_exception_and_non_serializable_values(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            import sys
+            record = make_record(exc_info=sys.exc_info(), obj=object())
+        data = json.loads(JSONFormatter().format(record))
+        self.assertIn('ValueError: boom', data['exc_info'])
+        self.assertIn('object', data['obj'])
+
+
+class QueuedHandlerTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'sub', 'app.log')
+
+    def test_written_by_listener_thread(self):
+        handler = QueuedHandler({'class': 'logging.FileHandler', 'filename': self.path})
+        handler.setFormatter(JSONFormatter())
+        threads = []
+        original_emit = handler.target.emit
+        handler.target.emit = lambda record: (threads.append(threading.current_thread()), original_emit(record))
+        handler.handle(make_record(event='x'))
+        handler.close()
+        self.assertNotIn(threading.current_thread(), threads)
+        with open(self.path) as fh:
+            self.assertEqual(json.loads(fh.readline())['event'], 'x')
+
+    def test_message_fixed_at_enqueue(self):
+        handler = QueuedHandler({'class': 'logging.FileHandler', 'filename': self.path})
+        handler.listener.stop()
+        args = {'n': 1}
+        handler.handle(make_record('valor %(n)s', (args,)))
+        args['n'] = 2
+        self.assertEqual(handler.queue.get_nowait().getMessage(), 'valor 1')
+        handler.close()
+
+    def test_full_queue_drops_without_blocking(self):
+        handler = QueuedHandler({'class': 'logging.FileHandler', 'filename': self.path}, queue_size=1)
+        handler.listener.stop()
+        for _ in range(3):
+            handler.handle(make_record())
+        self.assertEqual(handler.dropped, 2)
+        handler.queue.get_nowait()
+        handler.handle(make_record())
+        warning = handler.queue.get_nowait()
+        self.assertIn('2 registros descartados', warning.getMessage())
+        self.assertRaises(queue.Empty, handler.queue.get_nowait)
+        handler.close()
+
+
+    def test_dropped_count_exact_across_threads(self):
+        handler = QueuedHandler({'class': 'logging.FileHandler', 'filename': self.path}, queue_size=1)
+        handler.listener.stop()
+        handler.queue.put_nowait(make_record())
+
+        def flood():
+            for _ in range(2000):
+                handler.enqueue(make_record())
+
+        threads = [threading.Thread(target=flood) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(handler.dropped, 8 * 2000)
+        handler.close()
+
+class CompressedRotationTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'app.log')
+
+    def _emit(self, handler, text):
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        handler.emit(make_record(text, None))
+
+    def test_size_rotation_gzips_backups(self):
+        handler = CompressingRotatingFileHandler(self.path, maxBytes=10, backupCount=2)
+        for text in ('primero-largo', 'segundo-largo', 'tercero-largo'):
+            self._emit(handler, text)
+        handler.close()
+        with gzip.open(self.path + '.1.gz', 'rt') as fh:
+            self.assertEqual(fh.read(), 'segundo-largo\n')
+        with gzip.open(self.path + '.2.gz', 'rt') as fh:
+            self.assertEqual(fh.read(), 'primero-largo\n')
+        self.assertFalse(os.path.exists(self.path + '.1'))
+
+    def test_time_rotation_gzips_backups(self):
+        handler = CompressingTimedRotatingFileHandler(self.path, when='S', backupCount=1)
+        self._emit(handler, 'antes')
+        handler.doRollover()
+        self._emit(handler, 'después')
+        handler.close()
+        rotated = [name for name in os.listdir(os.path.dirname(self.path)) if name.endswith('.gz')]
+        self.assertEqual(len(rotated), 1)
+        with gzip.open(os.path.join(os.path.dirname(self.path), rotated[0]), 'rt') as fh:
+            self.assertEqual(fh.read(), 'antes\n')
+
+    def test_uncompressed_when_disabled(self):
+        handler = CompressingRotatingFileHandler(self.path, maxBytes=5, backupCount=1, compress=False)
+        self._emit(handler, 'uno-uno')
+        self._emit(handler, 'dos-dos')
+        handler.close()
+        self.assertTrue(os.path.exists(self.path + '.1'))
@@ -0,0 +1,155 @@
+"""
+Pruebas para el throttling token bucket de la API
+"""
+import threading
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from users.throttling import LoginIPThrottle
+
+User = get_user_model()
+
+TEST_RATES = {
+    'anon': '1000/min',
+    'user': '1000/min',
+    'login': '3/min',
+    'login_identifier': '5/min',
+    'register': '2/hour',
+    'search': '2/min',
+}
+
+
+@override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': TEST_RATES})
+class ThrottlingTestCase(TestCase):
+    """Verifica límites por scope y que se rechaza antes del trabajo costoso"""
+
+    def setUp(self):
+        throttle_cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        throttle_cache.clear()
+        # Los buckets agotados no deben llegar a los tests de otros módulos
+        self.addCleanup(throttle_cache.clear)
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='throttled',
+            email='throttled@example.com',
+            password='testpass123'
+        )
+
+    def test_login_rejected_before_password_check(self):
+        """Superado el límite por IP, authenticate() ya no se ejecuta"""
+        payload = {'username': 'throttled', 'password': 'wrong'}
+        with patch('users.serializers.authenticate', return_value=None) as mock_auth:
+            for _ in range(3):
+                resp = self.client.post('/api/auth/login/', payload, format='json')
+                self.assertEqual(resp.status_code, 400)
+            resp = self.client.post('/api/auth/login/', payload, format='json')
+
+        self.assertEqual(resp.status_code, 429)
+        self.assertIn('Retry-After', resp)
+        self.assertEqual(mock_auth.call_count, 3)
+
+    def test_login_identifier_bucket_across_ips(self):
+        """El bucket por username limita ataques distribuidos entre IPs"""
+        payload = {'username': 'Throttled', 'password': 'wrong'}
+        for i in range(5):
+            resp = self.client.post(
+                '/api/auth/login/', payload, format='json', REMOTE_ADDR=f'10.0.0.{i}'
+            )
+            self.assertEqual(resp.status_code, 400)
+        resp = self.client.post(
+            '/api/auth/login/', payload, format='json', REMOTE_ADDR='10.0.0.99'
+        )
+        self.assertEqual(resp.status_code, 429)
+
+    def test_login_get_not_throttled(self):
+        """El ping GET de login no consume tokens"""
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/auth/login/').status_code, 200)
+
+    def test_register_throttled(self):
+        """Los registros por IP quedan limitados"""
+        for i in range(2):
+            resp = self.client.post('/api/auth/register/', {
+                'username': f'nuevo{i}',
+                'email': f'nuevo{i}@example.com',
+                'password': 'StrongPass123',
+                'password2': 'StrongPass123',
+            }, format='json')
+            self.assertEqual(resp.status_code, 201)
+        resp = self.client.post('/api/auth/register/', {}, format='json')
+        self.assertEqual(resp.status_code, 429)
+
+    def test_search_bucket_only_counts_queries(self):
+        """Solo las búsquedas con ?q= consumen el bucket de búsqueda"""
+        self.client.force_authenticate(self.user)
+        for _ in range(5):
+            self.assertEqual(self.client.get('/api/notes/').status_code, 200)
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/notes/?q=x').status_code, 200)
+        self.assertEqual(self.client.get('/api/notes/?q=x').status_code, 429)
+        self.assertEqual(self.client.get('/api/notes/').status_code, 200)
+
+    def test_spoofed_forwarded_for_does_not_pick_bucket(self):
+        """Sin proxies de confianza, X-Forwarded-For no cambia de bucket"""
+        with patch('users.serializers.authenticate', return_value=None) as mock_auth:
+            statuses = [
+                self.client.post('/api/auth/login/', {'username': f'u{i}', 'password': 'x'}, format='json',
+                                 HTTP_X_FORWARDED_FOR=f'198.51.100.{i}').status_code
+                for i in range(6)
+            ]
+        self.assertEqual(statuses, [400, 400, 400, 429, 429, 429])
+        self.assertEqual(mock_auth.call_count, 3)
+
+    @override_settings(AUDIT_IP_CAPTURE={**settings.AUDIT_IP_CAPTURE, 'PROXY_COUNT': 1})
+    def test_forwarded_for_from_trusted_proxy(self):
+        """Detrás de un proxy cuenta la dirección que añadió él, no lo que envió el cliente"""
+        def login(forwarded_for):
+            return self.client.post('/api/auth/login/', {'username': 'x', 'password': 'x'}, format='json',
+                                    REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=forwarded_for).status_code
+
+        with patch('users.serializers.authenticate', return_value=None):
+            spoofed = [login(f'1.1.1.{i}, 203.0.113.5') for i in range(4)]
+            other_client = login('203.0.113.6')
+        self.assertEqual(spoofed, [400, 400, 400, 429])
+        self.assertEqual(other_client, 400)
+
+    def test_concurrent_requests_do_not_overspend(self):
+        """Requests simultáneos contra el mismo bucket no gastan el mismo token"""
+        class SlowReads:
+            # Ensancha la ventana entre leer y reescribir el bucket
+            def __init__(self, cache):
+                self._cache = cache
+
+            def get(self, *args, **kwargs):
+                value = self._cache.get(*args, **kwargs)
+                time.sleep(0.005)
+                return value
+
+            def __getattr__(self, name):
+                return getattr(self._cache, name)
+
+        class SlowThrottle(LoginIPThrottle):
+            @property
+            def cache(self):
+                return SlowReads(caches[self.cache_alias])
+
+        request = RequestFactory().post('/api/auth/login/', REMOTE_ADDR='192.0.2.1')
+        barrier = threading.Barrier(10)
+        allowed = []
+
+        def attempt():
+            barrier.wait()
+            allowed.append(SlowThrottle().allow_request(request, None))
+
+        threads = [threading.Thread(target=attempt) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 3)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, UserPreference
+from .models import CustomUser, QuarantinedCiphertext, UserPreference
 
 
 @admin.register(CustomUser)
@@ -17,4 +17,16 @@ class UserPreferenceAdmin(admin.ModelAdmin):
 	list_display = ('user', 'theme', 'primary_color')
 	list_filter = ('theme', 'primary_color')
 
+
+@admin.register(QuarantinedCiphertext)
+class QuarantinedCiphertextAdmin(admin.ModelAdmin):
+	list_display = ('model_label', 'object_pk', 'field_name', 'reason', 'detected_at')
+	list_filter = ('model_label', 'field_name')
+	search_fields = ('object_pk',)
+	readonly_fields = ('model_label', 'object_pk', 'field_name', 'reason', 'detected_at')
+	exclude = ('ciphertext',)
+
+	def has_add_permission(self, request):
+		return False
+
 # Register your models here.
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        from .envelope import forget_data_key
+        from .models import UserDataKey
+
+        # Borrar la cuenta (cascada) también destruye la clave de datos:
+        # descartarla de la caché del proceso
+        post_delete.connect(forget_data_key, sender=UserDataKey,
+                            dispatch_uid='users.forget_data_key')
@@ -0,0 +1,202 @@
+"""
+Utilidades para operaciones masivas sobre campos encriptados
+
+Compartidas por los comandos de mantenimiento (rotación de claves, escaneo
+de integridad): descubrimiento de columnas encriptadas, lectura del texto
+cifrado sin pasar por from_db_value, particionado por clave primaria
+(keyset) y ejecución de lotes en un pool de hilos.
+"""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from cryptography.fernet import Fernet
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from encrypted_model_fields.fields import EncryptedMixin
+
+
+def configured_keys():
+    """Claves de FIELD_ENCRYPTION_KEY como lista, la primaria primero"""
+    keys = settings.FIELD_ENCRYPTION_KEY
+    return list(keys) if isinstance(keys, (list, tuple)) else [keys]
+
+
+def get_fernets():
+    """Instancias Fernet de cada clave configurada, la primaria primero"""
+    return [Fernet(key) for key in configured_keys()]
+
+
+def key_fingerprint(key):
+    """Identificador corto y no reversible de una clave"""
+    if isinstance(key, str):
+        key = key.encode()
+    return hashlib.sha256(key).hexdigest()[:16]
+
+
+def encrypted_models(labels=None):
+    """
+    Lista de (modelo, [campos encriptados]) de los modelos instalados.
+    `labels` restringe a etiquetas 'app_label.Model' (sin distinguir mayúsculas).
+    """
+    wanted = {label.lower() for label in labels} if labels else None
+    result = []
+    for model in apps.get_models():
+        if model._meta.proxy or not model._meta.managed:
+            continue
+        if wanted is not None and model._meta.label_lower not in wanted:
+            continue
+        fields = [
+            f for f in model._meta.concrete_fields
+            if isinstance(f, EncryptedMixin)
+        ]
+        if fields:
+            result.append((model, fields))
+    return result
+
+
+def id_batches(model, batch_size, after=None):
+    """
+    Genera rangos (inicio_exclusivo, fin_inclusivo) de claves primarias con
+    como mucho `batch_size` filas cada uno, recorriendo el índice de la PK
+    (keyset) sin cargar las filas
+    """
+    pk_name = model._meta.pk.attname
+    queryset = model._base_manager.order_by(pk_name).values_list(pk_name, flat=True)
+    lower = after
+    while True:
+        page = queryset.filter(**{f'{pk_name}__gt': lower}) if lower is not None else queryset
+        upper = list(page[batch_size - 1:batch_size])
+        if upper:
+            yield lower, upper[0]
+            lower = upper[0]
+            continue
+        last = list(page.reverse()[:1])
+        if last:
+            yield lower, last[0]
+        return
+
+
+def fetch_raw(model, fields, lower=None, upper=None, using='default', pks=None):
+    """
+    Lee (pk, valor_cifrado...) de las filas con lower < pk <= upper (o de
+    las de `pks`) directamente con SQL, sin desencriptar
+    """
+    conn = connections[using]
+    quote = conn.ops.quote_name
+    pk_column = model._meta.pk.column
+    columns = ', '.join(quote(f.column) for f in fields)
+    sql = f"SELECT {quote(pk_column)}, {columns} FROM {quote(model._meta.db_table)} WHERE "
+    params = []
+    if pks is not None:
+        sql += f"{quote(pk_column)} IN ({', '.join(['%s'] * len(pks))})"
+        params.extend(pks)
+    else:
+        if lower is not None:
+            sql += f"{quote(pk_column)} > %s AND "
+            params.append(lower)
+        sql += f"{quote(pk_column)} <= %s"
+        params.append(upper)
+    sql += f" ORDER BY {quote(pk_column)}"
+    with conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+# Intentos de write_raw por fila antes de darla por editada en paralelo
+WRITE_ATTEMPTS = 3
+
+
+def _db_value(value):
+    return bytes(value) if isinstance(value, memoryview) else value
+
+
+def write_raw(model, fields, rows, using='default'):
+    """
+    Escribe valores ya cifrados: rows = [(pk, valores_leídos, valores_nuevos)].
+    Devuelve las pk que no se escribieron.
+
+    Cada UPDATE solo se aplica si la fila conserva los valores leídos: si la
+    aplicación la editó entre fetch_raw y el UPDATE, se omite (y el llamador
+    la vuelve a leer) en lugar de pisar la edición con el valor antiguo.
+
+    UPDATE directo: sin señales (ni auditlog) y sin pasar por
+    get_db_prep_save, que volvería a cifrar el valor.
+    """
+    conn = connections[using]
+    quote = conn.ops.quote_name
+    assignments = ', '.join(f"{quote(f.column)} = %s" for f in fields)
+    prefix = f"UPDATE {quote(model._meta.db_table)} SET {assignments} WHERE {quote(model._meta.pk.column)} = %s"
+    missed = []
+    with conn.cursor() as cursor:
+        for pk, old_values, new_values in rows:
+            sql = prefix
+            params = [*map(_db_value, new_values), pk]
+            for field, value in zip(fields, old_values):
+                if value is None:
+                    sql += f" AND {quote(field.column)} IS NULL"
+                else:
+                    sql += f" AND {quote(field.column)} = %s"
+                    params.append(_db_value(value))
+            cursor.execute(sql, params)
+            if cursor.rowcount != 1:
+                missed.append(pk)
+    return missed
+
+
+def _in_worker(func, *args):
+    # Cada hilo abre sus propias conexiones: cerrarlas al terminar el lote
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def run_batches(batches, func, workers=1, on_done=None):
+    """
+    Ejecuta func(lower, upper) para cada rango de `batches`.
+
+    Con workers > 1 usa un pool de hilos con como mucho 2 * workers lotes en
+    vuelo (memoria acotada). on_done(lower, upper, resultado, frontera) se
+    llama en el hilo principal al terminar cada lote; `frontera` es el mayor
+    `upper` tal que todos los lotes anteriores ya terminaron, apto como
+    checkpoint aunque los lotes terminen fuera de orden.
+    """
+    if workers <= 1:
+        for lower, upper in batches:
+            result = func(lower, upper)
+            if on_done:
+                on_done(lower, upper, result, upper)
+        return
+
+    order = []          # rangos en orden de envío
+    finished = set()    # índices terminados
+    frontier_index = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='encryption-batch') as pool:
+        pending = {}
+        batch_iter = iter(batches)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * 2:
+                try:
+                    lower, upper = next(batch_iter)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[pool.submit(_in_worker, func, lower, upper)] = len(order)
+                order.append((lower, upper))
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                result = future.result()
+                finished.add(index)
+                while frontier_index in finished:
+                    finished.discard(frontier_index)
+                    frontier_index += 1
+                if on_done:
+                    lower, upper = order[index]
+                    frontier = order[frontier_index - 1][1] if frontier_index else None
+                    on_done(lower, upper, result, frontier)
@@ -0,0 +1,259 @@
+"""
+Encriptación de sobre (envelope) por usuario
+
+Cada usuario tiene una clave de datos propia (UserDataKey) guardada cifrada
+con la clave maestra FIELD_ENCRYPTION_KEY. Los campos de tipo envelope
+(users.fields.EnvelopeEncryptedTextField) cifran con la clave de datos de su
+propietario:
+
+- Rotar la clave maestra solo re-cifra una clave pequeña por usuario
+  (rotate_encryption_key), no cada nota.
+- Borrar la UserDataKey deja ilegibles al instante todos los datos del
+  usuario, también en réplicas y respaldos (crypto-shredding). Para que sea
+  cierto, auditlog registra estos campos con mask_callable=redact: el diff
+  de un LogEntry (y lo que se archiva o exporta a partir de él) nunca lleva
+  el texto en claro. La migración notes 0008 limpia los LogEntry anteriores;
+  los archivos NDJSON de audit/archive.py generados antes no se reescriben
+  y hay que regenerarlos o borrarlos.
+
+Las claves desenvueltas se cachean en memoria del proceso con LRU + TTL.
+
+Formatos de valor cifrado con la clave de datos:
+- 'env1:' + token Fernet (texto)
+- AEAD binario: MAGIC | versión | algoritmo | nonce (12) | cifrado + tag (16).
+  La clave AEAD se deriva de la clave de datos con HKDF y la cabecera va como
+  datos asociados: 31 bytes de overhead frente a ~57 + 33% de Fernet en base64.
+"""
+
+import base64
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+# Lo que auditlog guarda en lugar del valor de un campo envelope
+REDACTED = '[cifrado]'
+
+# Prefijo de los valores cifrados con una clave de datos. Los valores sin
+# prefijo son tokens Fernet de la clave maestra (formato anterior).
+ENVELOPE_PREFIX = 'env1:'
+
+AEAD_MAGIC = b'\xae'
+AEAD_VERSION = 1
+AEAD_NONCE_SIZE = 12
+# id de cabecera -> (nombre en settings, clase de cryptography)
+AEAD_ALGORITHMS = {
+    1: ('aes-gcm', AESGCM),
+    2: ('chacha20-poly1305', ChaCha20Poly1305),
+}
+AEAD_IDS = {name: alg_id for alg_id, (name, _) in AEAD_ALGORITHMS.items()}
+
+DEFAULT_SETTINGS = {
+    'KEY_CACHE_SIZE': 1024,
+    'KEY_CACHE_TTL': 300,
+    'AEAD_ALGORITHM': 'aes-gcm',
+}
+
+
+def envelope_settings():
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'ENVELOPE_ENCRYPTION', {})}
+
+
+class DataKey:
+    """Clave de datos desenvuelta: Fernet y cifradores AEAD derivados"""
+
+    def __init__(self, key):
+        self.fernet = Fernet(key)
+        self._material = base64.urlsafe_b64decode(key)
+        self._aead = {}
+
+    def aead(self, alg_id):
+        cipher = self._aead.get(alg_id)
+        if cipher is None:
+            name, cls = AEAD_ALGORITHMS[alg_id]
+            derived = HKDF(
+                algorithm=hashes.SHA256(), length=32, salt=None,
+                info=f'myinner-aead-v{AEAD_VERSION}:{name}'.encode(),
+            ).derive(self._material)
+            cipher = self._aead[alg_id] = cls(derived)
+        return cipher
+
+
+class DataKeyCache:
+    """LRU con expiración para claves de datos desenvueltas (thread-safe)"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, owner_id):
+        with self._lock:
+            entry = self._data.get(owner_id)
+            if entry is None:
+                return None
+            fernet, expires = entry
+            if expires < time.monotonic():
+                del self._data[owner_id]
+                return None
+            self._data.move_to_end(owner_id)
+            return fernet
+
+    def set(self, owner_id, fernet):
+        with self._lock:
+            self._data[owner_id] = (fernet, time.monotonic() + self.ttl)
+            self._data.move_to_end(owner_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, owner_id):
+        with self._lock:
+            self._data.pop(owner_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_key_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                conf = envelope_settings()
+                _cache = DataKeyCache(conf['KEY_CACHE_SIZE'], conf['KEY_CACHE_TTL'])
+    return _cache
+
+
+def get_data_key(owner_id, create=False):
+    """
+    DataKey del usuario `owner_id`.
+    Devuelve None si no existe (o fue destruida) y create=False.
+    """
+    from .models import UserDataKey
+
+    if owner_id is None:
+        return None
+    cache = get_key_cache()
+    data_key = cache.get(owner_id)
+    if data_key is not None:
+        return data_key
+
+    if create:
+        record, _ = UserDataKey.objects.get_or_create(
+            user_id=owner_id, defaults={'key': Fernet.generate_key().decode()}
+        )
+    else:
+        record = UserDataKey.objects.filter(user_id=owner_id).first()
+        if record is None:
+            return None
+    data_key = DataKey(record.key)
+    # Cachear solo lo confirmado: una clave creada en una transacción que
+    # luego se revierte no debe seguir cifrando datos desde la caché
+    transaction.on_commit(partial(cache.set, owner_id, data_key))
+    return data_key
+
+
+def is_aead_token(value):
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    return isinstance(value, bytes) and value.startswith(AEAD_MAGIC)
+
+
+def is_envelope_token(value):
+    """True si el valor está cifrado con una clave de datos (cualquier formato)"""
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if isinstance(value, bytes):
+        return value.startswith(AEAD_MAGIC) or value.startswith(ENVELOPE_PREFIX.encode())
+    return isinstance(value, str) and value.startswith(ENVELOPE_PREFIX)
+
+
+def encrypt_for_owner(plaintext, owner_id):
+    data_key = get_data_key(owner_id, create=True)
+    return ENVELOPE_PREFIX + data_key.fernet.encrypt(plaintext.encode('utf-8')).decode('utf-8')
+
+
+def decrypt_for_owner(token, owner_id):
+    """Lanza InvalidToken si la clave no existe o no corresponde"""
+    data_key = get_data_key(owner_id)
+    if data_key is None:
+        raise InvalidToken
+    if isinstance(token, bytes):
+        token = token.decode('utf-8')
+    return data_key.fernet.decrypt(token[len(ENVELOPE_PREFIX):].encode('utf-8')).decode('utf-8')
+
+
+def aead_algorithm_id():
+    name = envelope_settings()['AEAD_ALGORITHM']
+    try:
+        return AEAD_IDS[name]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"ENVELOPE_AEAD_ALGORITHM desconocido: {name!r} (opciones: {', '.join(AEAD_IDS)})"
+        )
+
+
+def encrypt_aead(plaintext, owner_id):
+    """Cifra en formato AEAD binario con la clave de datos del propietario"""
+    alg_id = aead_algorithm_id()
+    data_key = get_data_key(owner_id, create=True)
+    header = AEAD_MAGIC + bytes((AEAD_VERSION, alg_id))
+    nonce = os.urandom(AEAD_NONCE_SIZE)
+    return header + nonce + data_key.aead(alg_id).encrypt(nonce, plaintext.encode('utf-8'), header)
+
+
+def decrypt_aead(blob, owner_id):
+    """Lanza InvalidToken si la cabecera, la clave o el tag no son válidos"""
+    if isinstance(blob, memoryview):
+        blob = blob.tobytes()
+    header, nonce, ciphertext = blob[:3], blob[3:3 + AEAD_NONCE_SIZE], blob[3 + AEAD_NONCE_SIZE:]
+    if len(header) < 3 or header[:1] != AEAD_MAGIC or header[1] != AEAD_VERSION:
+        raise InvalidToken
+    alg_id = header[2]
+    if alg_id not in AEAD_ALGORITHMS:
+        raise InvalidToken
+    data_key = get_data_key(owner_id)
+    if data_key is None:
+        raise InvalidToken
+    try:
+        return data_key.aead(alg_id).decrypt(nonce, ciphertext, header).decode('utf-8')
+    except InvalidTag:
+        raise InvalidToken
+
+
+def redact(value):
+    """mask_callable de auditlog para campos envelope: el diff no guarda el valor"""
+    return REDACTED
+
+
+def shred_data_key(owner_id):
+    """
+    Destruye la clave de datos del usuario: todo lo cifrado con ella queda
+    ilegible. Otros procesos pueden conservarla en caché hasta KEY_CACHE_TTL.
+    """
+    from .models import UserDataKey
+
+    deleted, _ = UserDataKey.objects.filter(user_id=owner_id).delete()
+    get_key_cache().discard(owner_id)
+    return bool(deleted)
+
+
+def forget_data_key(sender, instance, **kwargs):
+    """Receptor post_delete de UserDataKey"""
+    get_key_cache().discard(instance.user_id)
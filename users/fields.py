@@ -0,0 +1,302 @@
+"""
+Campos encriptados con desencriptado perezoso
+
+Los campos de encrypted_model_fields desencriptan en from_db_value cada fila
+cargada, aunque el código nunca lea el valor (listados del admin, __str__,
+borrados en cascada, filtros por tag). Las variantes Lazy* guardan el texto
+cifrado al cargar la fila y solo lo desencriptan en el primer acceso al
+atributo; el resultado queda memorizado en la instancia.
+
+- En instancias de modelo el atributo devuelve siempre el valor plano:
+  la laziness es invisible para serializers, formularios y auditlog.
+- En values()/values_list() se devuelve un LazyDecryptedValue, que se
+  comporta como str (igualdad, orden, hash, len, métodos) y se serializa con
+  force_str / los encoders JSON de Django y DRF.
+- Guardar una instancia sin haber leído el campo reescribe el texto cifrado
+  tal cual, sin desencriptar ni volver a cifrar (en modelos registrados en
+  auditlog el diff de cambios sí lee el campo).
+"""
+
+import base64
+
+from cryptography.fernet import InvalidToken
+from django import forms
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+from django.utils.functional import Promise
+from encrypted_model_fields import fields as encrypted_fields
+
+from . import envelope
+
+_UNRESOLVED = object()
+
+
+class LazyDecryptedValue(Promise):
+    """Texto cifrado que se desencripta (una sola vez) al usarse como str"""
+
+    __slots__ = ('token', '_field', '_value')
+
+    def __init__(self, token, field):
+        self.token = token
+        self._field = field
+        self._value = _UNRESOLVED
+
+    @property
+    def is_resolved(self):
+        return self._value is not _UNRESOLVED
+
+    def resolve(self):
+        if self._value is _UNRESOLVED:
+            self._value = self._field.decrypt_token(self.token)
+        return self._value
+
+    def __str__(self):
+        return str(self.resolve())
+
+    def __repr__(self):
+        state = repr(self._value) if self.is_resolved else 'sin desencriptar'
+        return f'<LazyDecryptedValue {state}>'
+
+    def __eq__(self, other):
+        return self.resolve() == _resolved(other)
+
+    # Orden de str: sorted() y min()/max() sobre values_list()
+    def __lt__(self, other):
+        return self.resolve() < _resolved(other)
+
+    def __le__(self, other):
+        return self.resolve() <= _resolved(other)
+
+    def __gt__(self, other):
+        return self.resolve() > _resolved(other)
+
+    def __ge__(self, other):
+        return self.resolve() >= _resolved(other)
+
+    def __hash__(self):
+        return hash(self.resolve())
+
+    def __len__(self):
+        return len(self.resolve())
+
+    def __bool__(self):
+        return bool(self.resolve())
+
+    def __contains__(self, item):
+        return item in self.resolve()
+
+    def __getattr__(self, name):
+        # Solo métodos de str (lower, startswith, ...): sondeos como
+        # hasattr(value, 'resolve_expression') no deben desencriptar
+        if not hasattr(str, name):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def _proxy____cast(self):
+        # Field.get_prep_value convierte así los Promise
+        return self.resolve()
+
+    def __reduce__(self):
+        return str, (str(self),)
+
+
+def _resolved(value):
+    return value.resolve() if isinstance(value, LazyDecryptedValue) else value
+
+
+class LazyDecryptAttribute(DeferredAttribute):
+    """
+    Descriptor que sustituye el LazyDecryptedValue por el valor plano en el
+    primer acceso. Es un descriptor de datos (__set__) para que la lectura
+    pase siempre por aquí aunque el valor esté en instance.__dict__.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, LazyDecryptedValue):
+            value = instance.__dict__[self.field.attname] = self.field.resolve_for(value, instance)
+        return value
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.field.attname] = value
+
+
+class LazyEncryptedMixin(encrypted_fields.EncryptedMixin):
+    descriptor_class = LazyDecryptAttribute
+
+    def decrypt_token(self, token):
+        """Mismo resultado que EncryptedMixin.to_python sobre el texto cifrado"""
+        if isinstance(token, bytes):
+            token = token.decode('utf-8')
+        try:
+            value = encrypted_fields.decrypt_str(token)
+        except InvalidToken:
+            value = token
+        return super(encrypted_fields.EncryptedMixin, self).to_python(value)
+
+    def resolve_for(self, value, instance):
+        """Valor plano de `value` leído desde el atributo de `instance`"""
+        return value.resolve()
+
+    def from_db_value(self, value, *args, **kwargs):
+        if value is None:
+            return value
+        return LazyDecryptedValue(value, self)
+
+    def to_python(self, value):
+        if isinstance(value, LazyDecryptedValue):
+            return value.resolve()
+        return super().to_python(value)
+
+    def pre_save(self, model_instance, add):
+        # Sin pasar por el descriptor: un valor aún cifrado se guarda tal cual
+        value = model_instance.__dict__.get(self.attname)
+        if isinstance(value, LazyDecryptedValue):
+            return value
+        return super().pre_save(model_instance, add)
+
+    def get_db_prep_save(self, value, connection):
+        if isinstance(value, LazyDecryptedValue) and not value.is_resolved:
+            token = value.token
+            return token.decode('utf-8') if isinstance(token, bytes) else token
+        return super().get_db_prep_save(value, connection)
+
+
+class LazyEncryptedCharField(LazyEncryptedMixin, models.CharField):
+    pass
+
+
+class LazyEncryptedTextField(LazyEncryptedMixin, models.TextField):
+    pass
+
+
+class LazyEncryptedEmailField(LazyEncryptedMixin, models.EmailField):
+    pass
+
+
+class EnvelopeMixin(LazyEncryptedMixin):
+    """
+    Cifrado con la clave de datos del propietario de la fila
+    (users/envelope.py), identificado por la FK `owner_field`.
+
+    Lee también valores en formatos anteriores (clave maestra, env1). En
+    values()/values_list() no hay instancia ni propietario: los valores
+    envelope se devuelven cifrados.
+    """
+
+    def __init__(self, *args, owner_field='user', **kwargs):
+        self.owner_field = owner_field
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.owner_field != 'user':
+            kwargs['owner_field'] = self.owner_field
+        return name, path, args, kwargs
+
+    def owner_id(self, instance):
+        return getattr(instance, self.model._meta.get_field(self.owner_field).attname)
+
+    def encrypt_for(self, plaintext, owner_id):
+        """Valor a guardar en la BD en el formato actual del campo"""
+        return envelope.encrypt_for_owner(plaintext, owner_id)
+
+    def is_current_format(self, raw):
+        return envelope.is_envelope_token(raw) and not envelope.is_aead_token(raw)
+
+    def decrypt_strict(self, token, owner_id):
+        """Texto plano de cualquier formato soportado; InvalidToken si no se puede"""
+        if isinstance(token, memoryview):
+            token = token.tobytes()
+        if envelope.is_aead_token(token):
+            return envelope.decrypt_aead(token, owner_id)
+        if isinstance(token, bytes):
+            token = token.decode('utf-8')
+        if envelope.is_envelope_token(token):
+            return envelope.decrypt_for_owner(token, owner_id)
+        return encrypted_fields.decrypt_str(token)
+
+    def decrypt_token(self, token, owner_id=None):
+        try:
+            return self.decrypt_strict(token, owner_id)
+        except (InvalidToken, UnicodeDecodeError):
+            # Igual que encrypted_model_fields: un valor ilegible se devuelve cifrado
+            return self.undecryptable(token)
+
+    def undecryptable(self, token):
+        if isinstance(token, bytes):
+            return token.decode('utf-8')
+        return token
+
+    def resolve_for(self, value, instance):
+        return self.decrypt_token(value.token, self.owner_id(instance))
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if value is None or isinstance(value, LazyDecryptedValue):
+            return value
+        # Cifrar aquí, donde se conoce al propietario; get_db_prep_save
+        # recibe el token ya cifrado y lo escribe tal cual
+        token = self.encrypt_for(str(value), self.owner_id(model_instance))
+        return LazyDecryptedValue(token, self)
+
+
+class EnvelopeEncryptedTextField(EnvelopeMixin, models.TextField):
+    """Token Fernet de la clave de datos como texto (`env1:...`)"""
+
+
+class EnvelopeEncryptedBinaryField(EnvelopeMixin, models.BinaryField):
+    """
+    Formato AEAD binario (AES-256-GCM o ChaCha20-Poly1305) con cabecera
+    versionada, guardado como bytes: sin base64 ni HMAC aparte. Ver
+    envelope.encrypt_aead. Para formularios y serializers se comporta como
+    un campo de texto.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def get_internal_type(self):
+        return 'BinaryField'
+
+    def encrypt_for(self, plaintext, owner_id):
+        return envelope.encrypt_aead(plaintext, owner_id)
+
+    def is_current_format(self, raw):
+        return envelope.is_aead_token(raw)
+
+    def undecryptable(self, token):
+        if isinstance(token, memoryview):
+            token = token.tobytes()
+        if isinstance(token, bytes):
+            return base64.b64encode(token).decode('ascii')
+        return token
+
+    def to_python(self, value):
+        if isinstance(value, LazyDecryptedValue):
+            return value.resolve()
+        if isinstance(value, (bytes, memoryview)):
+            return self.decrypt_token(value)
+        # Texto plano (formularios, serializers): BinaryField lo trataría como base64
+        return value
+
+    def get_db_prep_save(self, value, connection):
+        if isinstance(value, LazyDecryptedValue) and not value.is_resolved:
+            token = value.token
+            if isinstance(token, str):
+                token = token.encode('utf-8')
+            return connection.Database.Binary(token)
+        if value is None:
+            return None
+        # Sin instancia no hay propietario (p. ej. QuerySet.update): formato
+        # de clave maestra, legible y convertible con migrate_envelope_encryption
+        return connection.Database.Binary(encrypted_fields.encrypt_str(str(self.to_python(value))))
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{'widget': forms.Textarea, **kwargs})
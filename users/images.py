@@ -0,0 +1,267 @@
+"""
+Procesamiento de imágenes de perfil
+
+Valida y decodifica las subidas con Pillow dentro del request (barato: solo
+cabecera + verify) y genera las variantes redimensionadas (JPEG + WebP) en un
+pool de hilos fuera del request, una vez confirmada la transacción.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .storage import atomic_write, get_profile_image_storage, is_content_addressed, reference_count
+
+logger = logging.getLogger('myinner_backend')
+
+DEFAULT_SETTINGS = {
+    'ASYNC': True,
+    'WORKERS': 2,
+    'MAX_UPLOAD_MB': 5,
+    'MAX_PIXELS': 25_000_000,
+    'ALLOWED_FORMATS': ['JPEG', 'PNG', 'WEBP', 'GIF'],
+    'VARIANT_SIZES': {'thumb': 64, 'small': 128, 'medium': 256},
+    'VARIANTS_DIR': 'profile_images/variants',
+    'JPEG_QUALITY': 85,
+    'WEBP_QUALITY': 80,
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def image_settings():
+    """Configuración efectiva (settings.PROFILE_IMAGE_SETTINGS sobre los valores por defecto)"""
+    return {**DEFAULT_SETTINGS, **getattr(settings, 'PROFILE_IMAGE_SETTINGS', {})}
+
+
+def get_executor():
+    """Pool de hilos compartido, creado bajo demanda"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=image_settings()['WORKERS'],
+                    thread_name_prefix='profile-images',
+                )
+    return _executor
+
+
+def validate_profile_image(upload):
+    """
+    Valida tamaño, formato y dimensiones de una imagen subida sin
+    decodificar los píxeles completos. Lanza ValidationError si no es válida.
+    """
+    conf = image_settings()
+
+    max_bytes = conf['MAX_UPLOAD_MB'] * 1024 * 1024
+    if upload.size > max_bytes:
+        raise ValidationError(f"La imagen no puede superar {conf['MAX_UPLOAD_MB']} MB")
+
+    try:
+        upload.seek(0)
+        with Image.open(upload) as img:
+            image_format = img.format
+            width, height = img.size
+            img.verify()
+    except Image.DecompressionBombError:
+        raise ValidationError('La imagen tiene demasiados píxeles')
+    except Exception:
+        raise ValidationError('El archivo no es una imagen válida')
+    finally:
+        upload.seek(0)
+
+    if image_format not in conf['ALLOWED_FORMATS']:
+        raise ValidationError(
+            f"Formato no soportado. Usa: {', '.join(conf['ALLOWED_FORMATS'])}"
+        )
+    if width * height > conf['MAX_PIXELS']:
+        raise ValidationError('La imagen tiene demasiados píxeles')
+
+    return upload
+
+
+def _encode(img, image_format, quality):
+    buffer = BytesIO()
+    if image_format == 'JPEG' and img.mode != 'RGB':
+        # JPEG no admite transparencia: aplanar sobre fondo blanco
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel('A') if img.mode == 'RGBA' else None)
+        img = background
+    img.save(buffer, image_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def variant_paths(name):
+    """Rutas deterministas {etiqueta: {'webp': ruta, 'jpg': ruta}} de las variantes de `name`"""
+    conf = image_settings()
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return {
+        label: {ext: f"{conf['VARIANTS_DIR']}/{stem}_{label}.{ext}" for ext in ('webp', 'jpg')}
+        for label in conf['VARIANT_SIZES']
+    }
+
+
+def _store_variant(path, data):
+    """
+    Guarda una variante en su ruta determinista sustituyendo la anterior de
+    forma atómica: nunca hay un momento sin archivo para un request
+    concurrente, y dos procesos de la misma imagen escriben el mismo nombre
+    sin pisarse a medias
+    """
+    try:
+        full_path = default_storage.path(path)
+    except NotImplementedError:
+        # Storage remoto sin rename: si ya existe, con nombres direccionados
+        # por contenido es esta misma variante
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(data))
+        return path
+    atomic_write(full_path, [data], default_storage.file_permissions_mode)
+    return path
+
+
+def generate_variants(name):
+    """
+    Genera las variantes de una imagen ya almacenada.
+
+    Devuelve {etiqueta: {'jpg': ruta, 'webp': ruta}} con rutas relativas al
+    storage por defecto.
+    """
+    conf = image_settings()
+    sizes = conf['VARIANT_SIZES']
+
+    paths = variant_paths(name)
+    # Con nombres direccionados por contenido las variantes existentes ya
+    # corresponden a esta imagen: reutilizarlas sin decodificar nada
+    if is_content_addressed(name) and all(
+        default_storage.exists(path) for formats in paths.values() for path in formats.values()
+    ):
+        return paths
+
+    with get_profile_image_storage().open(name, 'rb') as fh:
+        img = Image.open(fh)
+        # En JPEG, draft() decodifica directamente a escala reducida
+        img.draft('RGB', (max(sizes.values()),) * 2)
+        img = ImageOps.exif_transpose(img)
+        img.load()
+
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+
+    variants = {}
+    # De mayor a menor: cada miniatura se reduce desde la anterior
+    source = img
+    for label, size in sorted(sizes.items(), key=lambda item: -item[1]):
+        thumb = source.copy()
+        thumb.thumbnail((size, size), Image.LANCZOS)
+        source = thumb
+
+        variants[label] = {}
+        for image_format, ext, quality in (
+            ('WEBP', 'webp', conf['WEBP_QUALITY']),
+            ('JPEG', 'jpg', conf['JPEG_QUALITY']),
+        ):
+            variants[label][ext] = _store_variant(paths[label][ext], _encode(thumb, image_format, quality))
+
+    return variants
+
+
+def delete_variants(variants):
+    """Elimina del storage los archivos de un dict de variantes"""
+    for formats in (variants or {}).values():
+        for path in formats.values():
+            try:
+                default_storage.delete(path)
+            except Exception:
+                logger.warning(f"Could not delete profile image variant {path}")
+
+
+def release_profile_image(name, variants=None):
+    """
+    Libera una imagen que un usuario dejó de usar: el archivo y sus variantes
+    solo se eliminan si ningún otro usuario la referencia
+    """
+    if not name or reference_count(name):
+        return False
+    # Segunda comprobación con el archivo apartado: una subida idéntica
+    # pudo deduplicar contra él y confirmarse después de la primera
+    if not get_profile_image_storage().delete_unreferenced(name, lambda: reference_count(name) > 0):
+        return False
+    # Variantes guardadas más las deterministas (pueden no estar persistidas aún)
+    delete_variants(variants)
+    delete_variants(variant_paths(name))
+    return True
+
+
+def restore_profile_image(name, upload):
+    """
+    Tras el commit de una subida: si una liberación concurrente borró el
+    archivo entre la deduplicación de _save y el commit, lo vuelve a escribir
+    desde la subida (mismo contenido, mismo nombre)
+    """
+    storage = get_profile_image_storage()
+    if not name or storage.exists(name):
+        return False
+    try:
+        storage.save(name, upload)
+    except (OSError, ValueError):
+        logger.exception(f"Could not store again released profile image {name}")
+        return False
+    logger.warning(f"Profile image {name} was released during the upload; stored again")
+    return True
+
+
+def process_profile_image(user_id, name):
+    """
+    Genera y persiste las variantes de la imagen `name` del usuario.
+    Si el usuario cambió de imagen mientras tanto, descarta el resultado.
+    """
+    from .models import CustomUser
+
+    try:
+        variants = generate_variants(name)
+        # update() evita señales/auditoría y solo aplica si la imagen sigue vigente
+        updated = CustomUser.objects.filter(pk=user_id, profile_image=name).update(
+            profile_image_variants=variants
+        )
+        if not updated and not reference_count(name):
+            delete_variants(variants)
+        return variants
+    except Exception:
+        logger.exception(f"Profile image processing failed for user {user_id} ({name})")
+        return None
+
+
+def _process_in_worker(user_id, name):
+    # Cada hilo del pool abre sus propias conexiones: cerrarlas al terminar
+    try:
+        return process_profile_image(user_id, name)
+    finally:
+        connections.close_all()
+
+
+def schedule_profile_image_processing(user):
+    """
+    Programa la generación de variantes tras el commit de la transacción
+    actual, en el pool de hilos (o en línea si ASYNC=False)
+    """
+    user_id, name = user.pk, user.profile_image.name
+
+    def _submit():
+        if image_settings()['ASYNC']:
+            get_executor().submit(_process_in_worker, user_id, name)
+        else:
+            process_profile_image(user_id, name)
+
+    transaction.on_commit(_submit)
@@ -0,0 +1,109 @@
+"""
+Convierte los valores de campos envelope al formato actual de cada campo:
+desde la clave maestra (formato anterior) o desde 'env1:' (Fernet con la
+clave de datos) al cifrado del campo, p. ej. AEAD binario en Note.content
+
+Idempotente: las filas ya convertidas se omiten, así que una ejecución
+interrumpida se reanuda simplemente volviendo a lanzarla.
+"""
+
+import os
+import time
+from collections import Counter
+
+from cryptography.fernet import InvalidToken
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from users.encryption import WRITE_ATTEMPTS, fetch_raw, id_batches, run_batches, write_raw
+from users.fields import EnvelopeMixin
+
+
+def envelope_fields():
+    """Lista de (modelo, campo, campo_propietario) de los campos envelope"""
+    from django.apps import apps
+
+    result = []
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, EnvelopeMixin):
+                result.append((model, field, model._meta.get_field(field.owner_field)))
+    return result
+
+
+class Command(BaseCommand):
+    help = 'Convierte los campos envelope al formato actual con la clave de datos de cada usuario'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Filas por lote (por defecto 1000)')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Hilos en paralelo (1 = secuencial)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo contar las filas pendientes')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        targets = envelope_fields()
+        if not targets:
+            raise CommandError('No hay campos envelope que procesar')
+
+        for model, field, owner in targets:
+            label = f"{model._meta.label_lower}.{field.name}"
+            started = time.monotonic()
+            totals = Counter()
+
+            def convert(lower, upper, model=model, field=field, owner=owner):
+                return self._convert_batch(model, field, owner, lower, upper)
+
+            def on_done(lower, upper, counts, frontier):
+                totals.update(counts)
+
+            batches = id_batches(model, options['batch_size'])
+            run_batches(batches, convert, workers=options['workers'], on_done=on_done)
+
+            verb = 'pendientes' if self.dry_run else 'convertidas'
+            self.stdout.write(self.style.SUCCESS(
+                f"{label}: {totals['converted']} {verb}, {totals['unchanged']} al día, "
+                f"{totals['failed']} ilegibles en {time.monotonic() - started:.1f}s"
+            ))
+            if totals['conflicts']:
+                self.stdout.write(self.style.WARNING(
+                    f"{label}: {totals['conflicts']} filas cambiaron durante la conversión en cada intento "
+                    f"y no se tocaron; vuelve a lanzar el comando para revisarlas"
+                ))
+
+    def _convert_batch(self, model, field, owner, lower, upper):
+        counts = Counter()
+        rows = fetch_raw(model, [field, owner], lower, upper)
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            updates = self._convert_rows(field, rows, counts)
+            if self.dry_run or not updates:
+                counts['converted'] += len(updates)
+                break
+            with transaction.atomic():
+                missed = write_raw(model, [field], updates)
+            counts['converted'] += len(updates) - len(missed)
+            if not missed:
+                break
+            if attempt == WRITE_ATTEMPTS:
+                counts['conflicts'] += len(missed)
+                break
+            # Editadas entre la lectura y el UPDATE: se releen con su valor nuevo
+            rows = fetch_raw(model, [field, owner], pks=missed)
+        return counts
+
+    def _convert_rows(self, field, rows, counts):
+        """[(pk, (valor_leído,), (valor_convertido,))] de las filas en un formato anterior"""
+        updates = []
+        for pk, raw, owner_id in rows:
+            if raw is None or field.is_current_format(raw):
+                counts['unchanged'] += 1
+                continue
+            try:
+                text = field.decrypt_strict(raw, owner_id)
+            except (InvalidToken, UnicodeDecodeError):
+                counts['failed'] += 1
+                continue
+            updates.append((pk, (raw,), (None if self.dry_run else field.encrypt_for(text, owner_id),)))
+        return updates
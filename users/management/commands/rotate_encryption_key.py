@@ -0,0 +1,217 @@
+"""
+Re-cifra los campos encriptados con la clave primaria de FIELD_ENCRYPTION_KEY
+
+Flujo de rotación:
+1. Generar una clave nueva (python generate_encryption_key.py)
+2. Desplegar FIELD_ENCRYPTION_KEY="<nueva>,<antigua>" (MultiFernet: la primera
+   cifra, todas descifran)
+3. python manage.py rotate_encryption_key
+4. Retirar la clave antigua de FIELD_ENCRYPTION_KEY
+
+Los campos envelope (Note.content) no se reescriben: basta con re-cifrar las
+claves de datos de UserDataKey, una por usuario.
+"""
+
+import json
+import os
+import time
+from collections import Counter
+
+from cryptography.fernet import InvalidToken
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from users.encryption import (
+    WRITE_ATTEMPTS, configured_keys, encrypted_models, fetch_raw, get_fernets, id_batches,
+    key_fingerprint, run_batches, write_raw,
+)
+from users.envelope import is_envelope_token
+
+
+class Command(BaseCommand):
+    help = 'Re-cifra los campos encriptados con la clave primaria (reanudable y en paralelo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Filas por lote (por defecto 1000)')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Hilos en paralelo (1 = secuencial)')
+        parser.add_argument('--model', action='append', dest='models',
+                            help='Restringir a app_label.Model (repetible)')
+        parser.add_argument('--checkpoint', default=str(settings.BASE_DIR / 'logs' / 'rotate_encryption_key.json'),
+                            help='Archivo de progreso para reanudar')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignorar el checkpoint existente y empezar de cero')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo contar las filas que necesitan rotación')
+
+    def handle(self, *args, **options):
+        keys = configured_keys()
+        if len(keys) < 2:
+            self.stdout.write(self.style.WARNING(
+                'FIELD_ENCRYPTION_KEY contiene una sola clave: solo se re-cifrarán '
+                'valores que ya no estén cifrados con ella (ninguno si todo es legible).'
+            ))
+
+        self.fernets = get_fernets()
+        self.dry_run = options['dry_run']
+        self.checkpoint_path = options['checkpoint']
+        primary = key_fingerprint(keys[0])
+
+        state = None if options['restart'] else self._load_checkpoint()
+        if state and state.get('primary') != primary:
+            raise CommandError(
+                'El checkpoint pertenece a otra clave primaria. Usa --restart para empezar de nuevo.'
+            )
+        state = state or {'primary': primary, 'models': {}}
+
+        targets = encrypted_models(options['models'])
+        if not targets:
+            raise CommandError('No hay modelos con campos encriptados que procesar')
+
+        for model, fields in targets:
+            label = model._meta.label_lower
+            progress = state['models'].setdefault(
+                label, {'after': None, 'done': False, 'rotated': 0, 'unchanged': 0, 'failed': 0, 'conflicts': 0}
+            )
+            if progress['done'] and not self.dry_run:
+                self.stdout.write(f"{label}: completado en una ejecución anterior, se omite")
+                continue
+            self._rotate_model(model, fields, progress, state, options)
+
+        if not self.dry_run:
+            self._save_checkpoint(state)
+        self.stdout.write(self.style.SUCCESS('Rotación finalizada'))
+
+    def _rotate_model(self, model, fields, progress, state, options):
+        label = model._meta.label_lower
+        field_names = ', '.join(f.name for f in fields)
+        self.stdout.write(f"{label} ({field_names}): desde pk > {progress['after']}")
+        started = time.monotonic()
+        totals = Counter()
+
+        def rotate_batch(lower, upper):
+            return self._rotate_batch(model, fields, lower, upper)
+
+        def on_done(lower, upper, counts, frontier):
+            totals.update(counts)
+            if self.dry_run:
+                return
+            for key in ('rotated', 'unchanged', 'failed', 'conflicts'):
+                progress[key] = progress.get(key, 0) + counts[key]
+            if frontier is not None:
+                progress['after'] = frontier
+            self._save_checkpoint(state)
+            self.stdout.write(
+                f"  lote ({lower}, {upper}]: {counts['rotated']} re-cifradas, "
+                f"{counts['unchanged']} al día, {counts['failed']} ilegibles"
+            )
+
+        batches = id_batches(model, options['batch_size'], after=progress['after'])
+        run_batches(batches, rotate_batch, workers=options['workers'], on_done=on_done)
+
+        if not self.dry_run:
+            progress['done'] = True
+            self._save_checkpoint(state)
+
+        verb = 'necesitan rotación' if self.dry_run else 're-cifradas'
+        self.stdout.write(self.style.SUCCESS(
+            f"{label}: {totals['rotated']} {verb}, {totals['unchanged']} al día, "
+            f"{totals['failed']} ilegibles en {time.monotonic() - started:.1f}s"
+        ))
+        if totals['failed']:
+            self.stdout.write(self.style.WARNING(
+                f"{label}: {totals['failed']} filas no se pudieron descifrar con ninguna clave y no se modificaron"
+            ))
+        if totals['conflicts']:
+            self.stdout.write(self.style.WARNING(
+                f"{label}: {totals['conflicts']} filas cambiaron durante la rotación en cada intento y no "
+                f"se tocaron; vuelve a lanzar con --restart para revisarlas"
+            ))
+
+    def _decrypt(self, raw):
+        """Devuelve (texto_plano, necesita_rotación); lanza InvalidToken si ninguna clave sirve"""
+        token = raw.encode('utf-8') if isinstance(raw, str) else bytes(raw)
+        primary, *older = self.fernets
+        try:
+            return primary.decrypt(token).decode('utf-8'), False
+        except InvalidToken:
+            pass
+        for fernet in older:
+            try:
+                return fernet.decrypt(token).decode('utf-8'), True
+            except InvalidToken:
+                continue
+        raise InvalidToken
+
+    def _rotate_batch(self, model, fields, lower, upper):
+        counts = Counter()
+        rows = fetch_raw(model, fields, lower, upper)
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            updates = self._rotate_rows(rows, counts)
+            if self.dry_run or not updates:
+                counts['rotated'] += len(updates)
+                break
+            # UPDATE directo por lote: una transacción corta y ninguna
+            # entrada de auditlog por fila
+            with transaction.atomic():
+                missed = write_raw(model, fields, updates)
+            counts['rotated'] += len(updates) - len(missed)
+            if not missed:
+                break
+            if attempt == WRITE_ATTEMPTS:
+                counts['conflicts'] += len(missed)
+                break
+            # Editadas entre la lectura y el UPDATE: se releen con su valor nuevo
+            rows = fetch_raw(model, fields, pks=missed)
+        return counts
+
+    def _rotate_rows(self, rows, counts):
+        """[(pk, valores_leídos, valores_re_cifrados)] de las filas con alguna clave antigua"""
+        primary = self.fernets[0]
+        updates = []
+        for pk, *values in rows:
+            new_values = []
+            needs_rotation = False
+            try:
+                for raw in values:
+                    if raw is None or is_envelope_token(raw):
+                        # Cifrados con la clave de datos del usuario: se rota
+                        # la UserDataKey, no la fila
+                        new_values.append(raw)
+                        continue
+                    text, stale = self._decrypt(raw)
+                    needs_rotation |= stale
+                    if stale:
+                        token = primary.encrypt(text.encode('utf-8'))
+                        # Mismo formato que encrypt_str: token Fernet como texto
+                        # (como bytes en columnas binarias)
+                        new_values.append(token if isinstance(raw, (bytes, memoryview)) else token.decode('utf-8'))
+                    else:
+                        new_values.append(raw)
+            except InvalidToken:
+                counts['failed'] += 1
+                continue
+
+            if needs_rotation:
+                updates.append((pk, values, new_values))
+            else:
+                counts['unchanged'] += 1
+        return updates
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return None
+
+    def _save_checkpoint(self, state):
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump(state, fh, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
@@ -0,0 +1,154 @@
+"""
+Verifica que todos los valores encriptados se pueden descifrar
+
+Las vistas y el ORM devuelven el texto cifrado cuando un valor no se puede
+descifrar (clave perdida o equivocada), sin error visible. Este comando
+recorre cada columna encriptada por lotes de clave primaria, en paralelo y
+con memoria acotada, y reporta las filas ilegibles. Con --quarantine copia
+su texto cifrado a QuarantinedCiphertext (la fila original no se modifica).
+"""
+
+import json
+import os
+import time
+from collections import Counter
+
+from cryptography.fernet import InvalidToken, MultiFernet
+from django.core.management.base import BaseCommand, CommandError
+
+from users.encryption import encrypted_models, fetch_raw, get_fernets, id_batches, run_batches
+from users.envelope import get_data_key, is_envelope_token
+from users.fields import EnvelopeMixin
+from users.models import QuarantinedCiphertext
+
+
+class Command(BaseCommand):
+    help = 'Busca valores encriptados que ninguna clave configurada puede descifrar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Filas por lote (por defecto 5000)')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Hilos en paralelo (1 = secuencial)')
+        parser.add_argument('--model', action='append', dest='models',
+                            help='Restringir a app_label.Model (repetible)')
+        parser.add_argument('--output',
+                            help='Escribir cada valor ilegible como una línea JSON en este archivo')
+        parser.add_argument('--quarantine', action='store_true',
+                            help='Copiar los valores ilegibles a QuarantinedCiphertext')
+        parser.add_argument('--show', type=int, default=20,
+                            help='Valores ilegibles a mostrar en consola (por defecto 20)')
+        parser.add_argument('--strict', action='store_true',
+                            help='Terminar con error si hay valores ilegibles')
+
+    def handle(self, *args, **options):
+        self.master = MultiFernet(get_fernets())
+        targets = encrypted_models(options['models'])
+        if not targets:
+            raise CommandError('No hay modelos con campos encriptados que revisar')
+
+        output = open(options['output'], 'w') if options['output'] else None
+        shown = 0
+        grand_total = Counter()
+        try:
+            for model, fields in targets:
+                label = model._meta.label_lower
+                owners = self._owner_fields(model, fields)
+                started = time.monotonic()
+                totals = Counter()
+
+                def scan(lower, upper, model=model, fields=fields, owners=owners):
+                    return self._scan_batch(model, fields, owners, lower, upper)
+
+                def on_done(lower, upper, batch, frontier, label=label, totals=totals):
+                    nonlocal shown
+                    counts, failures = batch
+                    totals.update(counts)
+                    for pk, field_name, raw, reason in failures:
+                        if output:
+                            output.write(json.dumps({
+                                'model': label, 'pk': pk, 'field': field_name, 'reason': reason,
+                            }) + '\n')
+                        if shown < options['show']:
+                            self.stdout.write(self.style.WARNING(
+                                f"  {label} pk={pk} {field_name}: {reason}"
+                            ))
+                            shown += 1
+                    if failures and options['quarantine']:
+                        self._quarantine(label, failures)
+
+                run_batches(
+                    id_batches(model, options['batch_size']), scan,
+                    workers=options['workers'], on_done=on_done,
+                )
+                elapsed = time.monotonic() - started
+                rate = totals['rows'] / elapsed if elapsed else 0
+                style = self.style.WARNING if totals['failed'] else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"{label}: {totals['rows']} filas, {totals['values']} valores, "
+                    f"{totals['failed']} ilegibles en {elapsed:.1f}s ({rate:.0f} filas/s)"
+                ))
+                grand_total.update(totals)
+        finally:
+            if output:
+                output.close()
+
+        if grand_total['failed'] and options['quarantine']:
+            self.stdout.write(f"{grand_total['failed']} valores copiados a QuarantinedCiphertext")
+        if grand_total['failed'] and options['strict']:
+            raise CommandError(f"{grand_total['failed']} valores encriptados ilegibles")
+
+    def _owner_fields(self, model, fields):
+        """Campos FK de propietario que necesitan los campos envelope"""
+        owners = []
+        for field in fields:
+            if isinstance(field, EnvelopeMixin):
+                owner = model._meta.get_field(field.owner_field)
+                if owner not in owners:
+                    owners.append(owner)
+        return owners
+
+    def _check(self, field, raw, owner_id):
+        """None si el valor se descifra; si no, el motivo"""
+        try:
+            if isinstance(field, EnvelopeMixin):
+                field.decrypt_strict(raw, owner_id)
+            else:
+                token = raw.encode('utf-8') if isinstance(raw, str) else bytes(raw)
+                self.master.decrypt(token)
+            return None
+        except (InvalidToken, UnicodeDecodeError):
+            if is_envelope_token(raw) and get_data_key(owner_id) is None:
+                return 'clave de datos del propietario ausente o destruida'
+            return 'ninguna clave configurada lo descifra'
+
+    def _scan_batch(self, model, fields, owners, lower, upper):
+        counts = Counter()
+        failures = []
+        owner_index = {owner.name: i for i, owner in enumerate(owners)}
+        for pk, *values in fetch_raw(model, fields + owners, lower, upper):
+            counts['rows'] += 1
+            owner_values = values[len(fields):]
+            for field, raw in zip(fields, values):
+                if raw is None:
+                    continue
+                counts['values'] += 1
+                owner_id = (
+                    owner_values[owner_index[field.owner_field]]
+                    if isinstance(field, EnvelopeMixin) else None
+                )
+                reason = self._check(field, raw, owner_id)
+                if reason:
+                    counts['failed'] += 1
+                    failures.append((pk, field.name, raw, reason))
+        return counts, failures
+
+    def _quarantine(self, label, failures):
+        QuarantinedCiphertext.objects.bulk_create([
+            QuarantinedCiphertext(
+                model_label=label, object_pk=str(pk), field_name=field_name,
+                ciphertext=raw.encode('utf-8') if isinstance(raw, str) else bytes(raw),
+                reason=reason,
+            )
+            for pk, field_name, raw, reason in failures
+        ], ignore_conflicts=True)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:22
+
+import users.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_customuser_profile_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=users.storage.get_profile_image_storage, upload_to='profile_images/'),
+        ),
+    ]
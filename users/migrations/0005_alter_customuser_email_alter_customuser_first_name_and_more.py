@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:31
+
+import users.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_customuser_profile_image_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='email',
+            field=users.fields.LazyEncryptedEmailField(unique=True),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='first_name',
+            field=users.fields.LazyEncryptedCharField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='last_name',
+            field=users.fields.LazyEncryptedCharField(blank=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:36
+
+import django.db.models.deletion
+import users.fields
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_alter_customuser_email_alter_customuser_first_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDataKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', users.fields.LazyEncryptedCharField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='data_key', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
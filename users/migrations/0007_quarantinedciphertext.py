@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_userdatakey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuarantinedCiphertext',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100)),
+                ('object_pk', models.CharField(max_length=64)),
+                ('field_name', models.CharField(max_length=100)),
+                ('ciphertext', models.BinaryField()),
+                ('reason', models.CharField(max_length=200)),
+                ('detected_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-detected_at'],
+                'constraints': [models.UniqueConstraint(fields=('model_label', 'object_pk', 'field_name'), name='unique_quarantined_value')],
+            },
+        ),
+    ]
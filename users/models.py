@@ -1,9 +1,11 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from encrypted_model_fields.fields import EncryptedEmailField, EncryptedCharField
 from auditlog.registry import auditlog
 from auditlog.models import AuditlogHistoryField
 
+from .fields import LazyEncryptedCharField, LazyEncryptedEmailField
+from .storage import get_profile_image_storage
+
 
 class CustomUser(AbstractUser):
 	GENDER_CHOICES = [
@@ -13,16 +15,22 @@ class CustomUser(AbstractUser):
 		('O', 'Otro'),
 		('P', 'Prefiero no decir'),
 	]
-	# Campos encriptados para proteger información sensible
-	email = EncryptedEmailField(max_length=254, unique=True)
-	first_name = EncryptedCharField(max_length=150, blank=True)
-	last_name = EncryptedCharField(max_length=150, blank=True)
+	# Campos encriptados para proteger información sensible; se desencriptan
+	# solo al leerse (request.user en cada request no paga el coste)
+	email = LazyEncryptedEmailField(max_length=254, unique=True)
+	first_name = LazyEncryptedCharField(max_length=150, blank=True)
+	last_name = LazyEncryptedCharField(max_length=150, blank=True)
 	
 	# Campos no sensibles permanecen sin encriptar
 	nickname = models.CharField(max_length=50, blank=True, null=True)
 	age = models.PositiveIntegerField(blank=True, null=True)
 	gender = models.CharField(max_length=2, choices=GENDER_CHOICES, blank=True, null=True)
-	profile_image = models.ImageField(upload_to='profile_images/', blank=True, null=True)
+	# Nombrada por hash de contenido: subidas idénticas comparten archivo
+	profile_image = models.ImageField(
+		upload_to='profile_images/', storage=get_profile_image_storage, blank=True, null=True
+	)
+	# Variantes redimensionadas generadas en segundo plano (ver users/images.py)
+	profile_image_variants = models.JSONField(default=dict, blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 	
@@ -52,10 +60,50 @@ class UserPreference(models.Model):
 		return f"Preferencias de {self.user.username}"
 
 
+class UserDataKey(models.Model):
+	"""
+	Clave de datos del usuario para encriptación de sobre (users/envelope.py).
+	`key` se guarda cifrada con la clave maestra; borrarla destruye
+	criptográficamente los datos cifrados con ella.
+	"""
+	user = models.OneToOneField('CustomUser', on_delete=models.CASCADE, related_name='data_key')
+	key = LazyEncryptedCharField(max_length=44)
+	created_at = models.DateTimeField(auto_now_add=True)
+
+	def __str__(self):
+		return f"Clave de datos de {self.user_id}"
+
+
+class QuarantinedCiphertext(models.Model):
+	"""
+	Valor encriptado que ninguna clave configurada pudo descifrar, registrado
+	por `manage.py scan_encrypted_fields --quarantine`. Conserva una copia del
+	texto cifrado; la fila original no se modifica.
+	"""
+	model_label = models.CharField(max_length=100)
+	object_pk = models.CharField(max_length=64)
+	field_name = models.CharField(max_length=100)
+	ciphertext = models.BinaryField()
+	reason = models.CharField(max_length=200)
+	detected_at = models.DateTimeField(auto_now_add=True)
+
+	class Meta:
+		ordering = ['-detected_at']
+		constraints = [
+			models.UniqueConstraint(
+				fields=['model_label', 'object_pk', 'field_name'], name='unique_quarantined_value'
+			),
+		]
+
+	def __str__(self):
+		return f"{self.model_label}#{self.object_pk}.{self.field_name}"
+
+
 # Registro de modelos para auditoría
+# UserDataKey no se audita: el diff incluiría la clave en claro
 auditlog.register(
     CustomUser, 
-    exclude_fields=['password', 'last_login', 'updated_at'],
+    exclude_fields=['password', 'last_login', 'updated_at', 'profile_image_variants'],
     mask_fields=['email', 'first_name', 'last_name']  # Campos encriptados se registran sin contenido
 )
 auditlog.register(UserPreference, exclude_fields=['updated_at'])
@@ -1,6 +1,11 @@
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.core.files.storage import default_storage
+from django.db import transaction
 from rest_framework import serializers
+from .images import (
+    release_profile_image, restore_profile_image, schedule_profile_image_processing, validate_profile_image,
+)
 from .models import CustomUser, UserPreference
 from notes.models import Note, Tag
 
@@ -13,15 +18,32 @@ class UserPreferenceSerializer(serializers.ModelSerializer):
 
 class UserSerializer(serializers.ModelSerializer):
     preferences = UserPreferenceSerializer(read_only=True)
+    profile_image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = CustomUser
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name', 'nickname',
-            'age', 'gender', 'profile_image', 'preferences'
+            'age', 'gender', 'profile_image', 'profile_image_variants', 'preferences'
         ]
         read_only_fields = ['id']
 
+    def get_profile_image_variants(self, obj):
+        # {etiqueta: {'jpg': url, 'webp': url}}; vacío mientras se procesan
+        request = self.context.get('request')
+        urls = {}
+        for label, formats in (obj.profile_image_variants or {}).items():
+            urls[label] = {}
+            for ext, path in formats.items():
+                url = default_storage.url(path)
+                urls[label][ext] = request.build_absolute_uri(url) if request else url
+        return urls
+
+    def validate_profile_image(self, value):
+        if value:
+            validate_profile_image(value)
+        return value
+
     def validate_username(self, value):
         v = value.strip()
         if len(v) < 3:
@@ -44,12 +66,27 @@ class UserSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         remove_image = self.context['request'].data.get('remove_image')
+        old_image = instance.profile_image.name or None
+        old_variants = instance.profile_image_variants
         for attr, val in validated_data.items():
             setattr(instance, attr, val)
         if remove_image == '1':
-            instance.profile_image.delete(save=False)
             instance.profile_image = None
         instance.save()
+
+        new_image = instance.profile_image.name or None
+        if new_image != old_image:
+            if old_image:
+                # Archivo compartido: solo se borra si ya nadie lo referencia
+                transaction.on_commit(lambda: release_profile_image(old_image, old_variants))
+            if instance.profile_image_variants:
+                CustomUser.objects.filter(pk=instance.pk).update(profile_image_variants={})
+                instance.profile_image_variants = {}
+            if new_image:
+                upload = validated_data.get('profile_image')
+                if upload is not None:
+                    transaction.on_commit(lambda: restore_profile_image(new_image, upload))
+                schedule_profile_image_processing(instance)
         return instance
 
 
@@ -83,7 +120,9 @@ class LoginSerializer(serializers.Serializer):
     def validate(self, attrs):
         identifier = (attrs.get('username') or '').strip()
         password = attrs.get('password')
-        user = None
+        # Con el request, user_login_failed lleva la IP (detector de fuerza bruta)
+        request = self.context.get('request')
+        user = matched = None
 
         # Intentar primero si es email
         if identifier and '@' in identifier:
@@ -93,16 +132,18 @@ class LoginSerializer(serializers.Serializer):
             for candidate in CustomUser.objects.all():
                 try:
                     if str(candidate.email).lower() == target:
-                        user = authenticate(username=candidate.username, password=password)
-                        if user:
-                            break
+                        matched = candidate
+                        break
                 except Exception:
                     # Ignorar usuarios con email ilegible
                     continue
+            if matched is not None:
+                user = authenticate(request, username=matched.username, password=password)
 
-        # Intentar como username normal si anterior falló
-        if user is None:
-            user = authenticate(username=identifier, password=password)
+        # Intentar como username normal si no era el email de nadie: un solo
+        # authenticate (y un solo user_login_failed) por intento de login
+        if matched is None:
+            user = authenticate(request, username=identifier, password=password)
 
         if not user:
             raise serializers.ValidationError('Credenciales inválidas')
@@ -136,6 +177,8 @@ class FlexibleTagsField(serializers.Field):
 
 
 class NoteSerializer(serializers.ModelSerializer):
+    # content se guarda como binario cifrado; en la API es texto
+    content = serializers.CharField()
     tags = FlexibleTagsField(required=False)
 
     class Meta:
@@ -0,0 +1,111 @@
+"""
+Almacenamiento direccionado por contenido para imágenes subidas
+
+Cada archivo se guarda como <upload_to>/<sha256><ext>: subidas idénticas
+comparten un único archivo y la URL resultante nunca cambia de contenido,
+por lo que CDN y navegadores pueden cachearla como inmutable.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# <sha256>.<ext> o, para variantes derivadas, <sha256>_<variante>.<ext>
+CONTENT_ADDRESSED_RE = re.compile(r'^[0-9a-f]{32,64}(?:_[a-z0-9]+)?\.[A-Za-z0-9]+$')
+
+
+def is_content_addressed(name):
+    """True si el nombre del archivo es un hash de su contenido"""
+    return bool(CONTENT_ADDRESSED_RE.match(os.path.basename(name)))
+
+
+def atomic_write(full_path, chunks, permissions_mode=None):
+    """
+    Escribe `chunks` en un temporal del mismo directorio y lo renombra sobre
+    `full_path`: un lector concurrente ve el archivo anterior o el nuevo,
+    nunca uno a medias ni ausente
+    """
+    directory = os.path.dirname(full_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+        if permissions_mode is not None:
+            os.chmod(tmp_path, permissions_mode)
+        os.replace(tmp_path, full_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage que nombra los archivos por el SHA-256 de su contenido"""
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, f"{digest.hexdigest()}{ext}")
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre final se decide en _save a partir del contenido
+        return name
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Deduplicación: el mismo contenido ya está almacenado
+            return name
+
+        # Dos subidas concurrentes del mismo contenido escriben bytes idénticos
+        atomic_write(self.path(name), content.chunks(), self.file_permissions_mode)
+        return name
+
+    def delete_unreferenced(self, name, is_referenced):
+        """
+        Borra `name` salvo que is_referenced() diga que alguien lo usa. Antes
+        de comprobarlo lo aparta con un rename: una subida idéntica que llegue
+        mientras tanto ya no lo encuentra y lo escribe de nuevo en lugar de
+        deduplicar contra un archivo a punto de borrarse. Si al volver a
+        comprobar alguien lo referencia, se restaura.
+        """
+        path = self.path(name)
+        tombstone = os.path.join(os.path.dirname(path), f'.release-{uuid.uuid4().hex}')
+        try:
+            os.rename(path, tombstone)
+        except FileNotFoundError:
+            return False
+        if is_referenced():
+            # Si otra subida lo reescribió entretanto, el contenido es el mismo
+            os.replace(tombstone, path)
+            return False
+        os.remove(tombstone)
+        return True
+
+
+def get_profile_image_storage():
+    """Storage de CustomUser.profile_image (callable para migraciones estables)"""
+    return ContentAddressedStorage()
+
+
+def reference_count(name):
+    """Número de usuarios cuyo profile_image apunta a `name`"""
+    from .models import CustomUser
+
+    if not name:
+        return 0
+    return CustomUser.objects.filter(profile_image=name).count()
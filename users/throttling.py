@@ -0,0 +1,163 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from audit.middleware import trusted_client_ip
+
+# Candado por bucket: caduca solo si quien lo tiene muere a medias
+LOCK_TIMEOUT = 1
+LOCK_WAIT = 1.0
+POLL_INTERVAL = 0.002
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Throttle de tipo token bucket.
+
+    A diferencia de SimpleRateThrottle (que guarda la lista completa de
+    timestamps por cliente), cada bucket ocupa una tupla (tokens, último_ts)
+    en la caché 'throttle', así que comprobar un request cuesta O(1).
+
+    La tasa 'N/periodo' se interpreta como capacidad N y recarga continua
+    de N tokens por periodo, lo que permite ráfagas cortas de hasta N
+    requests y un promedio sostenido de N por periodo.
+
+    Leer y reescribir el bucket se hace con un candado por clave
+    (cache.add, atómico en locmem, Redis, Memcached y la caché en BD) para
+    que requests concurrentes no gasten el mismo token.
+    """
+    cache_alias = getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')
+    methods = None  # None = todos los métodos HTTP
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_rate(self):
+        # Leer en cada instancia para respetar override_settings
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{self.scope}' scope")
+
+    def get_ident(self, request):
+        # No SimpleRateThrottle.get_ident: sin NUM_PROXIES usa X-Forwarded-For
+        # tal cual y el cliente elegiría su bucket
+        return trusted_client_ip(request) or 'unknown'
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        if self.methods is not None and request.method not in self.methods:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        lock = f'{self.key}:lock'
+        deadline = time.monotonic() + LOCK_WAIT
+        while not self.cache.add(lock, 1, LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                # Demasiados requests simultáneos contra el mismo bucket
+                self.tokens = 0.0
+                return False
+            time.sleep(POLL_INTERVAL)
+        try:
+            return self._take_token()
+        finally:
+            self.cache.delete(lock)
+
+    def _take_token(self):
+        now = self.timer()
+        tokens, last = self.cache.get(self.key, (float(self.num_requests), now))
+        refill = (now - last) * self.num_requests / self.duration
+        self.tokens = min(float(self.num_requests), tokens + refill)
+
+        if self.tokens < 1:
+            self.cache.set(self.key, (self.tokens, now), self.duration)
+            return False
+
+        self.tokens -= 1
+        self.cache.set(self.key, (self.tokens, now), self.duration)
+        return True
+
+    def wait(self):
+        """Segundos hasta que el bucket recupere un token"""
+        return max(0.0, (1 - self.tokens) * self.duration / self.num_requests)
+
+
+class AnonBurstThrottle(TokenBucketThrottle):
+    """Tráfico general de la API para clientes anónimos, por IP"""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class UserBurstThrottle(TokenBucketThrottle):
+    """Tráfico general de la API, por usuario autenticado (o IP si es anónimo)"""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    """Intentos de login por IP"""
+    scope = 'login'
+    methods = ('POST',)
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginIdentifierThrottle(TokenBucketThrottle):
+    """
+    Intentos de login por username/email, para frenar ataques distribuidos
+    contra una misma cuenta desde muchas IPs
+    """
+    scope = 'login_identifier'
+    methods = ('POST',)
+
+    def get_cache_key(self, request, view):
+        identifier = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not isinstance(identifier, str) or not identifier.strip():
+            return None
+        # Hash para no guardar identificadores en claro ni romper claves de caché
+        digest = hashlib.sha256(identifier.strip().lower().encode()).hexdigest()[:32]
+        return self.cache_format % {'scope': self.scope, 'ident': digest}
+
+
+class RegisterThrottle(TokenBucketThrottle):
+    """Registros de cuenta por IP"""
+    scope = 'register'
+    methods = ('POST',)
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class SearchThrottle(UserBurstThrottle):
+    """
+    Búsquedas con ?q= en notas, que desencriptan el contenido en Python;
+    solo consume tokens cuando el parámetro está presente
+    """
+    scope = 'search'
+    methods = ('GET',)
+
+    def get_cache_key(self, request, view):
+        if not request.query_params.get('q'):
+            return None
+        return super().get_cache_key(request, view)
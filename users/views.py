@@ -11,6 +11,10 @@ from .serializers import (
     RegisterSerializer, LoginSerializer, UserSerializer,
     UserPreferenceSerializer, NoteSerializer, TagSerializer
 )
+from .throttling import (
+    LoginIPThrottle, LoginIdentifierThrottle, RegisterThrottle,
+    SearchThrottle, UserBurstThrottle
+)
 from notes.models import Note, Tag
 
 
@@ -18,13 +22,17 @@ class RegisterView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
+    # Rechaza antes de validar/hashear la contraseña
+    throttle_classes = [RegisterThrottle]
 
 
 class LoginView(views.APIView):
     permission_classes = [permissions.AllowAny]
+    # Rechaza antes de authenticate() (hash de contraseña)
+    throttle_classes = [LoginIPThrottle, LoginIdentifierThrottle]
 
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
+        serializer = LoginSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
         login(request, user)
@@ -124,6 +132,8 @@ class PreferenceView(views.APIView):
 class NoteListCreateView(generics.ListCreateAPIView):
     serializer_class = NoteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # ?q= desencripta contenido en Python: bucket propio además del general
+    throttle_classes = [UserBurstThrottle, SearchThrottle]
 
     def get_queryset(self):
         if not self.request.user.is_authenticated: